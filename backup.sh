@@ -39,6 +39,8 @@ cp -rv driver "$BACKUP_DIR/" 2>/dev/null || true
 
 echo "[6/10] Sauvegarde des données utilisateur..."
 cp -v users.json "$BACKUP_DIR/" 2>/dev/null || echo "  (pas de users.json)"
+# kitt.db (WAL) : export au format JSON historique, cohérent même serveur lancé
+venv/bin/python3 kitt_db.py --export "$BACKUP_DIR/db_export" 2>/dev/null || echo "  (pas de kitt.db)"
 
 echo "[7/10] Sauvegarde de la documentation..."
 cp -v SUPER_NOTES.md "$BACKUP_DIR/" 2>/dev/null || true
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+KITT — Journal des événements de conversation : segments tournants compressés
++ index (utilisateur, jour, session) → offsets.
+
+Remplace logs/conversations.jsonl (grossissait sans limite) :
+
+  • segment actif logs/conversations/conv-<date>.jsonl, rotation à MAX_BYTES
+    ou au changement de jour (UTC)
+  • à la fermeture, le segment est réécrit en .jsonl.gz avec UN membre gzip
+    par groupe (utilisateur, jour, session) ; le fichier annexe .idx.json
+    donne l'offset et la longueur de chaque membre
+  • une recherche ne lit que les membres dont la clé correspond aux filtres :
+    les segments et groupes sans rapport ne sont ni lus ni décompressés
+  • l'ancien journal unique est importé en tâche de fond, découpé ligne à ligne
+    en segments de MAX_BYTES (jamais chargé entier en mémoire)
+
+Usage :
+    venv/bin/python3 conv_log.py [--user NOM] [--from 2025-01-01] [--to 2025-01-31] [--q texte]
+    venv/bin/python3 conv_log.py --stats
+"""
+
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+MAX_BYTES = 16 * 1024 * 1024     # taille max du segment actif avant rotation
+SEARCH_LIMIT = 200
+SEARCH_LIMIT_MAX = 2000
+LEGACY_PENDING = "legacy-import.jsonl"   # ancien journal en cours d'import
+
+
+def event_key(event: dict) -> tuple[str, str, str]:
+    """(utilisateur, jour, session) d'un événement — clé de l'index."""
+    return (event.get("user") or "", (event.get("timestamp") or "")[:10], event.get("session_id") or "")
+
+
+def _utc_day() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class ConvLog:
+    """Journal tournant ; write() est appelé hors boucle asyncio (executor)."""
+
+    def __init__(self, directory: Path, max_bytes: int = MAX_BYTES, legacy: Path | None = None,
+                 recover: bool = True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._closed: list[dict] = []    # index des segments compressés (ordre chronologique)
+        self._active: Path | None = None
+        self._active_day = ""
+        self._active_size = 0
+        self._active_keys: dict[tuple, dict] = {}   # clé → {"first", "last", "lines": [(offset, len)]}
+        self.rotations = 0
+        self._legacy_thread: threading.Thread | None = None
+        # Segments restés ouverts (arrêt brutal) : compressés au démarrage (≤ max_bytes chacun)
+        if recover:
+            for seg in sorted(self.directory.glob("conv-*.jsonl")):
+                self._compress(seg)
+        for idx in sorted(self.directory.glob("conv-*.jsonl.gz.idx.json")):
+            try:
+                self._closed.append(json.loads(idx.read_text()))
+            except Exception as e:
+                print(f"[CONVLOG] Index illisible {idx.name}: {e}", flush=True)
+        # Ancien journal unique (taille quelconque) : importé en tâche de fond
+        pending = self.directory / LEGACY_PENDING
+        if recover and legacy is not None and legacy.exists() and legacy.stat().st_size \
+                and not pending.exists():
+            os.replace(legacy, pending)
+        if recover and (pending.exists() or any(self.directory.glob("legacy-*.jsonl.part"))):
+            self._legacy_thread = threading.Thread(target=self._import_legacy, args=(pending,),
+                                                   name="convlog-legacy", daemon=True)
+            self._legacy_thread.start()
+
+    # ── Écriture ──────────────────────────────────────────────────────────
+
+    def _segment_path(self, when: datetime) -> Path:
+        base = f"conv-{when.strftime('%Y%m%d-%H%M%S')}"
+        path, n = self.directory / f"{base}.jsonl", 1
+        while path.exists() or path.with_name(path.name + ".gz").exists():
+            path, n = self.directory / f"{base}-{n}.jsonl", n + 1
+        return path
+
+    def _open_segment(self):
+        self._active = self._segment_path(datetime.now(timezone.utc))
+        self._active_day = _utc_day()
+        self._active_size = 0
+        self._active_keys = {}
+
+    def write(self, lines: list[str]):
+        """Ajoute des lignes JSON au segment actif (rotation taille / jour)."""
+        with self._lock:
+            if self._active is not None and (self._active_size >= self.max_bytes
+                                             or self._active_day != _utc_day()):
+                self._rotate()
+            if self._active is None:
+                self._open_segment()
+            with open(self._active, "ab") as f:
+                offset = self._active_size
+                for line in lines:
+                    data = (line + "\n").encode("utf-8")
+                    f.write(data)
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        event = {}
+                    key = event_key(event)
+                    entry = self._active_keys.get(key)
+                    if entry is None:
+                        entry = self._active_keys[key] = {"first": event.get("timestamp", ""), "lines": []}
+                    entry["last"] = event.get("timestamp", "")
+                    entry["lines"].append((offset, len(data)))
+                    offset += len(data)
+                self._active_size = offset
+
+    def _rotate(self):
+        seg, self._active = self._active, None
+        self._active_size = 0
+        self._active_keys = {}
+        self._closed.append(self._compress(seg))
+        self.rotations += 1
+
+    def rotate(self):
+        """Ferme le segment actif (arrêt du serveur) — il sera compressé."""
+        with self._lock:
+            if self._active is not None and self._active.exists():
+                self._rotate()
+
+    def _split_legacy(self, src: Path) -> list[Path]:
+        """Découpe ligne à ligne l'ancien journal en parts de max_bytes (date d'origine conservée)."""
+        mtime = src.stat().st_mtime
+        parts, out, size = [], None, 0
+        try:
+            with open(src, "rb") as f:
+                for raw in f:
+                    if out is None or size >= self.max_bytes:
+                        if out is not None:
+                            out.close()
+                        parts.append(self.directory / f"legacy-{len(parts):04d}.jsonl.part")
+                        out, size = open(parts[-1], "wb"), 0
+                    out.write(raw)
+                    size += len(raw)
+        finally:
+            if out is not None:
+                out.close()
+        for part in parts:
+            os.utime(part, (mtime, mtime))
+        return parts
+
+    def _import_legacy(self, src: Path):
+        """Ancien journal → segments compressés. Reprise sûre après arrêt brutal :
+        tant que `src` existe la découpe est refaite ; ensuite les parts sont complètes."""
+        t0 = time.monotonic()
+        try:
+            parts = sorted(self.directory.glob("legacy-*.jsonl.part"))
+            if src.exists():
+                for part in parts:
+                    part.unlink()
+                parts = self._split_legacy(src)
+                src.unlink()
+            for part in parts:
+                with self._lock:
+                    seg = self._segment_path(datetime.fromtimestamp(part.stat().st_mtime, timezone.utc))
+                    os.replace(part, seg)
+                index = self._compress(seg)
+                with self._lock:
+                    self._closed.append(index)
+            print(f"[CONVLOG] Ancien journal importé : {len(parts)} segment(s) en "
+                  f"{time.monotonic() - t0:.1f}s", flush=True)
+        except Exception as e:
+            print(f"[CONVLOG] Import de l'ancien journal interrompu: {e}", flush=True)
+
+    def _compress(self, seg: Path) -> dict:
+        """segment .jsonl → .jsonl.gz (un membre gzip par clé) + index annexe (retourné)."""
+        groups: dict[tuple, list[bytes]] = {}
+        bounds: dict[tuple, list[str]] = {}
+        with open(seg, "rb") as f:
+            for raw in f:
+                if not raw.strip():
+                    continue
+                try:
+                    event = json.loads(raw)
+                except ValueError:
+                    continue
+                key = event_key(event)
+                groups.setdefault(key, []).append(raw if raw.endswith(b"\n") else raw + b"\n")
+                ts = event.get("timestamp", "")
+                b = bounds.setdefault(key, [ts, ts])
+                b[1] = ts
+        gz = seg.with_name(seg.name + ".gz")
+        tmp = gz.with_name(gz.name + ".tmp")
+        entries = []
+        with open(tmp, "wb") as out:
+            for key, lines in groups.items():
+                offset = out.tell()
+                out.write(gzip.compress(b"".join(lines), compresslevel=6))
+                user, day, session = key
+                entries.append({"user": user, "day": day, "session": session, "offset": offset,
+                                "length": out.tell() - offset, "count": len(lines),
+                                "first": bounds[key][0], "last": bounds[key][1]})
+        os.replace(tmp, gz)
+        index = {"segment": gz.name, "raw_bytes": seg.stat().st_size,
+                 "gz_bytes": gz.stat().st_size, "entries": entries}
+        idx = gz.with_name(gz.name + ".idx.json")
+        idx.write_text(json.dumps(index, ensure_ascii=False))
+        seg.unlink()
+        return index
+
+    # ── Recherche ─────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _key_matches(user, day, session, f_user, f_from, f_to, f_session) -> bool:
+        if f_user and user.casefold() != f_user:
+            return False
+        if f_from and day < f_from:
+            return False
+        if f_to and day > f_to:
+            return False
+        return not f_session or session == f_session
+
+    def plan(self, user: str = "", since: str = "", until: str = "", session: str = "") -> list[tuple]:
+        """Groupes à lire pour ces filtres, en ordre chronologique — aucune I/O."""
+        f_user = user.casefold()
+        refs = []
+        for seg in list(self._closed):
+            for e in seg["entries"]:
+                if self._key_matches(e["user"], e["day"], e["session"], f_user, since, until, session):
+                    refs.append(("gz", seg["segment"], e["offset"], e["length"], e["first"]))
+        with self._lock:
+            if self._active is not None:
+                for (u, d, s), e in self._active_keys.items():
+                    if self._key_matches(u, d, s, f_user, since, until, session):
+                        refs.append(("active", self._active.name, list(e["lines"]), (u, d, s), e["first"]))
+        # Les groupes d'un même segment sont entrelacés dans le temps
+        refs.sort(key=lambda r: r[4])
+        return refs
+
+    def read(self, ref: tuple) -> list[dict]:
+        """Événements d'un groupe : décompresse un seul membre gzip."""
+        kind, name, a, b, _ = ref
+        path = self.directory / name
+        if kind == "gz":
+            with open(path, "rb") as f:
+                f.seek(a)
+                data = gzip.decompress(f.read(b))
+        else:
+            with self._lock:
+                rotated = self._active is None or self._active.name != name
+                if not rotated:
+                    with open(path, "rb") as f:
+                        chunks = []
+                        for offset, length in a:
+                            f.seek(offset)
+                            chunks.append(f.read(length))
+                    data = b"".join(chunks)
+            if rotated:
+                # Segment compressé entre plan() et read() : même groupe, relu dans le .gz
+                return self._read_rotated(name, b)
+        events = []
+        for raw in data.splitlines():
+            try:
+                events.append(json.loads(raw))
+            except ValueError:
+                pass
+        return events
+
+    def _read_rotated(self, name: str, key: tuple) -> list[dict]:
+        for seg in list(self._closed):
+            if seg["segment"] == name + ".gz":
+                for e in seg["entries"]:
+                    if (e["user"], e["day"], e["session"]) == tuple(key):
+                        return self.read(("gz", seg["segment"], e["offset"], e["length"], e["first"]))
+        return []
+
+    @staticmethod
+    def matches(event: dict, text: str) -> bool:
+        return not text or text.casefold() in str(event.get("message", "")).casefold()
+
+    def search(self, user="", since="", until="", session="", text="", limit=SEARCH_LIMIT):
+        """Itérateur synchrone (CLI) sur les tours correspondants."""
+        n = 0
+        for ref in self.plan(user, since, until, session):
+            for event in self.read(ref):
+                if self.matches(event, text):
+                    yield event
+                    n += 1
+                    if n >= limit:
+                        return
+
+    def stats(self) -> dict:
+        raw = sum(s.get("raw_bytes", 0) for s in self._closed)
+        gz = sum(s.get("gz_bytes", 0) for s in self._closed)
+        return {"segments": len(self._closed), "groups": sum(len(s["entries"]) for s in self._closed),
+                "raw_bytes": raw, "gz_bytes": gz, "ratio": round(raw / gz, 1) if gz else 0.0,
+                "active": self._active.name if self._active else None,
+                "active_bytes": self._active_size, "rotations": self.rotations,
+                "legacy_import": self._legacy_thread is not None and self._legacy_thread.is_alive()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recherche dans le journal des conversations KITT")
+    parser.add_argument("--dir", default=str(Path(__file__).parent / "logs" / "conversations"))
+    parser.add_argument("--user", default="")
+    parser.add_argument("--from", dest="since", default="")
+    parser.add_argument("--to", dest="until", default="")
+    parser.add_argument("--session", default="")
+    parser.add_argument("--q", default="")
+    parser.add_argument("--limit", type=int, default=SEARCH_LIMIT)
+    parser.add_argument("--stats", action="store_true")
+    args = parser.parse_args()
+    # Lecture seule : ne touche pas au segment actif du serveur (non indexé ici)
+    log = ConvLog(Path(args.dir), recover=False)
+    if args.stats:
+        print(json.dumps(log.stats(), indent=2))
+        return
+    t0 = time.perf_counter()
+    n = 0
+    for ev in log.search(args.user, args.since, args.until, args.session, args.q, args.limit):
+        n += 1
+        print(f"{ev.get('timestamp', '')[:19]}  {ev.get('user', ''):<12} {ev.get('type', ''):<14} {ev.get('message', '')}")
+    print(f"— {n} résultat(s) en {(time.perf_counter() - t0) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
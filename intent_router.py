@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+KITT — Routeur d'intentions : une seule passe regex par message.
+
+Remplace les scans successifs (_FUNC_PATTERNS, VISION_KEYWORDS, _MEMORY_EXTRACT,
+_MEMORY_FORGET, _PRIVATE_ENTITIES, déclencheurs de recherche web) par une regex
+combinée à groupes nommés, parcourue une seule fois (finditer, débuts de mot
+seulement). finditer ne rend que des matchs disjoints : l'intérieur de chaque
+zone consommée est ensuite reparcouru (« qu'est-ce que la caméra » : vision
+commence dans le match de search_whatis). Chaque règle alimente une ou plusieurs intentions avec
+un score de confiance ; les scores d'une même intention se combinent
+(1 - Π(1 - c)) et chaque intention a son seuil.
+
+Intentions :
+    func:time  func:date  func:system  func:weather  func:timer
+    vision  memory  forget  private  search
+
+Usage :
+    venv/bin/python3 intent_router.py "quelle est la météo à Arlon ?"
+    venv/bin/python3 intent_router.py --benchmark
+"""
+
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+
+# (nom de règle, motif en minuscules, {intention: confiance})
+# Chaque règle compte au plus une fois par message (premier match).
+RULES = [
+    # Entités privées : jamais de recherche web (homonymes)
+    ("private", r"\b(?:mario\s*ravasi|za\s*elettronica|manix|emmanuel\s*gelinne|kyronex|kitt\s*franco|"
+                r"start_kyronex|kyronex_server)\b", {"private": 1.0}),
+    # Commandes directes (sans LLM)
+    ("time", r"\b(?:quelle heure|heure est.il|l.heure)\b", {"func:time": 0.9}),
+    ("date", r"\b(?:quel(?:le)? date|date (?:d')?aujourd|on est quel jour|quel jour)\b", {"func:date": 0.9}),
+    ("system", r"\b(?:état (?:du )?syst[eè]me|état système|status syst|diagnostic|tes capteurs|"
+               r"ta sant[ée]|comment (?:tu )?vas.tu)\b", {"func:system": 0.9}),
+    ("weather", r"\b(?:m[eé]t[eé]o|temps\s+qu.il\s+fait)\b", {"func:weather": 0.9, "search": 0.9}),
+    ("weather_func", r"\b(?:temps dehors|temp[eé]rature ext[eé]rieure|fera.t.il)\b", {"func:weather": 0.9}),
+    ("timer", r"\b(?:mets? (?:un )?)?timer?\s*(?:de\s+)?(?P<timer_n>\d+)\s*(?P<timer_unit>min|sec|minute|seconde)",
+     {"func:timer": 1.0}),
+    # Vision
+    ("vision", r"\b(?:qu.?est.ce que tu vois|qu.?est.ce que je porte|qu.?est.ce que je tiens|"
+               r"regarde.moi|devant toi|camera|caméra|"
+               r"comment je suis habill|de quelle couleur|tu me vois|tu vois quoi|"
+               r"décris.moi|décris ce que|analyse.moi|scanne|scanner)\b", {"vision": 0.9}),
+    # Mémoire
+    ("forget", r"(?:oublie|efface|supprime|retire).*?(?:mémoire|souvenir|tu sais sur moi)", {"forget": 1.0}),
+    ("memory_strong", r"(?:je m.appelle|mon (?:nom|prénom) (?:est|c.est)|"
+                      r"souviens.toi|retiens|n.oublie pas|rappelle.toi)", {"memory": 0.9}),
+    ("memory", r"(?:j.aime|j.adore|je déteste|je préfère|"
+               r"je suis|j.habite|je travaille|"
+               r"mon (?:chat|chien|animal|voiture|métier|travail|hobby|passion)|"
+               r"ma (?:femme|copine|fille|mère|soeur|voiture|maison|passion))", {"memory": 0.6}),
+    # Recherche web — indices forts (actualité, chiffres qui changent)
+    ("search_news", r"\b(?:actualit[eé]s?|news|en\s+ce\s+moment|champion[s]?\s+du\s+monde|[eé]l[eé]ction[s]?|"
+                    r"qui\s+a\s+gagn[eé]|score|classement|top\s+\d|"
+                    r"film[s]?\s+du\s+moment|s[eé]rie[s]?\s+populaire)\b", {"search": 0.85}),
+    ("search_price", r"\b(?:prix\s+d[ue]|combien\s+co[uû]te|sortie\s+de|derni[eè]re?\s+version)\b", {"search": 0.8}),
+    # Indices faibles : fréquents dans des phrases ordinaires, seuls ils ne valent
+    # qu'une recherche spéculative (maybe) ; combinés ils deviennent forts
+    ("search_when", r"\b(?:aujourd.hui|ce\s+(?:soir|matin|midi|week.end))\b", {"search": 0.5}),
+    ("search_recent", r"\b(?:nouvelles?|r[eé]cente?s?|r[eé]cemment|vient\s+de|r[eé]sultats?)\b", {"search": 0.5}),
+    ("search_best", r"\bquel(?:le)?s?\s+(?:est|sont)\s+les?\s+(?:meilleur|derni|nouveau|principal)", {"search": 0.45}),
+    ("search_define", r"\b(?:d[eé]finition\s+d[eu']|wikip[eé]dia)", {"search": 0.45}),
+    # « qu'est-ce que la photosynthèse » oui, « qu'est-ce que tu fais » non
+    ("search_whatis", r"\bqu.est.ce\s+qu(?:e|')\s*(?:la|le|les|l'|un|une|des)\s*[a-zà-ÿ]{3,}", {"search": 0.4}),
+    ("search_explain", r"\bexplique.moi\b", {"search": 0.35}),
+]
+
+THRESHOLDS = {"search": 0.3, "memory": 0.5}
+DEFAULT_THRESHOLD = 0.5
+SEARCH_STRONG = 0.7          # au-dessus : le web est indispensable (on l'attend)
+FUNCTION_PRIORITY = ("func:time", "func:date", "func:system", "func:weather", "func:timer")
+
+
+@dataclass
+class Intent:
+    name: str
+    confidence: float
+    rules: list[str] = field(default_factory=list)
+    match: re.Match | None = None      # premier match (groupes nommés du timer)
+
+
+@dataclass
+class IntentResult:
+    intents: dict[str, Intent]
+
+    def has(self, name: str) -> bool:
+        intent = self.intents.get(name)
+        return intent is not None and intent.confidence >= THRESHOLDS.get(name, DEFAULT_THRESHOLD)
+
+    def confidence(self, name: str) -> float:
+        intent = self.intents.get(name)
+        return intent.confidence if intent else 0.0
+
+    def function(self) -> tuple[str | None, re.Match | None]:
+        """(type, match) de la commande directe prioritaire, ou (None, None)."""
+        for name in FUNCTION_PRIORITY:
+            if self.has(name):
+                return name.split(":", 1)[1], self.intents[name].match
+        return None, None
+
+    def web_relevance(self) -> str:
+        """'strong' (attendre le web), 'maybe' (spéculatif) ou 'none'."""
+        if not self.has("search"):
+            return "none"
+        return "strong" if self.confidence("search") >= SEARCH_STRONG else "maybe"
+
+    def labels(self) -> set[str]:
+        return {name for name in self.intents if self.has(name)}
+
+
+class IntentRouter:
+    """Regex combinée : un match par message, toutes les intentions d'un coup."""
+
+    def __init__(self, rules=RULES):
+        self._targets = {}
+        parts = []
+        for name, pattern, targets in rules:
+            parts.append(f"(?P<{name}>{pattern})")
+            self._targets[name] = targets
+        # \b en tête : hors début de mot, une seule vérification au lieu d'essayer chaque règle.
+        # Motifs en minuscules, appliqués au message passé en minuscules (plus rapide que re.I)
+        self._regex = re.compile(r"\b(?:" + "|".join(parts) + ")")
+        self.counters: dict[str, int] = {"messages": 0}
+        self._route_us = 0.0
+
+    def route(self, text: str) -> IntentResult:
+        t0 = time.perf_counter()
+        intents: dict[str, Intent] = {}
+        found: dict[str, re.Match] = {}
+        spans = []
+        text = text.lower()
+        for m in self._regex.finditer(text):
+            found.setdefault(m.lastgroup, m)
+            spans.append(m.span())
+        # Une règle qui commence (et finit) DANS une zone déjà consommée échappe à finditer
+        for start, end in spans:
+            for m in self._regex.finditer(text, start + 1, end):
+                found.setdefault(m.lastgroup, m)
+        for rule, targets in self._targets.items():
+            m = found.get(rule)
+            if m is None:
+                continue
+            for name, conf in targets.items():
+                intent = intents.get(name)
+                if intent is None:
+                    intents[name] = Intent(name, conf, [rule], m)
+                else:
+                    intent.confidence = 1.0 - (1.0 - intent.confidence) * (1.0 - conf)
+                    intent.rules.append(rule)
+        result = IntentResult(intents)
+        self.counters["messages"] += 1
+        for name in result.labels():
+            self.counters[name] = self.counters.get(name, 0) + 1
+        self._route_us += (time.perf_counter() - t0) * 1e6
+        return result
+
+    def stats(self) -> dict:
+        n = self.counters["messages"]
+        return {"counters": dict(self.counters),
+                "avg_route_us": round(self._route_us / n, 1) if n else 0.0}
+
+
+def main():
+    router = IntentRouter()
+    if "--benchmark" in sys.argv:
+        from test_intent_router import FIXTURE
+        texts = [t for t, _ in FIXTURE]
+        t0 = time.perf_counter()
+        rounds = 200
+        for _ in range(rounds):
+            for t in texts:
+                router.route(t)
+        us = (time.perf_counter() - t0) * 1e6 / (rounds * len(texts))
+        separate = [re.compile(p, re.I) for _, p, _ in RULES]
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for t in texts:
+                for r in separate:
+                    r.search(t)
+        ref = (time.perf_counter() - t0) * 1e6 / (rounds * len(texts))
+        print(f"{len(texts)} phrases × {rounds} — {us:.1f}µs/message (une recherche par règle : {ref:.1f}µs)")
+        return
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    res = router.route(" ".join(sys.argv[1:]))
+    for intent in res.intents.values():
+        flag = "✓" if res.has(intent.name) else "·"
+        print(f"{flag} {intent.name:<13} {intent.confidence:.2f}  {', '.join(intent.rules)}")
+    print(f"web: {res.web_relevance()}  fonction: {res.function()[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+"""
+KITT — Base SQLite unique (WAL) pour utilisateurs, connexions, mémoire et conversations.
+
+Remplace les fichiers JSON réécrits en entier à chaque modification
+(users.json, conn_stats.json, memory.json, user_memories/*.json, conv_data/conv_users.json)
+par des INSERT/UPSERT indexés. Toutes les requêtes passent par un thread
+dédié qui possède la connexion : la boucle asyncio n'attend jamais le disque.
+
+    db = KittDB(BASE_DIR / "kitt.db")
+    db.execute(insert_connection, *row)         # fire-and-forget (écriture)
+    mem = await db.run(load_memory, key)        # lecture depuis un handler
+    users = db.call(load_users)                 # synchrone (boot)
+
+L'historique des connexions est en ajout seul et sans plafond ; les agrégats
+(visiteurs, sessions uniques par heure) sont mis à jour à chaque ajout et
+rechargés en RAM au boot (ConnectionAggregates) sans relire l'historique.
+
+Les anciens fichiers sont importés une seule fois (migrate) et restent en place ;
+export_legacy() regénère des fichiers au format historique (sauvegardes, outils).
+
+Usage :
+    venv/bin/python3 kitt_db.py --migrate        # import one-shot des fichiers JSON/texte
+    venv/bin/python3 kitt_db.py --export DIR     # export au format historique
+    venv/bin/python3 kitt_db.py --stats          # nombre de lignes par table
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import json
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+DB_FILE = BASE_DIR / "kitt.db"
+GLOBAL_MEMORY_KEY = "_global"   # ancienne mémoire globale (memory.json) dans facts
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS users (
+    mac     TEXT PRIMARY KEY,
+    name    TEXT NOT NULL DEFAULT '',
+    lang    TEXT NOT NULL DEFAULT '',
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS connections (
+    id         INTEGER PRIMARY KEY,
+    ts         REAL NOT NULL,
+    ip         TEXT,
+    mac        TEXT,
+    name       TEXT,
+    lang       TEXT,
+    session_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_connections_ts  ON connections(ts);
+CREATE INDEX IF NOT EXISTS idx_connections_mac ON connections(mac, ts);
+-- Agrégats maintenus à chaque INSERT de connexion (jamais recalculés depuis l'historique)
+CREATE TABLE IF NOT EXISTS visitors (
+    key        TEXT PRIMARY KEY,   -- MAC, ou IP si MAC inconnue
+    mac        TEXT,
+    ip         TEXT,
+    name       TEXT,
+    lang       TEXT,
+    first_seen REAL,
+    last_seen  REAL,
+    visits     INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS hourly_sessions (
+    hour    INTEGER NOT NULL,      -- int(ts // 3600)
+    session TEXT NOT NULL,
+    PRIMARY KEY (hour, session)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS facts (
+    id   INTEGER PRIMARY KEY,
+    mac  TEXT NOT NULL,
+    fact TEXT NOT NULL,
+    user TEXT,
+    date TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_facts_mac ON facts(mac, id);
+CREATE TABLE IF NOT EXISTS summaries (
+    id   INTEGER PRIMARY KEY,
+    mac  TEXT NOT NULL,
+    date TEXT,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_summaries_mac ON summaries(mac, id);
+CREATE TABLE IF NOT EXISTS conv_users (
+    uid        TEXT PRIMARY KEY,
+    name       TEXT NOT NULL,
+    created_at TEXT,
+    conv_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS turns (
+    id         INTEGER PRIMARY KEY,
+    ts         REAL NOT NULL,
+    user       TEXT NOT NULL,      -- nom sûr (_conv_safe), comme les dossiers de conversations/
+    session_id TEXT,
+    role       TEXT NOT NULL,      -- 'user' | 'assistant'
+    content    TEXT NOT NULL,
+    source     TEXT                -- fichier d'origine (migration / sauvegarde manuelle)
+);
+CREATE INDEX IF NOT EXISTS idx_turns_user ON turns(user, ts);
+"""
+
+
+class KittDB:
+    """Connexion SQLite possédée par un thread dédié ; file de travaux (fn, args)."""
+
+    def __init__(self, path: Path = DB_FILE):
+        self.path = path
+        self._jobs: queue.Queue = queue.Queue()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._worker, name="kitt-db", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _worker(self):
+        conn = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._ready.set()
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            fn, args, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                conn.execute("BEGIN")
+                result = fn(conn, *args)
+                conn.execute("COMMIT")
+                future.set_result(result)
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                future.set_exception(e)
+        conn.close()
+
+    def execute(self, fn, *args) -> concurrent.futures.Future:
+        """Planifie fn(conn, *args) dans une transaction ; erreurs journalisées."""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        future.add_done_callback(_log_failure)
+        self._jobs.put((fn, args, future))
+        return future
+
+    async def run(self, fn, *args):
+        """Version awaitable de execute() pour les handlers."""
+        return await asyncio.wrap_future(self.execute(fn, *args))
+
+    def call(self, fn, *args):
+        """Version bloquante (boot, CLI, threads de l'executor)."""
+        return self.execute(fn, *args).result()
+
+    def close(self):
+        self._jobs.put(None)
+        self._thread.join(timeout=5)
+
+
+def _log_failure(future: concurrent.futures.Future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"[DB] Erreur: {future.exception()}", flush=True)
+
+
+# ══════════════════════════════════════════════════════════════
+# Opérations (exécutées dans le thread DB : premier argument = conn)
+# ══════════════════════════════════════════════════════════════
+
+def load_users(conn) -> dict:
+    """{mac: {"name", "lang"}} — même forme que l'ancien users.json."""
+    users = {}
+    for r in conn.execute("SELECT mac, name, lang FROM users"):
+        u = {"name": r["name"]}
+        if r["lang"]:
+            u["lang"] = r["lang"]
+        users[r["mac"]] = u
+    return users
+
+
+def upsert_user(conn, mac: str, name: str, lang: str):
+    conn.execute(
+        "INSERT INTO users(mac, name, lang, updated) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(mac) DO UPDATE SET name=excluded.name, lang=excluded.lang, updated=excluded.updated",
+        (mac, name or "", lang or "", time.time()))
+
+
+HOURLY_RETENTION_H = 8 * 24    # buckets horaires conservés (fenêtre 7 j + marge)
+RECENT_IPS = 10
+
+
+def _visitor_key(mac: str, ip: str) -> str:
+    return mac or ip or "?"
+
+
+def _session_key(session_id: str, ip: str) -> str:
+    return session_id or ip or "?"
+
+
+def _update_aggregates(conn, ts: float, ip: str, mac: str, name: str, lang: str, session_id: str):
+    conn.execute(
+        "INSERT INTO visitors(key, mac, ip, name, lang, first_seen, last_seen, visits) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, 1) "
+        "ON CONFLICT(key) DO UPDATE SET visits = visits + 1, "
+        "first_seen = MIN(first_seen, excluded.first_seen), "
+        "name = CASE WHEN excluded.last_seen >= last_seen AND excluded.name != '' THEN excluded.name ELSE name END, "
+        "lang = CASE WHEN excluded.last_seen >= last_seen AND excluded.lang != '' THEN excluded.lang ELSE lang END, "
+        "ip = CASE WHEN excluded.last_seen >= last_seen AND excluded.ip != '' THEN excluded.ip ELSE ip END, "
+        "mac = CASE WHEN excluded.last_seen >= last_seen THEN excluded.mac ELSE mac END, "
+        "last_seen = MAX(last_seen, excluded.last_seen)",
+        (_visitor_key(mac, ip), mac or "", ip or "", name or "", lang or "", ts, ts))
+    conn.execute("INSERT OR IGNORE INTO hourly_sessions(hour, session) VALUES (?, ?)",
+                 (int(ts // 3600), _session_key(session_id, ip)))
+
+
+def insert_connection(conn, ts: float, ip: str, mac: str, name: str, lang: str, session_id: str) -> int:
+    """Ajout O(1) : ligne d'historique + mise à jour des agrégats (visiteur, bucket horaire)."""
+    cur = conn.execute(
+        "INSERT INTO connections(ts, ip, mac, name, lang, session_id) VALUES (?, ?, ?, ?, ?, ?)",
+        (ts, ip, mac, name, lang, session_id))
+    _update_aggregates(conn, ts, ip, mac, name, lang, session_id)
+    conn.execute("DELETE FROM hourly_sessions WHERE hour < ?", (int(ts // 3600) - HOURLY_RETENTION_H,))
+    return cur.lastrowid
+
+
+def rebuild_aggregates(conn) -> int:
+    """Reconstruit visitors + hourly_sessions depuis l'historique (migration, une seule fois)."""
+    conn.execute("DELETE FROM visitors")
+    conn.execute("DELETE FROM hourly_sessions")
+    n = 0
+    for r in conn.execute("SELECT ts, ip, mac, name, lang, session_id FROM connections ORDER BY id").fetchall():
+        _update_aggregates(conn, r["ts"], r["ip"], r["mac"], r["name"], r["lang"], r["session_id"])
+        n += 1
+    horizon = int(time.time() // 3600) - HOURLY_RETENTION_H
+    conn.execute("DELETE FROM hourly_sessions WHERE hour < ?", (horizon,))
+    conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('aggregates_v1', ?)", (datetime.now().isoformat(),))
+    return n
+
+
+class ConnectionAggregates:
+    """Agrégats de connexion en RAM : /api/stats et /api/visitors sans parcourir l'historique.
+
+    - visiteurs par MAC/IP (première/dernière visite, nb de visites, infos récentes)
+    - sessions uniques exactes par bucket horaire (ensembles), fenêtres 24 h / 7 j
+    - dernières IP distinctes
+    """
+
+    def __init__(self):
+        self.visitors: dict[str, dict] = {}
+        self.hourly: dict[int, set] = collections.defaultdict(set)
+        self.recent_ips: collections.OrderedDict = collections.OrderedDict()
+
+    def record(self, ts: float, ip: str, mac: str, name: str, lang: str, session_id: str):
+        key = _visitor_key(mac, ip)
+        v = self.visitors.get(key)
+        if v is None:
+            v = self.visitors[key] = {"mac": mac or "", "ip": ip or "?", "name": name or "Inconnu",
+                                      "lang": lang or "?", "first_seen": ts, "last_seen": ts, "visits": 0}
+        v["first_seen"] = min(v["first_seen"], ts)
+        if ts >= v["last_seen"]:
+            v["last_seen"] = ts
+            v["mac"] = mac or ""
+            if name:
+                v["name"] = name
+            if lang:
+                v["lang"] = lang
+            if ip:
+                v["ip"] = ip
+        v["visits"] += 1
+        hour = int(ts // 3600)
+        self.hourly[hour].add(_session_key(session_id, ip))
+        for old in [h for h in self.hourly if h < hour - HOURLY_RETENTION_H]:
+            del self.hourly[old]
+        if ip:
+            self.recent_ips.pop(ip, None)
+            self.recent_ips[ip] = ts
+            while len(self.recent_ips) > RECENT_IPS:
+                self.recent_ips.popitem(last=False)
+
+    def uniques(self, now: float, hours: int) -> int:
+        """Sessions uniques sur les `hours` derniers buckets horaires (heure courante incluse)."""
+        current = int(now // 3600)
+        seen = set()
+        for h in range(current - hours + 1, current + 1):
+            seen |= self.hourly.get(h, set())
+        return len(seen)
+
+    def stats(self, now: float) -> dict:
+        return {"last_24h": self.uniques(now, 24), "last_7d": self.uniques(now, 24 * 7),
+                "recent_ips": list(reversed(self.recent_ips))}
+
+    def visitor_list(self) -> list[dict]:
+        return sorted((dict(v) for v in self.visitors.values()), key=lambda x: x["last_seen"], reverse=True)
+
+
+def load_aggregates(conn) -> ConnectionAggregates:
+    """Charge les agrégats persistés : O(visiteurs + sessions des 8 derniers jours)."""
+    if not conn.execute("SELECT 1 FROM meta WHERE key = 'aggregates_v1'").fetchone():
+        rebuild_aggregates(conn)
+    agg = ConnectionAggregates()
+    for r in conn.execute("SELECT key, mac, ip, name, lang, first_seen, last_seen, visits FROM visitors"):
+        agg.visitors[r["key"]] = {"mac": r["mac"] or "", "ip": r["ip"] or "?", "name": r["name"] or "Inconnu",
+                                  "lang": r["lang"] or "?", "first_seen": r["first_seen"],
+                                  "last_seen": r["last_seen"], "visits": r["visits"]}
+    horizon = int(time.time() // 3600) - HOURLY_RETENTION_H
+    for r in conn.execute("SELECT hour, session FROM hourly_sessions WHERE hour >= ?", (horizon,)):
+        agg.hourly[r["hour"]].add(r["session"])
+    rows = conn.execute("SELECT ip, ts FROM connections WHERE ip != '' ORDER BY id DESC LIMIT 200").fetchall()
+    for r in reversed(rows):
+        agg.recent_ips.pop(r["ip"], None)
+        agg.recent_ips[r["ip"]] = r["ts"]
+    while len(agg.recent_ips) > RECENT_IPS:
+        agg.recent_ips.popitem(last=False)
+    return agg
+
+
+def load_memory(conn, mac: str) -> dict:
+    facts = [{"fact": r["fact"], "user": r["user"], "date": r["date"]} for r in conn.execute(
+        "SELECT fact, user, date FROM facts WHERE mac = ? ORDER BY id", (mac,))]
+    summaries = [{"date": r["date"], "text": r["text"]} for r in conn.execute(
+        "SELECT date, text FROM summaries WHERE mac = ? ORDER BY id", (mac,))]
+    return {"facts": facts, "summaries": summaries}
+
+
+def save_memory(conn, mac: str, mem: dict):
+    """Remplace le profil d'un utilisateur (≤ 55 lignes : 50 faits + 5 résumés)."""
+    conn.execute("DELETE FROM facts WHERE mac = ?", (mac,))
+    conn.execute("DELETE FROM summaries WHERE mac = ?", (mac,))
+    conn.executemany("INSERT INTO facts(mac, fact, user, date) VALUES (?, ?, ?, ?)",
+                     [(mac, f.get("fact", ""), f.get("user", ""), f.get("date", "")) for f in mem.get("facts", [])])
+    conn.executemany("INSERT INTO summaries(mac, date, text) VALUES (?, ?, ?)",
+                     [(mac, s.get("date", ""), s.get("text", "")) for s in mem.get("summaries", [])])
+
+
+def load_global_memory(conn) -> dict:
+    """Ancienne mémoire globale : faits sous GLOBAL_MEMORY_KEY, préférences dans meta."""
+    row = conn.execute("SELECT value FROM meta WHERE key = 'global_preferences'").fetchone()
+    return {"facts": load_memory(conn, GLOBAL_MEMORY_KEY)["facts"],
+            "preferences": json.loads(row[0]) if row else {}}
+
+
+def save_global_memory(conn, mem: dict):
+    facts = [f if isinstance(f, dict) else {"fact": str(f)} for f in mem.get("facts", [])]
+    save_memory(conn, GLOBAL_MEMORY_KEY, {"facts": facts, "summaries": []})
+    conn.execute("INSERT INTO meta(key, value) VALUES ('global_preferences', ?) "
+                 "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                 (json.dumps(mem.get("preferences", {}), ensure_ascii=False),))
+
+
+def load_conv_users(conn) -> dict:
+    return {r["uid"]: {"name": r["name"], "created_at": r["created_at"], "conv_count": r["conv_count"]}
+            for r in conn.execute("SELECT uid, name, created_at, conv_count FROM conv_users")}
+
+
+def upsert_conv_user(conn, uid: str, user: dict):
+    conn.execute(
+        "INSERT INTO conv_users(uid, name, created_at, conv_count) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(uid) DO UPDATE SET name=excluded.name, created_at=excluded.created_at, "
+        "conv_count=excluded.conv_count",
+        (uid, user.get("name", ""), user.get("created_at"), user.get("conv_count", 0)))
+
+
+def insert_turns(conn, rows: list[tuple]):
+    """rows = [(ts, user, session_id, role, content, source)]."""
+    conn.executemany(
+        "INSERT INTO turns(ts, user, session_id, role, content, source) VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+
+def table_counts(conn) -> dict:
+    return {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+            for t in ("users", "connections", "facts", "summaries", "conv_users", "turns")}
+
+
+# ══════════════════════════════════════════════════════════════
+# Migration one-shot + export au format historique
+# ══════════════════════════════════════════════════════════════
+
+_TURN_LINE = re.compile(r"^\[([^\]]*)\]\s+([^:]+):\s?(.*)$")
+
+
+def _read_json(path: Path, default):
+    try:
+        return json.loads(path.read_text()) if path.exists() else default
+    except Exception as e:
+        print(f"[DB] {path.name} illisible ({e}) — ignoré", flush=True)
+        return default
+
+
+def _conv_file_ts(path: Path, hhmm: str) -> float:
+    """Horodatage d'une ligne « [HH:MM] » d'un fichier conv_YYYY-MM-DD[_HH-MM].txt."""
+    m = re.search(r"(\d{4}-\d{2}-\d{2})", path.name)
+    day = m.group(1) if m else datetime.fromtimestamp(path.stat().st_mtime).strftime("%Y-%m-%d")
+    for fmt, value in (("%Y-%m-%d %H:%M", f"{day} {hhmm}"), ("%Y-%m-%d", day)):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    return path.stat().st_mtime
+
+
+def migrate(conn, base_dir: Path = BASE_DIR) -> dict | None:
+    """Importe les fichiers historiques une seule fois (un marqueur meta par étape)."""
+    counts = {}
+    if not conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_at'").fetchone():
+        _migrate_files(conn, base_dir, counts)
+    # Étape ajoutée après coup : aussi exécutée sur une base déjà migrée
+    if not conn.execute("SELECT 1 FROM meta WHERE key = 'memory_migrated_at'").fetchone():
+        mem = _read_json(base_dir / "memory.json", {})
+        save_global_memory(conn, mem if isinstance(mem, dict) else {})
+        counts["global_facts"] = len(mem.get("facts", [])) if isinstance(mem, dict) else 0
+        conn.execute("INSERT INTO meta(key, value) VALUES ('memory_migrated_at', ?)",
+                     (datetime.now().isoformat(),))
+    return counts or None
+
+
+def _migrate_files(conn, base_dir: Path, counts: dict):
+
+    users = _read_json(base_dir / "users.json", {})
+    for mac, u in users.items():
+        u = u if isinstance(u, dict) else {"name": u}
+        upsert_user(conn, mac, u.get("name", ""), u.get("lang", ""))
+    counts["users"] = len(users)
+
+    conns = _read_json(base_dir / "conn_stats.json", {}).get("connections", [])
+    conn.executemany(
+        "INSERT INTO connections(ts, ip, mac, name, lang, session_id) VALUES (?, ?, ?, ?, ?, ?)",
+        [(c.get("ts", 0), c.get("ip", ""), c.get("mac", ""), c.get("name", ""),
+          c.get("lang", ""), c.get("session_id", "")) for c in conns])
+    counts["connections"] = len(conns)
+
+    n_mem = 0
+    for f in sorted((base_dir / "user_memories").glob("*.json")):
+        mem = _read_json(f, None)
+        if isinstance(mem, dict):
+            # Le nom de fichier est la clé sûre de la MAC (':' → '_'), on le garde tel quel
+            save_memory(conn, f.stem, mem)
+            n_mem += 1
+    counts["user_memories"] = n_mem
+
+    conv_users = _read_json(base_dir / "conv_data" / "conv_users.json", {})
+    for uid, u in conv_users.items():
+        upsert_conv_user(conn, uid, u)
+    counts["conv_users"] = len(conv_users)
+
+    rows = []
+    for f in sorted((base_dir / "conv_data" / "conversations").glob("*/conv_*.txt")):
+        try:
+            lines = f.read_text(encoding="utf-8", errors="replace").splitlines()
+        except OSError:
+            continue
+        for line in lines:
+            m = _TURN_LINE.match(line)
+            if not m:
+                continue
+            role = "assistant" if m.group(2).strip() == "KITT" else "user"
+            rows.append((_conv_file_ts(f, m.group(1)), f.parent.name, None, role,
+                         m.group(3), f"{f.parent.name}/{f.name}"))
+    insert_turns(conn, rows)
+    counts["turns"] = len(rows)
+
+    conn.execute("INSERT INTO meta(key, value) VALUES ('migrated_at', ?)", (datetime.now().isoformat(),))
+
+
+def export_legacy(conn, out_dir: Path) -> list[str]:
+    """Écrit users.json, conn_stats.json, memory.json, user_memories/*.json et conv_users.json dans out_dir."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+
+    def dump(path: Path, data, indent=2):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, indent=indent, ensure_ascii=False))
+        written.append(str(path.relative_to(out_dir)))
+
+    dump(out_dir / "users.json", load_users(conn))
+    conns = [dict(r) for r in conn.execute(
+        "SELECT ts, ip, mac, name, lang, session_id FROM connections ORDER BY id")]
+    dump(out_dir / "conn_stats.json", {"connections": conns}, indent=None)
+    dump(out_dir / "memory.json", load_global_memory(conn))
+    macs = {r[0] for r in conn.execute("SELECT mac FROM facts UNION SELECT mac FROM summaries")}
+    macs.discard(GLOBAL_MEMORY_KEY)
+    for mac in sorted(macs):
+        key = re.sub(r'[^a-zA-Z0-9_\-]', '_', mac)
+        dump(out_dir / "user_memories" / f"{key}.json", load_memory(conn, mac))
+    dump(out_dir / "conv_data" / "conv_users.json", load_conv_users(conn))
+    return written
+
+
+def main():
+    db = KittDB()
+    if "--migrate" in sys.argv:
+        counts = db.call(migrate, BASE_DIR)
+        print(f"Migration : {counts}" if counts is not None else "Déjà migré (meta.migrated_at).")
+    elif "--export" in sys.argv:
+        i = sys.argv.index("--export")
+        out = Path(sys.argv[i + 1]) if len(sys.argv) > i + 1 else BASE_DIR / "db_export"
+        for name in db.call(export_legacy, out):
+            print(f"  {out / name}")
+    elif "--stats" in sys.argv:
+        for table, n in db.call(table_counts).items():
+            print(f"{table:<12}{n:>8}")
+    else:
+        print(__doc__)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
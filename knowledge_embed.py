@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+KITT — Recherche sémantique CPU pour le RAG local (optionnelle).
+
+Petit modèle multilingue d'embeddings de phrases (ONNX) exécuté sur CPU via
+onnxruntime. Les vecteurs des chunks sont précalculés, stockés en float16
+(clé = hash du texte du chunk) et interrogés par un seul produit
+matriciel NumPy en float32. Sur disque : .npy relu en mmap + manifeste JSON remplacé atomiquement.
+Les rangs sont fusionnés avec BM25 (reciprocal-rank fusion).
+
+Modèle attendu (désactivé proprement s'il est absent) :
+    models/paraphrase-multilingual-MiniLM-L12-v2/model.onnx
+    models/paraphrase-multilingual-MiniLM-L12-v2/tokenizer.json
+    (export ONNX de sentence-transformers, dépendance Python : tokenizers)
+
+Usage :
+    venv/bin/python3 knowledge_embed.py --benchmark   # BM25 vs dense vs hybride
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent
+EMBED_MODEL_DIR = Path(os.environ.get(
+    "KYRONEX_EMBED_MODEL", BASE_DIR / "models" / "paraphrase-multilingual-MiniLM-L12-v2"))
+EMBED_THREADS = 2          # threads CPU onnxruntime (les autres cœurs restent à llama.cpp)
+EMBED_MAX_TOKENS = 256
+EMBED_BATCH = 16
+RRF_K = 60                 # constante classique de la reciprocal-rank fusion
+RRF_DEPTH = 30             # profondeur des listes fusionnées
+DENSE_MIN_SIM = 0.35       # similarité cosinus minimale d'un chunk retenu par le dense seul
+
+
+class SentenceEncoder:
+    """Encodeur ONNX (mean pooling + normalisation L2) sur CPUExecutionProvider."""
+
+    def __init__(self, model_dir: Path = EMBED_MODEL_DIR):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.name = model_dir.name
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(EMBED_MAX_TOKENS)
+        self.tokenizer.enable_padding()
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = EMBED_THREADS
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(model_dir / "model.onnx"), sess_options=opts,
+                                            providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+        self.dim = int(self.encode(["test"]).shape[1])
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """Textes → matrice (n, dim) float32 normalisée."""
+        out = []
+        for i in range(0, len(texts), EMBED_BATCH):
+            enc = self.tokenizer.encode_batch(texts[i:i + EMBED_BATCH])
+            ids = np.array([e.ids for e in enc], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in enc], dtype=np.int64)
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self._inputs:
+                feeds["token_type_ids"] = np.zeros_like(ids)
+            hidden = self.session.run(None, feeds)[0]
+            m = mask[..., None].astype(np.float32)
+            vec = (hidden * m).sum(axis=1) / np.maximum(m.sum(axis=1), 1e-6)
+            out.append(vec / np.maximum(np.linalg.norm(vec, axis=1, keepdims=True), 1e-6))
+        if not out:
+            return np.zeros((0, getattr(self, "dim", 0)), dtype=np.float32)
+        return np.concatenate(out).astype(np.float32)
+
+
+def load_encoder(model_dir: Path = EMBED_MODEL_DIR) -> SentenceEncoder | None:
+    """Charge l'encodeur si le modèle et les dépendances sont présents, sinon None."""
+    if not (model_dir / "model.onnx").exists() or not (model_dir / "tokenizer.json").exists():
+        return None
+    try:
+        return SentenceEncoder(model_dir)
+    except Exception as e:
+        print(f"[RAG] Encodeur sémantique indisponible: {e}")
+        return None
+
+
+def chunk_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class VectorStore:
+    """Vecteurs des chunks, clé = hash du texte : float16 sur disque, float32 en RAM.
+
+    NumPy n'a pas de GEMV BLAS en float16 (produit ~30× plus lent qu'en
+    float32) : la matrice interrogée est une copie float32 du .npy. Sur disque : un .npy par génération (nom unique, relu en mmap) et un
+    manifeste JSON (clés + nom du .npy). Le manifeste est écrit à côté puis
+    remplacé d'un seul os.replace : c'est le seul point de bascule, un arrêt
+    brutal laisse l'ancienne génération ou la nouvelle, jamais des lignes
+    attribuées aux mauvais chunks.
+    """
+
+    def __init__(self, encoder: SentenceEncoder, cache_dir: Path | None):
+        self.encoder = encoder
+        self.path = cache_dir / f"embeddings-{encoder.name}.json" if cache_dir else None
+        self.keys: list[str] = []
+        self.matrix = np.zeros((0, encoder.dim), dtype=np.float32)
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            manifest = json.loads(self.path.read_text())
+            matrix = np.load(self.path.parent / manifest["vectors"], mmap_mode="r")
+            keys = manifest["keys"]
+            if len(keys) == len(matrix) and matrix.shape[1] == encoder.dim:
+                self.keys, self.matrix = keys, np.asarray(matrix, dtype=np.float32)
+        except Exception as e:
+            print(f"[RAG] Cache embeddings ignoré: {e}")
+
+    def vectors_for(self, texts) -> np.ndarray:
+        """Matrice (n, dim) float32 alignée sur texts ; n'encode que les chunks inconnus."""
+        row_of = {k: i for i, k in enumerate(self.keys)}
+        keys = [chunk_key(texts[i]) for i in range(len(texts))]
+        missing = [i for i, k in enumerate(keys) if k not in row_of]
+        if not missing and len(keys) == len(self.keys) and keys == self.keys:
+            return self.matrix
+        new = self.encoder.encode([texts[i] for i in missing]).astype(np.float16)
+        out = np.empty((len(keys), self.encoder.dim), dtype=np.float32)
+        for j, i in enumerate(missing):
+            out[i] = new[j]
+        for i, k in enumerate(keys):
+            if k in row_of:
+                out[i] = self.matrix[row_of[k]]
+        self.keys, self.matrix = keys, out
+        if self.path:
+            try:
+                self._save(keys, out)
+            except Exception as e:
+                print(f"[RAG] Sauvegarde embeddings impossible: {e}")
+        return self.matrix
+
+    def _save(self, keys: list[str], matrix: np.ndarray):
+        """Nouvelle génération : .npy inédit, puis bascule du manifeste, puis ménage."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        vectors = self.path.with_name(f"{self.path.stem}-{time.time_ns():x}.npy")
+        np.save(vectors, matrix.astype(np.float16))
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"vectors": vectors.name, "keys": keys}))
+        os.replace(tmp, self.path)
+        for old in self.path.parent.glob(f"{self.path.stem}-*.npy"):
+            if old != vectors:
+                old.unlink(missing_ok=True)
+
+
+def dense_scores(matrix: np.ndarray, query_vec: np.ndarray) -> np.ndarray:
+    """Similarité cosinus de tous les chunks (vecteurs déjà normalisés)."""
+    return matrix @ np.asarray(query_vec, dtype=np.float32)
+
+
+def rrf_fuse(rankings: list[list[int]], k: int = RRF_K) -> list[tuple[float, int]]:
+    """Reciprocal-rank fusion : Σ 1/(k + rang) sur chaque liste."""
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, cid in enumerate(ranking):
+            fused[cid] = fused.get(cid, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(((s, c) for c, s in fused.items()), reverse=True)
+
+
+def top_dense(matrix: np.ndarray, query_vec: np.ndarray, depth: int = RRF_DEPTH,
+              min_sim: float = DENSE_MIN_SIM) -> list[int]:
+    sims = dense_scores(matrix, query_vec)
+    if not sims.size:
+        return []
+    depth = min(depth, sims.size)
+    top = np.argpartition(-sims, depth - 1)[:depth]
+    top = top[np.argsort(-sims[top])]
+    return [int(i) for i in top if sims[i] >= min_sim]
+
+
+# ══════════════════════════════════════════════════════════════
+# Benchmark
+# ══════════════════════════════════════════════════════════════
+
+# Paraphrases : le nom exact du sujet n'apparaît pas dans la question
+PARAPHRASE_QUERIES = [
+    ("Qui est le patron de Nvidia ?", "module_jensen_huang.md"),
+    ("Qui jouait le conducteur de la voiture parlante ?", "module_david_hasselhoff.md"),
+    ("Qui double la voiture en version française ?", "module_guy_chapellier.md"),
+    ("Qui est l'héritière du trône de Belgique ?", "module_famille_royale_belge.md"),
+    ("Quand l'homme a-t-il marché sur la Lune ?", "module_nasa_espace.md"),
+    ("Qui est le locataire de la Maison Blanche ?", "module_donald_trump.md"),
+    ("Qui dirige la France ?", "module_emmanuel_macron.md"),
+    ("Ma voiture américaine de 1982 fait un bruit bizarre", "module_automotive.md"),
+    ("Le club de vieilles voitures en Gaume", "module_associations_locales.md"),
+    ("Comment accélérer le modèle de langage sur la carte embarquée ?", "module_tech_ai.md"),
+]
+
+
+def benchmark():
+    from knowledge_index import BENCH_QUERIES, KnowledgeIndex, load_documents
+
+    encoder = load_encoder()
+    if encoder is None:
+        print(f"Modèle introuvable : {EMBED_MODEL_DIR}/model.onnx + tokenizer.json")
+        sys.exit(1)
+    index = KnowledgeIndex.build(load_documents())
+    texts = [index.chunk_text[i] for i in range(index.n_chunks)]
+    t0 = time.perf_counter()
+    matrix = encoder.encode(texts).astype(np.float16)
+    print(f"{index.n_chunks} chunks encodés en {(time.perf_counter()-t0):.1f}s — dim={encoder.dim}")
+
+    def doc_rank(cids):
+        seen = []
+        for c in cids:
+            d = index.doc_of(c)
+            if d not in seen:
+                seen.append(d)
+        return seen
+
+    for label, queries in (("exactes", BENCH_QUERIES), ("paraphrases", PARAPHRASE_QUERIES)):
+        res = {"bm25": [0, []], "dense": [0, []], "hybride": [0, []]}
+        for q, expected in queries:
+            t = time.perf_counter()
+            bm = [c for _, c in index.search(q, k=RRF_DEPTH)]
+            t_bm = time.perf_counter() - t
+            t = time.perf_counter()
+            dn = top_dense(matrix, encoder.encode([q])[0])
+            t_dn = time.perf_counter() - t
+            t = time.perf_counter()
+            hy = [c for _, c in rrf_fuse([bm, dn])]
+            t_hy = time.perf_counter() - t + t_bm + t_dn
+            for name, ranked, dt in (("bm25", bm, t_bm), ("dense", dn, t_dn), ("hybride", hy, t_hy)):
+                docs = doc_rank(ranked)
+                res[name][0] += bool(docs) and docs[0] == expected
+                res[name][1].append(dt * 1000)
+        print(f"— requêtes {label} ({len(queries)})")
+        for name, (hits, lat) in res.items():
+            lat.sort()
+            print(f"  {name:<8} hit@1={hits}/{len(queries)} avg={sum(lat)/len(lat):6.2f}ms "
+                  f"p95={lat[min(len(lat)-1, int(len(lat)*0.95))]:6.2f}ms")
+
+
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark()
+    else:
+        print(__doc__)
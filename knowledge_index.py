@@ -0,0 +1,690 @@
+#!/usr/bin/env python3
+"""
+KITT — Index BM25 pour le RAG local (knowledge/*.md + notes racine).
+
+Index inversé construit une seule fois au chargement, sur des chunks de la
+taille d'un paragraphe (sections Markdown). Tokenisation adaptée au français :
+minuscules, suppression des accents, mots vides, racinisation légère.
+Les poids BM25 sont précalculés par posting : une requête se résume à
+quelques tranches de tableaux NumPy additionnées.
+
+Usage :
+    venv/bin/python3 knowledge_index.py "qui a fondé NVIDIA ?"   # top chunks
+    venv/bin/python3 knowledge_index.py --benchmark              # BM25 vs scan historique
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+
+from knowledge_embed import RRF_DEPTH, VectorStore, rrf_fuse, top_dense
+
+BASE_DIR = Path(__file__).parent
+KNOWLEDGE_DIR = BASE_DIR / "knowledge"
+CACHE_DIR = BASE_DIR / "knowledge_cache"   # index persisté (manifest.json + <build>/*.npy)
+ROOT_FILES = [
+    "GEMINI.md", "CLAUDE.md", "SUPER_NOTES.md", "GEMINI_MODIF_NOTES.md",
+    "BACKUP_RESTORE.md", "TRANSFERT_HTML.md",
+]
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+CHUNK_MAX_CHARS = 900      # au-delà, une section est redécoupée sur les lignes vides
+ROOT_DOC_WEIGHT = 0.7      # docs racine volumineuses : moins prioritaires que les modules
+MIN_SCORE = 1.0            # score BM25 minimal d'un chunk retenu
+
+# ══════════════════════════════════════════════════════════════
+# Tokenisation française
+# ══════════════════════════════════════════════════════════════
+
+STOPWORDS_FR = frozenset("""
+a ai aie ainsi alors apres au aucun aupres aura aurai auront aussi autre aux avait avant avec avez
+avoir avons ayant bien c ca ce ceci cela celle celles celui cependant ces cet cette ceux chaque chez
+ci comme comment d dans de des deja depuis donc dont du elle elles en encore entre est et etaient
+etais etait etant ete etes etre eu eux fait faire fais font hors i il ils j je jusqu l la le les
+leur leurs lui m ma mais me meme memes mes moi mon n ne ni nos notre nous on ont ou par parce pas
+peu peut plus pour pourquoi quand que quel quelle quelles quels qui quoi s sa sans se sera ses si
+sien son sont sous suis sur t ta te tes toi ton tous tout toute toutes tres tu un une vers voici
+voila vos votre vous y est-ce dis moi parle sais connais explique kitt
+the of and to in is for on with what who how
+""".split())
+
+
+def fold_accents(text: str) -> str:
+    """Minuscules + suppression des diacritiques (é→e, ç→c, œ→oe)."""
+    text = text.lower().replace("œ", "oe").replace("æ", "ae")
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def stem_fr(word: str) -> str:
+    """Racinisation légère (pluriels, féminins, suffixes fréquents)."""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith("aux") and len(word) > 5:
+        word = word[:-3] + "al"
+    elif word[-1] in "sx":
+        word = word[:-1]
+    for suffix in ("ement", "ation", "ateur", "atrice", "ique", "isme", "iste",
+                   "euse", "eux", "ite", "eur", "ee", "er", "e"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Texte → liste de racines (sans mots vides)."""
+    return [stem_fr(w) for w in _WORD_RE.findall(fold_accents(text))
+            if len(w) > 1 and w not in STOPWORDS_FR]
+
+
+# ══════════════════════════════════════════════════════════════
+# Chargement + découpage
+# ══════════════════════════════════════════════════════════════
+
+def read_document(path: Path) -> str:
+    """Lit un fichier MD et compresse les lignes vides multiples."""
+    return re.sub(r'\n{3,}', '\n\n', path.read_text(encoding="utf-8"))
+
+
+def document_paths(base_dir: Path = BASE_DIR, knowledge_dir: Path = KNOWLEDGE_DIR) -> dict[str, Path]:
+    """Fichiers racine historiques + tous les modules de knowledge/ (nom → chemin)."""
+    paths = {}
+    for fn in ROOT_FILES:
+        path = base_dir / fn
+        if path.exists():
+            paths[fn] = path
+    for path in sorted(knowledge_dir.glob("*.md")):
+        paths[path.name] = path
+    return paths
+
+
+def load_documents(base_dir: Path = BASE_DIR, knowledge_dir: Path = KNOWLEDGE_DIR) -> dict[str, str]:
+    """Charge les fichiers racine historiques + tous les modules de knowledge/."""
+    docs = {}
+    for name, path in document_paths(base_dir, knowledge_dir).items():
+        try:
+            docs[name] = read_document(path)
+        except Exception as e:
+            print(f"[RAG] Erreur indexation {name}: {e}")
+    return docs
+
+
+def split_chunks(content: str) -> list[str]:
+    """Découpe un document en sections (titres #..####), redécoupe les sections longues."""
+    chunks = []
+    for section in re.split(r'\n(?=#{1,4}\s)', content):
+        section = section.strip()
+        if not section:
+            continue
+        if len(section) <= CHUNK_MAX_CHARS:
+            chunks.append(section)
+            continue
+        buf = ""
+        for para in re.split(r'\n\s*\n', section):
+            if buf and len(buf) + len(para) > CHUNK_MAX_CHARS:
+                chunks.append(buf.strip())
+                buf = ""
+            buf += para + "\n\n"
+        if buf.strip():
+            chunks.append(buf.strip())
+    return chunks
+
+
+def _doc_title(content: str) -> str:
+    """Premier titre H1 du document (ajouté aux tokens de chaque chunk)."""
+    m = re.search(r'^#\s+(.+)$', content, flags=re.MULTILINE)
+    return m.group(1) if m else ""
+
+
+def chunk_document(name: str, content: str) -> list[tuple[str, list[str]]]:
+    """Découpe + tokenise un document : [(texte_chunk, tokens)]."""
+    title_tokens = tokenize(_doc_title(content) + " " + Path(name).stem.replace("_", " "))
+    return [(chunk, tokenize(chunk) + title_tokens) for chunk in split_chunks(content)]
+
+
+# ══════════════════════════════════════════════════════════════
+# Index BM25
+# ══════════════════════════════════════════════════════════════
+
+class ChunkTexts:
+    """Textes des chunks lus à la demande dans un blob UTF-8 mappé en mémoire."""
+
+    def __init__(self, path: Path, offsets: np.ndarray):
+        self._offsets = offsets
+        self._blob = np.memmap(path, dtype=np.uint8, mode="r") if offsets[-1] else np.zeros(0, np.uint8)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self._blob[int(self._offsets[i]):int(self._offsets[i + 1])].tobytes().decode("utf-8")
+
+
+class KnowledgeIndex:
+    """Index inversé BM25 au format CSR (postings triés par terme).
+
+    post_ptr[t]:post_ptr[t+1] délimite les postings du terme t dans
+    post_chunk (id de chunk) et post_weight (poids BM25 précalculé).
+    """
+
+    ARRAYS = ("chunk_doc", "post_ptr", "post_chunk", "post_tf", "post_weight", "doc_weight")
+
+    def __init__(self, docs: list[str], chunk_doc: np.ndarray, chunk_text,
+                 vocab: dict[str, int], post_ptr: np.ndarray, post_chunk: np.ndarray,
+                 post_tf: np.ndarray, post_weight: np.ndarray, doc_weight: np.ndarray):
+        self.docs = docs
+        self.chunk_doc = chunk_doc
+        self.chunk_text = chunk_text
+        self.vocab = vocab
+        self.post_ptr = post_ptr
+        self.post_chunk = post_chunk
+        self.post_tf = post_tf
+        self.post_weight = post_weight
+        self.doc_weight = doc_weight
+        self.vectors: np.ndarray | None = None  # float16 (n_chunks, dim) si encodeur actif
+
+    @property
+    def n_chunks(self) -> int:
+        return len(self.chunk_text)
+
+    @classmethod
+    def build(cls, documents: dict[str, str]) -> "KnowledgeIndex":
+        """Construit l'index à partir de {nom_fichier: contenu}."""
+        return cls.from_entries({name: chunk_document(name, content)
+                                 for name, content in documents.items()})
+
+    @classmethod
+    def from_entries(cls, entries: dict[str, list[tuple[str, list[str]]]]) -> "KnowledgeIndex":
+        """Assemble l'index depuis des documents déjà découpés et tokenisés."""
+        docs = list(entries)
+        chunk_doc, chunk_text, chunk_terms = [], [], []
+        for doc_id, name in enumerate(docs):
+            for text, terms in entries[name]:
+                chunk_doc.append(doc_id)
+                chunk_text.append(text)
+                chunk_terms.append(terms)
+        return cls._from_terms(docs, chunk_doc, chunk_text, chunk_terms)
+
+    @classmethod
+    def _from_terms(cls, docs: list[str], chunk_doc: list[int], chunk_text: list[str],
+                    chunk_terms: list[list[str]]) -> "KnowledgeIndex":
+        vocab: dict[str, int] = {}
+        rows, cols, tfs = [], [], []
+        lengths = np.zeros(len(chunk_text), dtype=np.float32)
+        for cid, terms in enumerate(chunk_terms):
+            lengths[cid] = len(terms)
+            counts: dict[str, int] = {}
+            for t in terms:
+                counts[t] = counts.get(t, 0) + 1
+            for t, tf in counts.items():
+                rows.append(vocab.setdefault(t, len(vocab)))
+                cols.append(cid)
+                tfs.append(tf)
+
+        n_terms = len(vocab)
+        term_ids = np.asarray(rows, dtype=np.int32)
+        order = np.argsort(term_ids, kind="stable")
+        term_ids = term_ids[order]
+        post_chunk = np.asarray(cols, dtype=np.int32)[order]
+        tf = np.asarray(tfs, dtype=np.float32)[order]
+        df_count = np.bincount(term_ids, minlength=n_terms)
+        post_ptr = np.zeros(n_terms + 1, dtype=np.int64)
+        post_ptr[1:] = np.cumsum(df_count)
+        df = df_count.astype(np.float32)
+
+        n = max(len(chunk_text), 1)
+        idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+        avgdl = float(lengths.mean()) if len(lengths) else 1.0
+        norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths[post_chunk] / max(avgdl, 1e-6))
+        post_weight = (idf[term_ids] * tf * (BM25_K1 + 1.0) / (tf + norm)).astype(np.float32)
+
+        doc_weight = np.array([1.0 if d.startswith("module_") else ROOT_DOC_WEIGHT for d in docs],
+                              dtype=np.float32)
+        return cls(docs, np.asarray(chunk_doc, dtype=np.int32), chunk_text, vocab,
+                   post_ptr, post_chunk, tf.astype(np.uint16), post_weight, doc_weight)
+
+    def entries(self) -> dict[str, list[tuple[str, list[str]]]]:
+        """Reconstitue {doc: [(texte, tokens)]} depuis les postings (ordre des tokens perdu)."""
+        terms = [""] * len(self.vocab)
+        for t, tid in self.vocab.items():
+            terms[tid] = t
+        chunk_terms: list[list[str]] = [[] for _ in range(self.n_chunks)]
+        for tid in range(len(terms)):
+            lo, hi = int(self.post_ptr[tid]), int(self.post_ptr[tid + 1])
+            for cid, tf in zip(self.post_chunk[lo:hi].tolist(), self.post_tf[lo:hi].tolist()):
+                chunk_terms[cid].extend([terms[tid]] * tf)
+        entries: dict[str, list[tuple[str, list[str]]]] = {d: [] for d in self.docs}
+        for cid in range(self.n_chunks):
+            entries[self.doc_of(cid)].append((self.chunk_text[cid], chunk_terms[cid]))
+        return entries
+
+    def save(self, directory: Path):
+        """Écrit l'index en .npy + textes des chunks dans un blob UTF-8."""
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(directory / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        blobs = [self.chunk_text[i].encode("utf-8") for i in range(self.n_chunks)]
+        offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in blobs])
+        np.save(directory / "chunk_offsets.npy", offsets)
+        (directory / "chunks.bin").write_bytes(b"".join(blobs))
+        terms = [""] * len(self.vocab)
+        for t, tid in self.vocab.items():
+            terms[tid] = t
+        (directory / "meta.json").write_text(
+            json.dumps({"docs": self.docs, "terms": terms}, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, directory: Path) -> "KnowledgeIndex":
+        """Charge un index sauvegardé, tableaux en mmap (page cache partagé entre process)."""
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode="r") for name in cls.ARRAYS}
+        texts = ChunkTexts(directory / "chunks.bin", np.load(directory / "chunk_offsets.npy", mmap_mode="r"))
+        if len(texts) != len(arrays["chunk_doc"]) or len(arrays["post_ptr"]) != len(meta["terms"]) + 1:
+            raise ValueError(f"index incohérent dans {directory}")
+        vocab = {t: i for i, t in enumerate(meta["terms"])}
+        return cls(meta["docs"], chunk_text=texts, vocab=vocab, **arrays)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Scores BM25 (pondérés par type de document) de tous les chunks."""
+        scores = np.zeros(self.n_chunks, dtype=np.float32)
+        for term in set(tokenize(query)):
+            tid = self.vocab.get(term)
+            if tid is None:
+                continue
+            lo, hi = self.post_ptr[tid], self.post_ptr[tid + 1]
+            scores[self.post_chunk[lo:hi]] += self.post_weight[lo:hi]
+        if self.n_chunks:
+            scores *= self.doc_weight[self.chunk_doc]
+        return scores
+
+    def search(self, query: str, k: int = 5, min_score: float = MIN_SCORE) -> list[tuple[float, int]]:
+        """Top-k (score, chunk_id) tous modules confondus, score décroissant."""
+        scores = self.scores(query)
+        if not scores.size:
+            return []
+        k = min(k, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), int(i)) for i in top if scores[i] >= min_score]
+
+    def doc_of(self, chunk_id: int) -> str:
+        return self.docs[int(self.chunk_doc[chunk_id])]
+
+
+def strip_md_headers(text: str) -> str:
+    """Supprime les titres Markdown # ## ### pour éviter que le LLM les cite."""
+    return re.sub(r'^#{1,4}\s+', '', text, flags=re.MULTILINE)
+
+
+def build_context(index: KnowledgeIndex, query: str, max_chars: int = 1500, k: int = 8) -> str:
+    """Meilleurs chunks BM25 concaténés jusqu'à max_chars (titres MD retirés)."""
+    return join_chunks(index, index.search(query, k=k), max_chars)
+
+
+def join_chunks(index: KnowledgeIndex, hits: list[tuple[float, int]], max_chars: int = 1500) -> str:
+    """Concatène les chunks de hits dans l'ordre jusqu'à max_chars (titres MD retirés)."""
+    result = ""
+    for _, cid in hits:
+        chunk = index.chunk_text[cid]
+        if len(result) + len(chunk) > max_chars:
+            if not result:
+                result = chunk[:max_chars]
+            break
+        result += chunk + "\n"
+    return strip_md_headers(result).strip()
+
+
+# ══════════════════════════════════════════════════════════════
+# Réindexation incrémentale + surveillance du dossier
+# ══════════════════════════════════════════════════════════════
+
+INDEX_VERSION = 1          # à incrémenter si la tokenisation ou le format change
+POLL_INTERVAL = 5.0        # secondes entre deux scans mtime (fallback sans inotify)
+DEBOUNCE_DELAY = 0.5       # regroupe les rafales d'écritures (éditeurs, scripts de nuit)
+
+
+class KnowledgeLibrary:
+    """Documents + index courant, réindexés fichier par fichier.
+
+    Chaque document garde son empreinte (mtime_ns, taille), son hash de
+    contenu et ses chunks tokenisés. refresh() ne relit que les fichiers
+    modifiés, puis assemble un nouvel index qui remplace l'ancien d'une
+    seule affectation : les recherches en cours gardent l'ancien.
+
+    L'index est persisté dans cache_dir, clé = hashes de contenu : un
+    redémarrage sans changement recharge les tableaux en mmap sans rien
+    retokeniser.
+    """
+
+    def __init__(self, base_dir: Path = BASE_DIR, knowledge_dir: Path = KNOWLEDGE_DIR,
+                 cache_dir: Path | None = CACHE_DIR, encoder=None):
+        self.encoder = encoder
+        self._vectors = VectorStore(encoder, cache_dir) if encoder is not None else None
+        self.base_dir = base_dir
+        self.knowledge_dir = knowledge_dir
+        self.cache_dir = cache_dir
+        self.index = KnowledgeIndex.build({})
+        self._stamps: dict[str, tuple[int, int]] = {}
+        self._hashes: dict[str, str] = {}
+        self._entries: dict[str, list[tuple[str, list[str]]]] | None = {}
+        self._cache_checked = False
+        self.source = "vide"
+        self.last_rebuild = 0.0
+        self.rebuild_ms = 0.0
+        self.rebuilds = 0
+        self.last_changed: list[str] = []
+        self.watch_mode = "aucun"
+
+    def _scan(self) -> dict[str, tuple[Path, tuple[int, int]]]:
+        found = {}
+        for name, path in document_paths(self.base_dir, self.knowledge_dir).items():
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            found[name] = (path, (st.st_mtime_ns, st.st_size))
+        return found
+
+    def _load_cache(self):
+        manifest = json.loads((self.cache_dir / "manifest.json").read_text(encoding="utf-8"))
+        if manifest.get("version") != INDEX_VERSION:
+            return
+        self.index = KnowledgeIndex.load(self.cache_dir / manifest["build"])
+        self._hashes = manifest["hashes"]
+        self._entries = None  # reconstruit depuis les postings si un document change
+        self.source = "cache"
+
+    def _save_cache(self):
+        build = hashlib.sha256(json.dumps(sorted(self._hashes.items())).encode()).hexdigest()[:16]
+        target = self.cache_dir / build
+        tmp = self.cache_dir / f".{build}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        self.index.save(tmp)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp, target)
+        manifest = {"version": INDEX_VERSION, "build": build, "hashes": self._hashes,
+                    "created": time.time()}
+        tmp_manifest = self.cache_dir / "manifest.json.tmp"
+        tmp_manifest.write_text(json.dumps(manifest, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp_manifest, self.cache_dir / "manifest.json")
+        for old in self.cache_dir.iterdir():
+            if old.is_dir() and old.name != build and not old.name.startswith("."):
+                shutil.rmtree(old, ignore_errors=True)
+
+    def refresh(self, force: bool = False) -> list[str]:
+        """Réindexe les documents ajoutés/modifiés/supprimés. Retourne leurs noms."""
+        t0 = time.perf_counter()
+        if not self._cache_checked and self.cache_dir is not None and not force:
+            self._cache_checked = True
+            try:
+                self._load_cache()
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"[RAG] Cache index ignoré: {e}")
+        found = self._scan()
+        changed = [n for n in self._hashes if n not in found]
+        hashes, contents = {}, {}
+        for name, (path, stamp) in found.items():
+            if not force and self._stamps.get(name) == stamp and name in self._hashes:
+                hashes[name] = self._hashes[name]
+                continue
+            try:
+                content = read_document(path)
+            except Exception as e:
+                print(f"[RAG] Erreur indexation {name}: {e}")
+                continue
+            self._stamps[name] = stamp
+            hashes[name] = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            if force or self._hashes.get(name) != hashes[name]:
+                contents[name] = content
+                changed.append(name)
+        for name in set(self._stamps) - set(found):
+            del self._stamps[name]
+        if not changed:
+            if self.source == "cache" and not self.last_rebuild:
+                self._attach_vectors(self.index)
+                self.rebuild_ms = (time.perf_counter() - t0) * 1000
+                self.last_rebuild = time.time()
+            return []
+
+        if self._entries is None:
+            self._entries = self.index.entries()
+        entries = {name: chunk_document(name, contents[name]) if name in contents else self._entries[name]
+                   for name in hashes}
+        index = KnowledgeIndex.from_entries(entries)
+        self._attach_vectors(index)
+        self._entries = entries
+        self._hashes = hashes
+        self.index = index  # swap atomique
+        self.source = "build"
+        self.rebuild_ms = (time.perf_counter() - t0) * 1000
+        self.last_rebuild = time.time()
+        self.rebuilds += 1
+        self.last_changed = changed
+        if self.cache_dir is not None:
+            try:
+                self._save_cache()
+            except Exception as e:
+                print(f"[RAG] Sauvegarde index impossible: {e}")
+        return changed
+
+    def _attach_vectors(self, index: KnowledgeIndex):
+        """Associe à l'index les vecteurs de ses chunks (seuls les nouveaux sont encodés)."""
+        if self._vectors is None:
+            return
+        try:
+            index.vectors = self._vectors.vectors_for(index.chunk_text)
+        except Exception as e:
+            print(f"[RAG] Embeddings indisponibles: {e}")
+
+    def search(self, query: str, k: int = 8, index: KnowledgeIndex | None = None) -> list[tuple[float, int]]:
+        """Top-k hybride : BM25 + dense fusionnés par RRF (BM25 seul sans encodeur).
+
+        `index` : instantané à interroger (les chunk_id retournés s'y rapportent).
+        """
+        if index is None:
+            index = self.index  # instantané : index et vecteurs cohérents
+        if index.vectors is None or self.encoder is None:
+            return index.search(query, k=k)
+        lexical = [cid for _, cid in index.search(query, k=RRF_DEPTH)]
+        dense = top_dense(index.vectors, self.encoder.encode([query])[0])
+        return rrf_fuse([lexical, dense])[:k]
+
+    def context(self, query: str, max_chars: int = 1500) -> str:
+        """Contexte RAG prêt à injecter dans le prompt."""
+        index = self.index  # un seul instantané pour la recherche et la lecture des chunks
+        return join_chunks(index, self.search(query, index=index), max_chars)
+
+    def status(self) -> dict:
+        index = self.index
+        return {
+            "documents": len(index.docs),
+            "chunks": index.n_chunks,
+            "terms": len(index.vocab),
+            "last_rebuild": self.last_rebuild,
+            "rebuild_ms": round(self.rebuild_ms, 1),
+            "rebuilds": self.rebuilds,
+            "last_changed": self.last_changed,
+            "watch": self.watch_mode,
+            "source": self.source,
+            "semantic": self.encoder.name if self.encoder is not None else None,
+        }
+
+    async def watch(self, on_change=None):
+        """Surveille les fichiers (inotify si inotify_simple est installé, sinon mtime)."""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        try:
+            from inotify_simple import INotify, flags
+            inotify = INotify()
+            mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE | flags.CREATE
+            inotify.add_watch(str(self.knowledge_dir), mask)
+            inotify.add_watch(str(self.base_dir), mask)
+            self.watch_mode = "inotify"
+        except Exception:
+            inotify = None
+            self.watch_mode = "mtime"
+        try:
+            while True:
+                if inotify is not None:
+                    events = await loop.run_in_executor(None, inotify.read, 1000)
+                    if not any(e.name.endswith(".md") for e in events):
+                        continue
+                    await asyncio.sleep(DEBOUNCE_DELAY)
+                    inotify.read(0)  # vider la rafale
+                else:
+                    await asyncio.sleep(POLL_INTERVAL)
+                changed = await loop.run_in_executor(None, self.refresh)
+                if changed and on_change:
+                    on_change(changed)
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+
+# ══════════════════════════════════════════════════════════════
+# Benchmark — BM25 vs scan historique
+# ══════════════════════════════════════════════════════════════
+
+# Requêtes étiquetées : (question, document attendu en tête)
+BENCH_QUERIES = [
+    ("Quand Jensen Huang a-t-il fondé NVIDIA ?", "module_jensen_huang.md"),
+    ("Qui sont les cofondateurs de Nvidia ?", "module_jensen_huang.md"),
+    ("Quel rôle jouait David Hasselhoff dans K2000 ?", "module_david_hasselhoff.md"),
+    ("Parle-moi de la série Alerte à Malibu", "module_david_hasselhoff.md"),
+    ("Qui est la voix française de KITT ?", "module_guy_chapellier.md"),
+    ("Quels acteurs Guy Chapellier a-t-il doublés ?", "module_guy_chapellier.md"),
+    ("Qui est la princesse Élisabeth de Belgique ?", "module_famille_royale_belge.md"),
+    ("Où réside le roi Philippe ?", "module_famille_royale_belge.md"),
+    ("Quand a eu lieu le programme Apollo ?", "module_nasa_espace.md"),
+    ("Que fait le télescope James Webb ?", "module_nasa_espace.md"),
+    ("Quels sont les rovers envoyés sur Mars ?", "module_nasa_espace.md"),
+    ("Quand a commencé le second mandat de Donald Trump ?", "module_donald_trump.md"),
+    ("Quelle formation a suivi Emmanuel Macron ?", "module_emmanuel_macron.md"),
+    ("Comment diagnostiquer un problème sur une Pontiac Trans Am ?", "module_automotive.md"),
+    ("Quel entretien préventif pour la Trans Am ?", "module_automotive.md"),
+    ("Quand aura lieu la bourse oldtimer de Libramont ?", "module_associations_locales.md"),
+    ("Qui préside les Vî Bielles Gaumaises ?", "module_associations_locales.md"),
+    ("Quels indicateurs économiques faut-il suivre ?", "module_economy.md"),
+    ("Quelle est la situation géopolitique de la Chine ?", "module_geopolitics.md"),
+    ("Comment analyser un risque avant une décision ?", "module_strategy.md"),
+    ("Quels biais cognitifs faut-il éviter ?", "module_strategy.md"),
+    ("Quels paramètres optimaux pour Qwen sur le Jetson ?", "module_tech_ai.md"),
+    ("Comment réduire la latence du TTS Piper ?", "module_tech_ai.md"),
+    ("Qui a fondé Microsoft et Apple ?", "module_tech_companies.md"),
+    ("Histoire de Linux et de Linus Torvalds", "module_tech_companies.md"),
+    ("Quand est né le Web et Internet ?", "module_histoire_informatique.md"),
+    ("Qui étaient les pionniers de l'informatique ?", "module_histoire_informatique.md"),
+    ("Quelles émotions vocales utilise KITT ?", "module_kitt_voice.md"),
+    ("Comment restaurer une sauvegarde du système ?", "BACKUP_RESTORE.md"),
+    ("Comment transférer le fichier HTML ?", "TRANSFERT_HTML.md"),
+]
+
+
+def legacy_search(documents: dict[str, str], query: str) -> str | None:
+    """Scan historique de search_local_knowledge : retourne le fichier gagnant."""
+    keywords = [w.lower() for w in re.findall(r'\w{4,}', query) if len(w) > 3]
+    if not keywords:
+        return None
+    module_hits, doc_hits = [], []
+    for fn, content in documents.items():
+        content_lower = content.lower()
+        score = sum(1 for k in keywords if k in content_lower)
+        min_score = 1 if fn.startswith("module_") else 2
+        if score >= min_score:
+            (module_hits if fn.startswith("module_") else doc_hits).append((score, fn, content))
+    hits = module_hits if module_hits else doc_hits
+    if not hits:
+        return None
+
+    def sort_key(hit):
+        score, fn, _ = hit
+        fn_lower = fn.lower()
+        return (score, sum(1 for k in keywords if k in fn_lower or fn_lower.find(k[:5]) >= 0))
+    hits.sort(key=sort_key, reverse=True)
+    best_content = hits[0][2]
+    # Reproduit aussi le coût de l'extraction de paragraphes
+    for para in re.split(r'\n(?=##?\s)', best_content):
+        para_lower = para.lower()
+        sum(1 for k in keywords if k in para_lower)
+    return hits[0][1]
+
+
+def _percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def benchmark(repeat: int = 50):
+    documents = load_documents()
+    t0 = time.perf_counter()
+    index = KnowledgeIndex.build(documents)
+    build_ms = (time.perf_counter() - t0) * 1000
+    queries = [(q, d) for q, d in BENCH_QUERIES if d in documents]
+    print(f"{len(documents)} documents, {index.n_chunks} chunks, {len(index.vocab)} termes — "
+          f"construction {build_ms:.1f}ms — {len(queries)} requêtes étiquetées")
+
+    def run(name, fn):
+        lat, hits, rr = [], 0, 0.0
+        for q, expected in queries:
+            t = time.perf_counter()
+            for _ in range(repeat):
+                ranked = fn(q)
+            lat.append((time.perf_counter() - t) * 1e6 / repeat)
+            if ranked and ranked[0] == expected:
+                hits += 1
+            if expected in ranked:
+                rr += 1.0 / (ranked.index(expected) + 1)
+        print(f"{name:<10} avg={sum(lat)/len(lat):8.1f}µs p95={_percentile(lat, 0.95):8.1f}µs "
+              f"hit@1={hits}/{len(queries)} MRR={rr/len(queries):.3f}")
+
+    def bm25_ranked(q):
+        seen = []
+        for _, cid in index.search(q, k=10):
+            d = index.doc_of(cid)
+            if d not in seen:
+                seen.append(d)
+        return seen
+
+    def legacy_ranked(q):
+        best = legacy_search(documents, q)
+        return [best] if best else []
+
+    run("scan", legacy_ranked)
+    run("bm25", bm25_ranked)
+
+
+def main():
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit(0)
+    query = " ".join(a for a in sys.argv[1:] if not a.startswith("--"))
+    if not query:
+        print(__doc__)
+        sys.exit(1)
+    index = KnowledgeIndex.build(load_documents())
+    t0 = time.perf_counter()
+    hits = index.search(query, k=5)
+    us = (time.perf_counter() - t0) * 1e6
+    print(f"{len(hits)} résultats en {us:.0f}µs")
+    for score, cid in hits:
+        first_line = index.chunk_text[cid].splitlines()[0][:70]
+        print(f"  {score:6.2f}  {index.doc_of(cid):<34} {first_line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,7 +22,6 @@ import wave
 from datetime import datetime, timezone
 from pathlib import Path
 
-import tempfile
 import numpy as np
 os.environ["ORT_LOG_LEVEL"] = "ERROR"
 
@@ -82,6 +81,20 @@ import aiohttp as aiohttp_client
 from aiohttp import web
 from faster_whisper import WhisperModel
 from piper_gpu import PiperGPU, MultilingualTTS, _detect_lang, _map_whisper_lang
+from whisper_modes import resolve_compute_type, pick_compute_type, measure_model, load_fixtures
+from whisper_vad import decode_upload, trim_speech
+from knowledge_index import KnowledgeLibrary
+from knowledge_embed import load_encoder
+from web_cache import WebSearchCache
+from intent_router import IntentRouter
+from memory_store import UserMemoryStore, mac_to_key
+from net_resolver import NeighbourTable, client_info
+from monitor_bus import MonitorBus
+from conv_log import ConvLog, SEARCH_LIMIT, SEARCH_LIMIT_MAX
+from vision_client import VisionDaemon
+from kitt_db import (KittDB, migrate, load_users, upsert_user, insert_connection, load_aggregates,
+                     load_memory, save_memory, load_global_memory, load_conv_users, upsert_conv_user,
+                     insert_turns)
 
 # ── Auth (désactivable : sans KYRONEX_PASSWORD, pas de login) ────────────
 ACCESS_PASSWORD = os.environ.get("KYRONEX_PASSWORD", "")
@@ -261,17 +274,11 @@ AUDIO_DIR = BASE_DIR / "audio_cache"
 AUDIO_DIR.mkdir(exist_ok=True)
 LOGS_DIR = BASE_DIR / "logs"
 LOGS_DIR.mkdir(exist_ok=True)
-USERS_FILE = BASE_DIR / "users.json"
-STATS_FILE = BASE_DIR / "conn_stats.json"
+DB_FILE = BASE_DIR / "kitt.db"  # users, connexions, mémoire, conversations (kitt_db.py)
 VISION_SCRIPT = BASE_DIR / "vision.py"
-# ── Mémoire persistante ──────────────────────────────────────────────────
-MEMORY_FILE = BASE_DIR / "memory.json"
-USER_MEMORIES_DIR = BASE_DIR / "user_memories"
-USER_MEMORIES_DIR.mkdir(exist_ok=True)
 
 # ── Système Conversations ─────────────────────────────────────────────────
 CONV_DATA_DIR    = BASE_DIR / 'conv_data'
-CONV_USERS_FILE  = CONV_DATA_DIR / 'conv_users.json'
 CONV_CONFIG_FILE = CONV_DATA_DIR / 'conv_config.json'
 CONV_STORE_DIR   = CONV_DATA_DIR / 'conversations'
 CONV_DATA_DIR.mkdir(exist_ok=True)
@@ -279,16 +286,23 @@ CONV_STORE_DIR.mkdir(exist_ok=True)
 _conv_admin_sessions: dict = {}   # token → expiry timestamp
 _CONV_ADMIN_HASH = hashlib.sha256(b"Microsoft198@").hexdigest()
 
+# ── Base SQLite (WAL, thread dédié) ───────────────────────────────────────
+# Import one-shot des anciens JSON/texte au premier démarrage ; ensuite chaque
+# écriture est un INSERT/UPSERT au lieu d'une réécriture complète du fichier.
+_db = KittDB(DB_FILE)
+_migrated = _db.call(migrate, BASE_DIR)
+if _migrated is not None:
+    print(f"[DB] Migration des fichiers historiques : {_migrated}", flush=True)
+
+_conv_users: dict = _db.call(load_conv_users)
+
 
 def _conv_load_users() -> dict:
-    try:
-        return json.loads(CONV_USERS_FILE.read_text()) if CONV_USERS_FILE.exists() else {}
-    except Exception:
-        return {}
+    return _conv_users
 
 
-def _conv_save_users(u: dict):
-    CONV_USERS_FILE.write_text(json.dumps(u, indent=2, ensure_ascii=False))
+def _conv_save_user(uid: str):
+    _db.execute(upsert_conv_user, uid, dict(_conv_users[uid]))
 
 
 def _conv_safe(name: str) -> str:
@@ -305,86 +319,42 @@ def _conv_check_token(request) -> bool:
         del _conv_admin_sessions[t]
     return False
 
-def _load_memory() -> dict:
-    if MEMORY_FILE.exists():
-        try:
-            return json.loads(MEMORY_FILE.read_text())
-        except Exception:
-            pass
-    return {"facts": [], "preferences": {}}
-
-_memory = _load_memory()  # mémoire globale conservée pour rétro-compat
+_memory = _db.call(load_global_memory)  # mémoire globale (ex-memory.json) conservée pour rétro-compat
 
 # ── Mémoire par utilisateur ───────────────────────────────────────────────
 
-def _mac_to_key(mac: str) -> str:
-    """Convertit une MAC/IP en nom de fichier sûr."""
-    return re.sub(r'[^a-zA-Z0-9_\-]', '_', mac)
-
-def _load_user_memory(mac: str) -> dict:
-    """Charge la mémoire d'un utilisateur (par MAC/IP)."""
-    if not mac:
-        return {"facts": [], "summaries": []}
-    f = USER_MEMORIES_DIR / f"{_mac_to_key(mac)}.json"
-    if f.exists():
-        try:
-            return json.loads(f.read_text())
-        except Exception:
-            pass
-    return {"facts": [], "summaries": []}
-
-def _save_user_memory(mac: str, mem: dict):
-    """Sauvegarde la mémoire d'un utilisateur."""
-    if not mac:
-        return
-    f = USER_MEMORIES_DIR / f"{_mac_to_key(mac)}.json"
-    f.write_text(json.dumps(mem, indent=2, ensure_ascii=False))
-
-# Patterns pour extraire des faits mémorisables
-_MEMORY_EXTRACT = re.compile(
-    r"(?:je m.appelle|mon (?:nom|prénom) (?:est|c.est)|"
-    r"j.aime|j.adore|je déteste|je préfère|"
-    r"je suis|j.habite|je travaille|"
-    r"mon (?:chat|chien|animal|voiture|métier|travail|hobby|passion)|"
-    r"ma (?:femme|copine|fille|mère|soeur|voiture|maison|passion)|"
-    r"souviens.toi|retiens|n.oublie pas|rappelle.toi)",
-    re.I,
-)
-
-_MEMORY_FORGET = re.compile(
-    r"(?:oublie|efface|supprime|retire).*(?:mémoire|souvenir|tu sais sur moi)",
-    re.I,
+# Profils en RAM (memory_store.py) : lus une fois, écrits en différé dans kitt.db
+# par la tâche de fond et à l'arrêt — aucune I/O disque pendant la construction du prompt.
+# Premier accès : les handlers appellent `await _user_memories.preload(mac)` (executor)
+_user_memories = UserMemoryStore(
+    load=lambda mac: _db.call(load_memory, mac_to_key(mac)),
+    save=lambda mac, mem: _db.call(save_memory, mac_to_key(mac), mem),
 )
 
-def extract_memory_fact(user_msg: str, user_name: str) -> str | None:
-    """Extrait un fait mémorisable du message utilisateur."""
-    if _MEMORY_EXTRACT.search(user_msg):
+# Les déclencheurs mémoire (« je m'appelle », « oublie ... mémoire ») sont dans intent_router.py
+def extract_memory_fact(user_msg: str, user_name: str, intents) -> str | None:
+    """Extrait un fait mémorisable du message utilisateur (intention 'memory')."""
+    if intents.has("memory"):
         return f"[{user_name}] {user_msg}"
     return None
 
 def add_memory(fact: str, user: str = "", mac: str = ""):
     """Ajoute un fait à la mémoire de l'utilisateur (par MAC, max 50 faits)."""
-    mem = _load_user_memory(mac)
-    mem["facts"].append({
+    _user_memories.add_fact(mac, {
         "fact": fact,
         "user": user,
         "date": datetime.now().isoformat()[:10],
     })
-    if len(mem["facts"]) > 50:
-        mem["facts"] = mem["facts"][-50:]
-    _save_user_memory(mac, mem)
     print(f"[MEMORY] {user}: {fact[:60]}")
 
 def clear_memory_for_user(user: str, mac: str = ""):
     """Efface les souvenirs d'un utilisateur."""
-    mem = _load_user_memory(mac)
-    mem["facts"] = []
-    _save_user_memory(mac, mem)
+    _user_memories.clear_facts(mac)
     print(f"[MEMORY] Mémoire effacée pour {user}")
 
 def get_memory_context(mac: str = "") -> str:
     """Retourne les souvenirs + résumé session précédente pour le system prompt."""
-    mem = _load_user_memory(mac)
+    mem = _user_memories.get(mac)
     parts = []
     if mem["facts"]:
         lines = [f"- {f['fact']}" for f in mem["facts"][-5:]]
@@ -395,14 +365,8 @@ def get_memory_context(mac: str = "") -> str:
     return ("\n" + "\n".join(parts)) if parts else ""
 
 
-VISION_KEYWORDS = re.compile(
-    r"\b(qu.?est.ce que tu vois|qu.?est.ce que je porte|qu.?est.ce que je tiens|"
-    r"regarde.moi|devant toi|camera|caméra|"
-    r"comment je suis habill|de quelle couleur|tu me vois|tu vois quoi|"
-    r"décris.moi|décris ce que|analyse.moi|scanne|scanner)\b",
-    re.IGNORECASE,
-)
 VISION_COOLDOWN = 30  # secondes minimum entre 2 captures auto
+VISION_MAX_AGE_MS = 3000     # chat : réutilise une détection complète de moins de 3 s (ex. question précédente)
 _last_vision_time = 0.0
 
 # ── Session HTTP persistante pour le LLM ─────────────────────────────────
@@ -418,35 +382,18 @@ async def get_llm_session() -> aiohttp_client.ClientSession:
 
 # ── Monitoring: résolution MAC, identité, WebSocket ──────────────────────
 
-def resolve_mac(ip: str) -> str:
-    """Résout l'adresse MAC depuis /proc/net/arp (lecture microseconde)."""
-    try:
-        with open("/proc/net/arp", "r") as f:
-            for line in f:
-                parts = line.split()
-                if parts and parts[0] == ip:
-                    mac = parts[3].upper()
-                    if mac != "00:00:00:00:00:00":
-                        return mac
-    except Exception:
-        pass
-    return ip  # fallback: utilise l'IP comme identifiant
+# Table de voisinage IP → MAC en RAM (ARP + IPv6), rafraîchie en tâche de fond :
+# plus aucune lecture de /proc/net/arp sur le chemin des requêtes
+_neighbours = NeighbourTable()
 
 
-def _load_users() -> dict:
-    if USERS_FILE.exists():
-        try:
-            return json.loads(USERS_FILE.read_text())
-        except Exception:
-            pass
-    return {}
-
-
-def _save_users(users: dict):
-    USERS_FILE.write_text(json.dumps(users, indent=2, ensure_ascii=False))
+def _client(request: web.Request) -> tuple[str, str]:
+    """(ip, mac) du client — X-Forwarded-For du tunnel pris en compte, calculé une fois par requête."""
+    info = client_info(request, _neighbours)
+    return info.ip, info.mac
 
 
-_users: dict = _load_users()
+_users: dict = _db.call(load_users)
 
 # ── Helpers utilisateurs (rétro-compat : _users[mac] peut être str ou dict) ──
 
@@ -467,32 +414,20 @@ def _update_user(mac: str, name: str = None, lang: str = None):
     if lang is not None:
         u["lang"] = lang
     _users[mac] = u
-    _save_users(_users)
+    _db.execute(upsert_user, mac, u.get("name", ""), u.get("lang", ""))
 
 # ── Statistiques de connexion ─────────────────────────────────────────────
 
-def _load_conn_stats() -> dict:
-    if STATS_FILE.exists():
-        try:
-            return json.loads(STATS_FILE.read_text())
-        except Exception:
-            pass
-    return {"connections": []}
-
-def _save_conn_stats():
-    STATS_FILE.write_text(json.dumps(_conn_stats, ensure_ascii=False))
-
-_conn_stats: dict = _load_conn_stats()
 _active_sessions: dict = {}  # {session_id: {ip, mac, name, lang, last_seen, first_seen}}
 
+# Agrégats de connexion en RAM (visiteurs, sessions uniques par heure) : mis à jour à chaque
+# nouvelle session, persistés par insert_connection — /api/stats et /api/visitors sans scan
+_conn_agg = _db.call(load_aggregates)
+
 def _log_new_connection(ip: str, mac: str, name: str, lang: str, session_id: str):
-    _conn_stats["connections"].append({
-        "ts": time.time(), "ip": ip, "mac": mac,
-        "name": name, "lang": lang, "session_id": session_id
-    })
-    if len(_conn_stats["connections"]) > 2000:
-        _conn_stats["connections"] = _conn_stats["connections"][-2000:]
-    _save_conn_stats()
+    ts = time.time()
+    _conn_agg.record(ts, ip, mac, name, lang, session_id)
+    _db.execute(insert_connection, ts, ip, mac, name, lang, session_id)
 
 def _prune_active_sessions():
     now = time.time()
@@ -503,9 +438,7 @@ def _prune_active_sessions():
 
 def get_user_display_name(request: web.Request) -> str:
     """Retourne le nom affiché pour l'utilisateur de cette requête."""
-    peername = request.transport.get_extra_info("peername")
-    ip = peername[0] if peername else "inconnu"
-    mac = resolve_mac(ip)
+    ip, mac = _client(request)
     name = _get_user_name(mac)
     if name:
         return name
@@ -515,7 +448,12 @@ def get_user_display_name(request: web.Request) -> str:
 
 # ── WebSocket Monitor ────────────────────────────────────────────────────
 
-_monitor_ws: set = set()
+# Journal des événements : segments tournants gzip + index (utilisateur, jour, session).
+# L'ancien logs/conversations.jsonl est découpé en segments compressés en tâche de fond.
+_conv_log = ConvLog(LOGS_DIR / "conversations", legacy=LOGS_DIR / "conversations.jsonl")
+
+# Bus d'événements : une file + une tâche d'envoi par monitor, JSONL écrit par lots
+_monitor_bus = MonitorBus(_conv_log.write)
 
 _LOCAL_IP_PREFIXES = ("127.", "192.168.", "10.")
 
@@ -537,48 +475,37 @@ def _is_local_ip(ip: str) -> bool:
 
 
 async def broadcast_monitor(event: dict):
-    """Envoie un événement à tous les monitors connectés + log JSONL."""
-    event["timestamp"] = datetime.now(timezone.utc).isoformat()
-    msg = json.dumps(event, ensure_ascii=False)
-    # WebSocket broadcast
-    if _monitor_ws:
-        print(f"[MONITOR] Broadcast → {len(_monitor_ws)} client(s): {event.get('type')}")
-    dead = set()
-    for ws in _monitor_ws:
-        try:
-            await ws.send_str(msg)
-        except Exception:
-            dead.add(ws)
-    if dead:
-        _monitor_ws.difference_update(dead)
-    # JSONL logging
-    try:
-        with open(LOGS_DIR / "conversations.jsonl", "a") as f:
-            f.write(msg + "\n")
-    except Exception:
-        pass
+    """Publie un événement vers les monitors connectés + log JSONL (sans attente)."""
+    _monitor_bus.publish(event)
+    if len(_monitor_bus):
+        print(f"[MONITOR] Broadcast → {len(_monitor_bus)} client(s): {event.get('type')}")
 
 
 async def handle_monitor_ws(request: web.Request) -> web.WebSocketResponse:
     """GET /api/monitor/ws — WebSocket restreint aux IPs locales."""
-    peername = request.transport.get_extra_info("peername")
-    ip = peername[0] if peername else ""
+    ip, _ = _client(request)
     if not _is_local_ip(ip):
         return web.json_response({"error": "Accès refusé"}, status=403)
 
     ws = web.WebSocketResponse()
     await ws.prepare(request)
-    _monitor_ws.add(ws)
+    # Rejoue les derniers événements puis diffuse en direct
+    _monitor_bus.subscribe(ws, ip)
     print(f"[MONITOR] Client connecté: {ip}")
     try:
         async for msg in ws:
             pass  # Le monitor est en lecture seule
     finally:
-        _monitor_ws.discard(ws)
+        _monitor_bus.unsubscribe(ws)
         print(f"[MONITOR] Client déconnecté: {ip}")
     return ws
 
 
+async def handle_monitor_stats(request: web.Request) -> web.Response:
+    """GET /api/monitor/stats — Abonnés, files, événements perdus, écritures JSONL."""
+    return web.json_response({**_monitor_bus.stats(), "conv_log": _conv_log.stats()})
+
+
 async def handle_set_name(request: web.Request) -> web.Response:
     """POST /api/set-name — Associe un nom au MAC du client."""
     try:
@@ -589,9 +516,7 @@ async def handle_set_name(request: web.Request) -> web.Response:
     if not name:
         return web.json_response({"error": "Nom requis"}, status=400)
     lang = body.get("lang", "").strip()[:5]
-    peername = request.transport.get_extra_info("peername")
-    ip = peername[0] if peername else "inconnu"
-    mac = resolve_mac(ip)
+    ip, mac = _client(request)
     _update_user(mac, name=name, lang=lang if lang else None)
     print(f"[USERS] {mac} ({ip}) → {name} lang={lang or '?'}")
     return web.json_response({"ok": True, "name": name, "mac": mac})
@@ -599,9 +524,7 @@ async def handle_set_name(request: web.Request) -> web.Response:
 
 async def handle_whoami(request: web.Request) -> web.Response:
     """GET /api/whoami — Retourne le nom stocké pour ce client."""
-    peername = request.transport.get_extra_info("peername")
-    ip = peername[0] if peername else "inconnu"
-    mac = resolve_mac(ip)
+    ip, mac = _client(request)
     name = _get_user_name(mac)
     lang = _get_user_lang(mac)
     return web.json_response({"name": name, "mac": mac, "ip": ip, "lang": lang})
@@ -616,9 +539,7 @@ async def handle_set_lang(request: web.Request) -> web.Response:
     lang = body.get("lang", "").strip()[:5]
     if lang not in _LANG_NAMES:
         return web.json_response({"error": f"Langue inconnue: {lang}"}, status=400)
-    peername = request.transport.get_extra_info("peername")
-    ip = peername[0] if peername else "inconnu"
-    mac = resolve_mac(ip)
+    ip, mac = _client(request)
     _update_user(mac, lang=lang)
     print(f"[LANG] {mac} ({ip}) préférence → {lang}")
     return web.json_response({"ok": True, "lang": lang})
@@ -633,9 +554,7 @@ async def handle_ping(request: web.Request) -> web.Response:
     session_id = body.get("session_id", "")
     if not session_id:
         return web.json_response({"ok": False}, status=400)
-    peername = request.transport.get_extra_info("peername")
-    ip = peername[0] if peername else "inconnu"
-    mac = resolve_mac(ip)
+    ip, mac = _client(request)
     name = body.get("name", "") or _get_user_name(mac)
     lang = _get_user_lang(mac)
     now = time.time()
@@ -655,26 +574,7 @@ async def handle_ping(request: web.Request) -> web.Response:
 async def handle_stats(request: web.Request) -> web.Response:
     """GET /api/stats — Statistiques de connexion."""
     _prune_active_sessions()
-    now = time.time()
-    ts_24h = now - 86400
-    ts_7d = now - 604800
-    conns = _conn_stats.get("connections", [])
-    # Compter sessions uniques par fenêtre temporelle
-    seen_24h = set()
-    seen_7d = set()
-    recent_ips = []
-    for c in reversed(conns):
-        ts = c.get("ts", 0)
-        sid = c.get("session_id", c.get("ip", ""))
-        if ts >= ts_24h:
-            seen_24h.add(sid)
-        if ts >= ts_7d:
-            seen_7d.add(sid)
-        ip = c.get("ip", "")
-        if ip and ip not in recent_ips:
-            recent_ips.append(ip)
-        if len(recent_ips) >= 15:
-            break
+    counts = _conn_agg.stats(time.time())
     active_list = []
     for sid, s in _active_sessions.items():
         dt = datetime.fromtimestamp(s["first_seen"]).strftime("%H:%M")
@@ -683,51 +583,23 @@ async def handle_stats(request: web.Request) -> web.Response:
         })
     return web.json_response({
         "current": len(_active_sessions),
-        "last_24h": len(seen_24h),
-        "last_7d": len(seen_7d),
+        "last_24h": counts["last_24h"],
+        "last_7d": counts["last_7d"],
         "active_sessions": active_list,
-        "recent_ips": recent_ips[:10]
+        "recent_ips": counts["recent_ips"]
     })
 
 
 async def handle_visitors(request: web.Request) -> web.Response:
     """GET /api/visitors — Historique détaillé des visiteurs (agrégé par MAC/IP)."""
-    conns = _conn_stats.get("connections", [])
-    # Agréger par MAC (ou IP si pas de MAC)
-    visitors: dict = {}
-    for c in conns:
-        key = c.get("mac") or c.get("ip", "?")
-        ts = c.get("ts", 0)
-        if key not in visitors:
-            visitors[key] = {
-                "mac": c.get("mac", ""),
-                "ip": c.get("ip", "?"),
-                "name": c.get("name") or "Inconnu",
-                "lang": c.get("lang") or "?",
-                "first_seen": ts,
-                "last_seen": ts,
-                "visits": 0,
-            }
-        v = visitors[key]
-        if ts < v["first_seen"]:
-            v["first_seen"] = ts
-        if ts > v["last_seen"]:
-            v["last_seen"] = ts
-            # Mettre à jour nom/lang avec les données les plus récentes
-            if c.get("name"):
-                v["name"] = c["name"]
-            if c.get("lang"):
-                v["lang"] = c["lang"]
-            if c.get("ip"):
-                v["ip"] = c["ip"]
-        v["visits"] += 1
+    # Agrégats par MAC (ou IP si pas de MAC) maintenus à chaque connexion
+    result = _conn_agg.visitor_list()
 
     def fmt(ts):
         if not ts:
             return "—"
         return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M")
 
-    result = sorted(visitors.values(), key=lambda x: x["last_seen"], reverse=True)
     for v in result:
         v["first_seen_fmt"] = fmt(v["first_seen"])
         v["last_seen_fmt"] = fmt(v["last_seen"])
@@ -736,16 +608,20 @@ async def handle_visitors(request: web.Request) -> web.Response:
 
 # ── STT avec faster-whisper ──────────────────────────────────────────────
 print("[...] Chargement du modèle Whisper...", flush=True)
+# Mode de calcul : KYRONEX_WHISPER_COMPUTE=auto (défaut) choisit selon MemAvailable
+_whisper_device, _whisper_compute = resolve_compute_type(os.environ.get("KYRONEX_WHISPER_COMPUTE", "auto"))
 try:
-    import ctranslate2
-    if ctranslate2.get_cuda_device_count() > 0:
-        whisper_model = WhisperModel("small", device="cuda", compute_type="float16")
-        print("[OK] Whisper prêt (GPU CUDA float16 - small)", flush=True)
-    else:
-        raise RuntimeError("No CUDA device")
-except Exception:
-    whisper_model = WhisperModel("small", device="cpu", compute_type="float32")
-    print("[OK] Whisper prêt (CPU float32 fallback - small)", flush=True)
+    whisper_model = WhisperModel("small", device=_whisper_device, compute_type=_whisper_compute)
+    print(f"[OK] Whisper prêt ({_whisper_device.upper()} {_whisper_compute} - small)", flush=True)
+except Exception as e:
+    print(f"[STT] Échec {_whisper_device}/{_whisper_compute}: {e}", flush=True)
+    _whisper_device, _whisper_compute = "cpu", pick_compute_type("cpu")
+    whisper_model = WhisperModel("small", device="cpu", compute_type=_whisper_compute)
+    print(f"[OK] Whisper prêt (CPU {_whisper_compute} fallback - small)", flush=True)
+vlog(f"WHISPER_LOADED {_whisper_device}/{_whisper_compute}")
+if os.environ.get("KYRONEX_WHISPER_PROBE") == "1":
+    _probe = measure_model(whisper_model, load_fixtures())
+    print(f"[STT] Probe {_whisper_compute}: {_probe}", flush=True)
 
 # ── TTS Multilingue (fr CUDA permanent + autres langues CPU lazy) ────────
 print("[...] Chargement du modèle TTS (multilingue)...", flush=True)
@@ -964,159 +840,124 @@ async def _synth_chunk(text: str, emotion: str = "normal", lang: str = "fr") ->
 
 
 # ── LLM via llama.cpp server ────────────────────────────────────────────
-# Entités privées internes — ne pas chercher sur le web (évite les homonymes)
-_PRIVATE_ENTITIES = re.compile(
-    r"\b(mario\s*ravasi|za\s*elettronica|manix|emmanuel\s*gelinne|kyronex|kitt\s*franco|"
-    r"start_kyronex|kyronex_server)\b",
-    re.I
-)
+# Routeur d'intentions (intent_router.py) : une seule regex combinée par message pour
+# les commandes directes, la vision, la mémoire, les entités privées et la recherche web
+_intent_router = IntentRouter()
+
+# Recherche web : confiance forte → on attend le web ; faible (définitions, « le meilleur… »)
+# → le LLM démarre avec le RAG local et le web n'est injecté que s'il arrive avant la deadline
+WEB_SPECULATIVE_DEADLINE = 0.35  # s — attente max du web sur le chemin spéculatif
+LATE_WEB_TTL = 300               # s — résultat web tardif conservé pour le tour suivant
+_late_web: dict = {}             # session_id → (timestamp, question, texte)
+_ttft_samples: dict = {}         # chemin → derniers TTFT (ms)
+TTFT_WINDOW = 200
+
+def _keep_late_web(session_id: str, question: str, task: asyncio.Task):
+    """Callback du web_task spéculatif : garde le résultat tardif pour le prochain tour."""
+    if task.cancelled() or task.exception() is not None:
+        return
+    text = task.result()
+    if text:
+        _late_web[session_id] = (time.time(), question, text)
+        while len(_late_web) > 100:
+            _late_web.pop(next(iter(_late_web)))
+        print(f"[WEB] Résultat tardif conservé ({len(text)} chars) pour le tour suivant", flush=True)
+
+def _pop_late_web(session_id: str):
+    """(question, texte) du résultat web tardif de la session, s'il est encore frais."""
+    entry = _late_web.pop(session_id, None)
+    if entry and time.time() - entry[0] < LATE_WEB_TTL:
+        return entry[1], entry[2]
+    return None
 
-# Mots-clés qui déclenchent une recherche web (actualité, météo, prix, personnes publiques, événements)
-_SEARCH_TRIGGERS = re.compile(
-    r"\b(actualit[eé]|news|nouvelle[s]?|m[eé]t[eé]o|temps\s+qu.il\s+fait|"
-    r"aujourd.hui|ce\s+(soir|matin|midi|week.end)|en\s+ce\s+moment|"
-    r"prix\s+d[ue]|combien\s+co[uû]te|sortie\s+de|derni[eè]re?\s+version|"
-    r"r[eé]cent|vient\s+de|champion[s]?\s+du\s+monde|[eé]l[eé]ction[s]?|"
-    r"qui\s+a\s+gagn[eé]|score|r[eé]sultat|classement|top\s+\d|"
-    r"film[s]?\s+du\s+moment|s[eé]rie[s]?\s+populaire|"
-    r"quel\s+(est|sont)\s+les?\s+(meilleur|derni|nouveau|principal)|"
-    r"quelle\s+(est|sont)\s+les?\s+(meilleur|derni|nouveau|principal)|"
-    r"d[eé]finition\s+de|qu.est.ce\s+que\s+[a-z]{3,}|wikipedia|explique.moi)\b",
-    re.I
-)
+def _record_ttft(path: str, ms: float):
+    samples = _ttft_samples.setdefault(path, [])
+    samples.append(ms)
+    if len(samples) > TTFT_WINDOW:
+        del samples[:-TTFT_WINDOW]
+
+def _ttft_summary() -> dict:
+    """p50/p95 du time-to-first-token par chemin de recherche."""
+    out = {}
+    for path, samples in _ttft_samples.items():
+        lat = sorted(samples)
+        out[path] = {"n": len(lat), "p50_ms": round(lat[len(lat) // 2]),
+                     "p95_ms": round(lat[min(len(lat) - 1, int(len(lat) * 0.95))])}
+    return out
 
 # ── RAG Local — Système de connaissance interne ──────────────────────────
-_KNOWLEDGE_FILES = [
-    "GEMINI.md", "CLAUDE.md", "SUPER_NOTES.md", "GEMINI_MODIF_NOTES.md",
-    "BACKUP_RESTORE.md", "TRANSFERT_HTML.md",
-]
+# Index BM25 (knowledge_index.py) : chunks par section, tokenisation française,
+# poids précalculés → top-k en microsecondes. Les fichiers sont surveillés
+# (inotify ou mtime) et seuls les documents modifiés sont réindexés. L'index est
+# persisté dans knowledge_cache/ (clé = hashes) et rechargé en mmap au boot.
 KNOWLEDGE_DIR = BASE_DIR / "knowledge"
 KNOWLEDGE_DIR.mkdir(exist_ok=True)
-_knowledge_cache = {}
+# Recherche sémantique optionnelle (knowledge_embed.py) : modèle ONNX CPU, fusion RRF avec BM25
+_knowledge = KnowledgeLibrary(BASE_DIR, KNOWLEDGE_DIR, encoder=load_encoder())
 
 def load_local_knowledge():
-    """Charge les fichiers MD de documentation + tous les modules de knowledge/."""
-    # Fichiers racine historiques
-    for fn in _KNOWLEDGE_FILES:
-        path = BASE_DIR / fn
-        if path.exists():
-            try:
-                content = path.read_text(encoding="utf-8")
-                content = re.sub(r'\n{3,}', '\n\n', content)
-                _knowledge_cache[fn] = content
-                print(f"[RAG] Indexé: {fn} ({len(content)} chars)")
-            except Exception as e:
-                print(f"[RAG] Erreur indexation {fn}: {e}")
-    # Modules thématiques dans knowledge/
-    for path in sorted(KNOWLEDGE_DIR.glob("*.md")):
-        try:
-            content = path.read_text(encoding="utf-8")
-            content = re.sub(r'\n{3,}', '\n\n', content)
-            _knowledge_cache[path.name] = content
-            print(f"[RAG] Indexé: {path.name} ({len(content)} chars)")
-        except Exception as e:
-            print(f"[RAG] Erreur indexation {path.name}: {e}")
+    """(Ré)indexe les fichiers MD de documentation + les modules de knowledge/ modifiés."""
+    changed = _knowledge.refresh()
+    st = _knowledge.status()
+    for fn in changed:
+        print(f"[RAG] Indexé: {fn}")
+    print(f"[RAG] Index BM25 ({st['source']}): {st['documents']} docs, {st['chunks']} chunks, "
+          f"{st['terms']} termes en {st['rebuild_ms']:.0f}ms")
 
 load_local_knowledge()
 
+def _on_knowledge_change(changed: list):
+    st = _knowledge.status()
+    print(f"[RAG] Réindexé {', '.join(changed)} → {st['chunks']} chunks en {st['rebuild_ms']:.0f}ms", flush=True)
+
 async def search_local_knowledge(query: str, max_chars: int = 1500) -> str:
-    """Recherche par mots-clés dans les fichiers indexés — extrait le paragraphe pertinent."""
-    keywords = [w.lower() for w in re.findall(r'\w{4,}', query) if len(w) > 3]
-    if not keywords:
-        return ""
+    """Recherche BM25 (+ sémantique si disponible) — concatène les meilleurs chunks tous modules confondus."""
+    if _knowledge.encoder is None:
+        return _knowledge.context(query, max_chars)
+    # L'encodage de la requête (~10-20 ms CPU) ne doit pas bloquer la boucle
+    return await asyncio.get_running_loop().run_in_executor(None, _knowledge.context, query, max_chars)
 
-    module_hits = []
-    doc_hits = []
-    for fn, content in _knowledge_cache.items():
-        content_lower = content.lower()
-        score = sum(1 for k in keywords if k in content_lower)
-        # Modules thématiques : seuil 1 (ciblés, peu de faux positifs)
-        # Docs racine volumineuses : seuil 2 (CLAUDE.md, GEMINI.md, etc.)
-        min_score = 1 if fn.startswith("module_") else 2
-        if score >= min_score:
-            if fn.startswith("module_"):
-                module_hits.append((score, fn, content))
-            else:
-                doc_hits.append((score, fn, content))
-
-    hits = module_hits if module_hits else doc_hits
-    if not hits:
-        return ""
 
-    # Tri : score décroissant, puis score secondaire = mots-clés dans le nom du fichier (matching partiel)
-    def sort_key(hit):
-        score, fn, _ = hit
-        fn_lower = fn.lower()
-        name_score = sum(1 for k in keywords if k in fn_lower or fn_lower.find(k[:5]) >= 0)
-        return (score, name_score)
-    hits.sort(key=sort_key, reverse=True)
-    best_fn, best_content = hits[0][1], hits[0][2]
-
-    # Extraire le(s) paragraphe(s) les plus pertinents plutôt que les N premiers chars
-    paragraphs = re.split(r'\n(?=##?\s)', best_content)
-    scored_paras = []
-    for para in paragraphs:
-        para_lower = para.lower()
-        s = sum(1 for k in keywords if k in para_lower)
-        if s > 0:
-            scored_paras.append((s, para))
-    scored_paras.sort(key=lambda x: x[0], reverse=True)
-
-    def _strip_md_headers(text: str) -> str:
-        """Supprime les titres Markdown # ## ### pour éviter que le LLM les cite."""
-        return re.sub(r'^#{1,4}\s+', '', text, flags=re.MULTILINE)
-
-    if scored_paras:
-        # Prendre les meilleurs paragraphes jusqu'à max_chars
-        result = ""
-        for _, para in scored_paras:
-            if len(result) + len(para) > max_chars:
-                break
-            result += para + "\n"
-        return _strip_md_headers(result).strip()
-    else:
-        return _strip_md_headers(best_content[:max_chars]).strip()
+async def handle_knowledge_status(request: web.Request) -> web.Response:
+    """GET /api/knowledge/status — État de l'index RAG local."""
+    st = _knowledge.status()
+    st["last_rebuild_fmt"] = datetime.fromtimestamp(st["last_rebuild"]).strftime("%Y-%m-%d %H:%M:%S") if st["last_rebuild"] else "—"
+    return web.json_response(st)
 
-async def web_search(query: str, max_results: int = 3) -> str:
+# Cache des recherches web (web_cache.py) : TTL par catégorie, cache négatif,
+# disjoncteur — réseau coupé = réponse vide immédiate au lieu de 6 s d'attente
+_web_cache = WebSearchCache()
+
+async def web_search(query: str, intents, max_results: int = 3) -> str:
     """Recherche DuckDuckGo async uniquement si nécessaire.
     Ignorée pour entités privées ou questions KITT-spécifiques."""
-    # Ne chercher que si un mot-clé d'actualité/info est présent
-    if not _SEARCH_TRIGGERS.search(query):
+    # Ne chercher que si l'intention 'search' est détectée (actualité/info)
+    if intents.web_relevance() == "none":
         return ""
     # Ne pas chercher si la requête concerne une entité privée (évite homonymes)
-    if _PRIVATE_ENTITIES.search(query):
+    if intents.has("private"):
         print(f"[WEB] Entité privée — pas de recherche: {query[:50]}", flush=True)
         return ""
-    try:
-        from ddgs import DDGS
-        def _search():
-            with DDGS() as ddgs:
-                return list(ddgs.text(query, max_results=max_results))
-
-        results = await asyncio.wait_for(
-            asyncio.get_running_loop().run_in_executor(None, _search),
-            timeout=6.0
-        )
-        if not results:
-            return ""
-        parts = []
-        for r in results[:max_results]:
-            title = r.get("title", "").strip()
-            body = r.get("body", "").strip()[:200]
-            if title or body:
-                parts.append(f"• {title}: {body}")
-        return "\n".join(parts)
-    except Exception as e:
-        print(f"[WEB_SEARCH] Erreur: {e}", flush=True)
-        return ""
+    return await _web_cache.search(query, max_results)
+
 
+async def handle_web_stats(request: web.Request) -> web.Response:
+    """GET /api/web/stats — Cache de recherche web + disjoncteur + TTFT par chemin."""
+    return web.json_response({**_web_cache.stats(), "ttft": _ttft_summary()})
 
-async def query_llm(user_message: str, history: list, user_name: str = "", user_lang: str = "", mac: str = "") -> str:
+
+async def handle_intent_stats(request: web.Request) -> web.Response:
+    """GET /api/intents/stats — Compteurs du routeur d'intentions."""
+    return web.json_response(_intent_router.stats())
+
+
+async def query_llm(user_message: str, history: list, user_name: str = "", user_lang: str = "", mac: str = "",
+                    intents=None) -> str:
     # Recherche locale (RAG)
     local_info = await search_local_knowledge(user_message)
     
     # Enrichissement web systématique
-    web_info = await web_search(user_message)
+    web_info = await web_search(user_message, intents or _intent_router.route(user_message))
     
     enriched_msg = user_message
     if local_info:
@@ -1181,13 +1022,7 @@ def _clear_ram_cache():
 
 
 # ── Function Calling — commandes directes (sans LLM) ─────────────────────
-_FUNC_PATTERNS = [
-    (re.compile(r"\b(quelle heure|heure est.il|l.heure)\b", re.I), "time"),
-    (re.compile(r"\b(quel(?:le)? date|date (?:d')?aujourd|on est quel jour|quel jour)\b", re.I), "date"),
-    (re.compile(r"\b(état (?:du )?syst[eè]me|état système|status syst|diagnostic|tes capteurs|ta sant[ée]|comment (?:tu )?vas.tu)\b", re.I), "system"),
-    (re.compile(r"\b(m[eé]t[eé]o|temps (?:qu.il fait|dehors)|temp[eé]rature ext[eé]rieure|fera.t.il)\b", re.I), "weather"),
-    (re.compile(r"\b(?:mets? (?:un )?)?timer?\s*(?:de\s+)?(\d+)\s*(min|sec|minute|seconde)", re.I), "timer"),
-]
+# Les déclencheurs des commandes (func:time, func:date, ...) sont dans intent_router.py
 
 _active_timers: list = []
 
@@ -1260,16 +1095,6 @@ async def _get_weather() -> str:
     return "Capteurs météo indisponibles."
 
 
-def check_function_call(user_msg: str) -> tuple[str | None, str | None]:
-    """Vérifie si le message correspond à une commande directe.
-    Retourne (type, réponse) ou (None, None)."""
-    for pattern, func_type in _FUNC_PATTERNS:
-        m = pattern.search(user_msg)
-        if m:
-            return func_type, m
-    return None, None
-
-
 async def execute_function(func_type: str, match, user_name: str = "Manix") -> str:
     """Exécute une commande directe et retourne la réponse KITT."""
     if func_type == "time":
@@ -1287,8 +1112,8 @@ async def execute_function(func_type: str, match, user_name: str = "Manix") -> s
         weather = await _get_weather()
         return f"D'après mes capteurs atmosphériques : {weather}"
     elif func_type == "timer":
-        val = int(match.group(1))
-        unit = match.group(2).lower()
+        val = int(match.group("timer_n"))
+        unit = match.group("timer_unit").lower()
         if unit.startswith("min"):
             seconds = val * 60
             label = f"{val} minute{'s' if val > 1 else ''}"
@@ -1311,9 +1136,8 @@ async def handle_chat(request: web.Request) -> web.Response:
     user_msg = body.get("message", "").strip()
     session_id = body.get("session_id", "default")
     want_audio = body.get("audio", True)
-    _cp = request.transport.get_extra_info("peername")
-    _cip = _cp[0] if _cp else "inconnu"
-    _cmac = resolve_mac(_cip)
+    _cip, _cmac = _client(request)
+    await _user_memories.preload(_cmac)
     user_lang_pref_c = _get_user_lang(_cmac)
     client_lang = body.get("lang", "")
     lang = user_lang_pref_c if user_lang_pref_c else (_map_whisper_lang(client_lang) if client_lang else _detect_lang(user_msg))
@@ -1328,7 +1152,8 @@ async def handle_chat(request: web.Request) -> web.Response:
     user_display = body.get("user_name", "").strip() or get_user_display_name(request)
 
     # Function calling (interception avant LLM)
-    func_type, func_match = check_function_call(user_msg)
+    intents = _intent_router.route(user_msg)
+    func_type, func_match = intents.function()
     if func_type:
         func_reply = await execute_function(func_type, func_match, user_display)
         asyncio.create_task(broadcast_monitor({"type": "user_msg", "user": user_display, "session_id": session_id, "message": user_msg}))
@@ -1357,7 +1182,7 @@ async def handle_chat(request: web.Request) -> web.Response:
     # LLM
     t_llm = time.time()
     try:
-        reply = await query_llm(user_msg, conversations[session_id], user_display, user_lang_pref_c, _cmac)
+        reply = await query_llm(user_msg, conversations[session_id], user_display, user_lang_pref_c, _cmac, intents)
     except Exception as e:
         return web.json_response({"error": f"Erreur LLM: {e}"}, status=503)
     llm_ms = (time.time() - t_llm) * 1000
@@ -1366,10 +1191,10 @@ async def handle_chat(request: web.Request) -> web.Response:
     conversations[session_id].append({"role": "assistant", "content": reply})
 
     # Extraction mémoire par utilisateur
-    if _MEMORY_FORGET.search(user_msg):
+    if intents.has("forget"):
         clear_memory_for_user(user_display, _cmac)
     else:
-        fact = extract_memory_fact(user_msg, user_display)
+        fact = extract_memory_fact(user_msg, user_display, intents)
         if fact:
             add_memory(fact, user_display, _cmac)
 
@@ -1383,11 +1208,9 @@ async def handle_chat(request: web.Request) -> web.Response:
     asyncio.create_task(broadcast_monitor({"type": "assistant_msg", "user": user_display, "session_id": session_id, "message": reply}))
 
     # Sauvegarde automatique de la conversation pour l'archive
-    peername_info = request.transport.get_extra_info("peername")
-    async def _auto_save_conv(pname):
+    _, conv_mac = _client(request)
+    async def _auto_save_conv(mac):
         try:
-            ip = pname[0] if pname else "inconnu"
-            mac = resolve_mac(ip)
             # Utiliser le nom stocké pour le MAC ou le user_display
             name = _get_user_name(mac) or user_display
             safe = _conv_safe(name)
@@ -1406,10 +1229,13 @@ async def handle_chat(request: web.Request) -> web.Response:
                     f.write(f"Conversation KITT — {name} — {ts_day}\n{'='*50}\n")
                 f.write(line_user)
                 f.write(line_assistant)
+            now = time.time()
+            _db.execute(insert_turns, [(now, safe, session_id, "user", user_msg, None),
+                                       (now, safe, session_id, "assistant", reply, None)])
         except Exception as e:
             print(f"[CONV] Erreur auto-save: {e}")
 
-    asyncio.create_task(_auto_save_conv(peername_info))
+    asyncio.create_task(_auto_save_conv(conv_mac))
 
     # TTS
     audio_url = None
@@ -1448,9 +1274,8 @@ async def handle_chat_stream(request: web.Request) -> web.StreamResponse:
     user_msg = body.get("message", "").strip()
     session_id = body.get("session_id", "default")
     # Résolution MAC pour préférences utilisateur persistantes
-    _sp = request.transport.get_extra_info("peername")
-    _sip = _sp[0] if _sp else "inconnu"
-    _smac = resolve_mac(_sip)
+    _sip, _smac = _client(request)
+    await _user_memories.preload(_smac)
     user_lang_pref = _get_user_lang(_smac)
     # Priorité langue : préférence stockée > Whisper > auto-détection
     client_lang = body.get("lang", "")
@@ -1463,7 +1288,8 @@ async def handle_chat_stream(request: web.Request) -> web.StreamResponse:
 
     # Function calling — commandes directes sans LLM
     user_display = body.get("user_name", "").strip() or get_user_display_name(request)
-    func_type, func_match = check_function_call(user_msg)
+    intents = _intent_router.route(user_msg)
+    func_type, func_match = intents.function()
     if func_type:
         func_reply = await execute_function(func_type, func_match, user_display)
         asyncio.create_task(broadcast_monitor({"type": "user_msg", "user": user_display, "session_id": session_id, "message": user_msg}))
@@ -1498,7 +1324,7 @@ async def handle_chat_stream(request: web.Request) -> web.StreamResponse:
     llm_user_msg = user_msg
     now = time.time()
     if (VISION_SCRIPT.exists()
-            and VISION_KEYWORDS.search(user_msg)
+            and intents.has("vision")
             and (now - _last_vision_time) >= VISION_COOLDOWN):
         t_vision = time.time()
         description = await capture_vision()
@@ -1518,7 +1344,7 @@ async def handle_chat_stream(request: web.Request) -> web.StreamResponse:
     # Lancer RAG + web_search en parallèle
     t_search = time.time()
     rag_task = asyncio.create_task(search_local_knowledge(user_msg))
-    web_task = asyncio.create_task(web_search(user_msg))
+    web_task = asyncio.create_task(web_search(user_msg, intents))
 
     # Préparer la réponse SSE immédiatement
     resp = web.StreamResponse()
@@ -1526,20 +1352,41 @@ async def handle_chat_stream(request: web.Request) -> web.StreamResponse:
     resp.headers["Cache-Control"] = "no-cache"
     await resp.prepare(request)
 
-    # Attendre 1 seconde — si les recherches ne sont pas terminées, annoncer à voix haute
-    done, pending = await asyncio.wait({rag_task, web_task}, timeout=1.0)
-    if pending:
-        _search_announce = "Consultation de ma base de données en cours."
-        await resp.write(f"data: {json.dumps({'token': _search_announce})}\n\n".encode())
-        _ann_audio = await _synth_chunk(_search_announce, "normal", lang)
-        if _ann_audio:
-            await resp.write(f"data: {json.dumps({'audio_chunk': _ann_audio, 'chunk_text': _search_announce})}\n\n".encode())
-        print(f"[RAG] Recherche longue ({(time.time()-t_search)*1000:.0f}ms) — annonce vocale", flush=True)
-
-    # Récupérer les résultats (attendre si pas encore terminés)
-    local_info = await rag_task
-    web_info = await web_task
-    print(f"[RAG] Recherches terminées en {(time.time()-t_search)*1000:.0f}ms", flush=True)
+    # Chemin de recherche (timing) : "local" (pas de web), "wait" (web indispensable),
+    # "fast" (web arrivé avant la deadline), "speculative" (LLM lancé sans attendre le web)
+    relevance = "none" if intents.has("private") else intents.web_relevance()
+    if relevance == "maybe":
+        local_info = await rag_task
+        done, _ = await asyncio.wait({web_task}, timeout=WEB_SPECULATIVE_DEADLINE)
+        if done:
+            web_info = web_task.result()
+            search_path = "fast"
+        else:
+            web_info = ""
+            search_path = "speculative"
+            web_task.add_done_callback(lambda t, q=user_msg: _keep_late_web(session_id, q, t))
+    else:
+        search_path = "wait" if relevance == "strong" else "local"
+        # Attendre 1 seconde — si les recherches ne sont pas terminées, annoncer à voix haute
+        done, pending = await asyncio.wait({rag_task, web_task}, timeout=1.0)
+        if pending:
+            _search_announce = "Consultation de ma base de données en cours."
+            await resp.write(f"data: {json.dumps({'token': _search_announce})}\n\n".encode())
+            _ann_audio = await _synth_chunk(_search_announce, "normal", lang)
+            if _ann_audio:
+                await resp.write(f"data: {json.dumps({'audio_chunk': _ann_audio, 'chunk_text': _search_announce})}\n\n".encode())
+            print(f"[RAG] Recherche longue ({(time.time()-t_search)*1000:.0f}ms) — annonce vocale", flush=True)
+
+        # Récupérer les résultats (attendre si pas encore terminés)
+        local_info = await rag_task
+        web_info = await web_task
+    print(f"[RAG] Recherches terminées en {(time.time()-t_search)*1000:.0f}ms ({search_path})", flush=True)
+
+    # Résultat web arrivé trop tard au tour précédent → contexte pour cette relance
+    late = _pop_late_web(session_id)
+    if late and not web_info:
+        llm_user_msg = f"[INFO WEB (question précédente: {late[0][:80]}):\n{late[1]}]\n{llm_user_msg}"
+        print(f"[WEB] Résultat tardif réinjecté ({len(late[1])} chars)", flush=True)
 
     if local_info:
         llm_user_msg = f"[CONNAISSANCE LOCALE:\n{local_info}]\n{llm_user_msg}"
@@ -1561,6 +1408,7 @@ async def handle_chat_stream(request: web.Request) -> web.StreamResponse:
     t0 = time.time()
     tts_lang = lang
     tts_lang_locked = bool(user_lang_pref)  # Verrouillé si préférence stockée
+    ttft_ms = None
 
     # Fonction pour envoyer l'audio dès qu'il est prêt
     async def send_audio_when_ready(task, chunk_text):
@@ -1600,6 +1448,9 @@ async def handle_chat_stream(request: web.Request) -> web.StreamResponse:
                                 continue
                             _clean_emitted = clean_buf
                             sentence_buf += new_content
+                            if ttft_ms is None:
+                                ttft_ms = (time.time() - t_search) * 1000
+                                _record_ttft(search_path, ttft_ms)
                             await resp.write(f"data: {json.dumps({'token': new_content})}\n\n".encode())
                             # Lancer TTS dès qu'une phrase est complète ET envoyer l'audio dès qu'il est prêt
                             match = re.search(r'[.!?…]\s', sentence_buf)
@@ -1653,10 +1504,10 @@ async def handle_chat_stream(request: web.Request) -> web.StreamResponse:
     conversations[session_id].append({"role": "assistant", "content": full_reply_clean})
 
     # Mémoire par utilisateur — extraire les faits du message utilisateur
-    if _MEMORY_FORGET.search(user_msg):
+    if intents.has("forget"):
         clear_memory_for_user(user_display, _smac)
     else:
-        fact = extract_memory_fact(user_msg, user_display)
+        fact = extract_memory_fact(user_msg, user_display, intents)
         if fact:
             add_memory(fact, user_display, _smac)
 
@@ -1669,11 +1520,9 @@ async def handle_chat_stream(request: web.Request) -> web.StreamResponse:
     asyncio.create_task(broadcast_monitor({"type": "assistant_msg", "user": user_display, "session_id": session_id, "message": full_reply}))
 
     # Sauvegarde automatique de la conversation pour l'archive
-    peername_info = request.transport.get_extra_info("peername")
-    async def _auto_save_conv(pname):
+    _, conv_mac = _client(request)
+    async def _auto_save_conv(mac):
         try:
-            ip = pname[0] if pname else "inconnu"
-            mac = resolve_mac(ip)
             # Utiliser le nom stocké pour le MAC ou le user_display
             name = _get_user_name(mac) or user_display
             safe = _conv_safe(name)
@@ -1692,10 +1541,13 @@ async def handle_chat_stream(request: web.Request) -> web.StreamResponse:
                     f.write(f"Conversation KITT — {name} — {ts_day}\n{'='*50}\n")
                 f.write(line_user)
                 f.write(line_assistant)
+            now = time.time()
+            _db.execute(insert_turns, [(now, safe, session_id, "user", user_msg, None),
+                                       (now, safe, session_id, "assistant", full_reply, None)])
         except Exception as e:
             print(f"[CONV] Erreur auto-save (stream): {e}")
 
-    asyncio.create_task(_auto_save_conv(peername_info))
+    asyncio.create_task(_auto_save_conv(conv_mac))
 
     # Attendre que tous les TTS soient terminés avant d'envoyer le message "done"
     t_tts = time.time()
@@ -1703,7 +1555,8 @@ async def handle_chat_stream(request: web.Request) -> web.StreamResponse:
         await asyncio.gather(*tts_items, return_exceptions=True)
     tts_ms = (time.time() - t_tts) * 1000
 
-    timing = {'llm_ms': round(llm_ms), 'tts_ms': round(tts_ms), 'emotion': emotion}
+    timing = {'llm_ms': round(llm_ms), 'tts_ms': round(tts_ms), 'emotion': emotion,
+              'search_path': search_path, 'ttft_ms': round(ttft_ms) if ttft_ms is not None else None}
     if vision_ms:
         timing['vision_ms'] = round(vision_ms)
     await resp.write(f"data: {json.dumps({'done': True, 'timing': timing})}\n\n".encode())
@@ -1727,22 +1580,29 @@ async def handle_stt(request: web.Request) -> web.Response:
     if not audio_data:
         return web.json_response({"error": "Pas d'audio reçu"}, status=400)
 
-    # Sauvegarder temporairement le fichier audio
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-        f.write(audio_data)
-        tmp_path = f.name
-
     # Option 1 : forcer la langue préférée de l'utilisateur dans Whisper
-    peername = request.transport.get_extra_info("peername")
-    _ip = peername[0] if peername else "inconnu"
-    _mac = resolve_mac(_ip)
+    _ip, _mac = _client(request)
     user_lang = _get_user_lang(_mac) or "fr"  # défaut: français
 
     t0 = time.time()
+    # VAD serveur : décodage unique + découpe de la parole, rejet des clips vides sans appel modèle
+    try:
+        audio = decode_upload(audio_data)
+        vad = trim_speech(audio)
+    except Exception as e:
+        vlog(f"STT_DECODE_ERROR {e}")
+        return web.json_response({"error": f"STT erreur: {e}"}, status=400)
+    speech_ms = vad.speech_ms
+    if vad.rejected:
+        stt_ms = (time.time() - t0) * 1000
+        print(f"[STT] {stt_ms:.0f}ms | aucune parole ({vad.duration_s:.1f}s, {vad.method})")
+        return web.json_response({"text": "", "language": user_lang, "stt_ms": round(stt_ms),
+                                  "speech_ms": speech_ms, "vad": "rejected"})
+
     try:
-        vlog("STT_START")
+        vlog(f"STT_START speech={speech_ms}ms trim={vad.start_s:.2f}-{vad.end_s:.2f}/{vad.duration_s:.2f}s")
         segments, info = whisper_model.transcribe(
-            tmp_path,
+            vad.audio,
             language=user_lang,
             beam_size=5,
             vad_filter=True,
@@ -1758,7 +1618,7 @@ async def handle_stt(request: web.Request) -> web.Response:
         if not _get_user_lang(_mac) and info.language_probability < 0.75 and info.language != "fr":
             print(f"[STT] Confiance faible ({info.language_probability:.2f}, detecte={info.language}), retry fr")
             segs2, info2 = whisper_model.transcribe(
-                tmp_path,
+                vad.audio,
                 language="fr",
                 beam_size=5,
                 vad_filter=True,
@@ -1773,94 +1633,65 @@ async def handle_stt(request: web.Request) -> web.Response:
             stt_ms = (time.time() - t0) * 1000
 
         vlog(f"STT_DONE {stt_ms:.0f}ms lang={info.language}({info.language_probability:.2f})")
-        print(f"[STT] {stt_ms:.0f}ms | lang={info.language}({info.language_probability:.2f}) | {text[:80]}")
+        print(f"[STT] {stt_ms:.0f}ms | vad={vad.vad_ms:.0f}ms({vad.method}) | lang={info.language}({info.language_probability:.2f}) | {text[:80]}")
     except Exception as e:
         vlog(f"STT_ERROR {e}")
-        os.unlink(tmp_path)
         return web.json_response({"error": f"STT erreur: {e}"}, status=500)
 
-    os.unlink(tmp_path)
-    return web.json_response({"text": text, "language": info.language, "stt_ms": round(stt_ms)})
+    return web.json_response({"text": text, "language": info.language, "stt_ms": round(stt_ms),
+                              "speech_ms": speech_ms})
 
 
 # ── Vision daemon persistant ─────────────────────────────────────────────
-_vision_proc = None
-_vision_lock = asyncio.Lock()
-
-
-async def _start_vision_daemon():
-    """Démarre le daemon vision (modèle chargé une seule fois en mémoire)."""
-    global _vision_proc
-    if _vision_proc is not None and _vision_proc.returncode is None:
-        return  # déjà actif
-    _vision_proc = await asyncio.create_subprocess_exec(
-        "/usr/bin/python3", str(VISION_SCRIPT), "--daemon",
-        stdin=asyncio.subprocess.PIPE,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    try:
-        ready = await asyncio.wait_for(_vision_proc.stdout.readline(), timeout=30)
-        print(f"[VISION] Daemon démarré: {ready.decode().strip()}", flush=True)
-    except asyncio.TimeoutError:
-        print("[VISION] Daemon timeout au démarrage", flush=True)
-        _vision_proc.kill()
-        _vision_proc = None
+# Protocole tramé avec ids de requête (vision_client.py) : requêtes concurrentes,
+# événements poussés (mouvement, nb de personnes), heartbeat et relance supervisée.
+
+
+async def _on_vision_start():
+    if _vigilance_enabled:
+        await _vision.call("watch", enabled=True)  # daemon relancé : la vigilance reprend
+
+
+_vision = VisionDaemon(["/usr/bin/python3", str(VISION_SCRIPT), "--daemon"],
+                       on_event=lambda ev: _on_vision_event(ev), on_start=_on_vision_start)
+
+
+async def _vision_request(max_age_ms: int, mode: str) -> dict | None:
+    """Commande `capture` au daemon : résultat réutilisé s'il date de moins de max_age_ms.
+
+    mode « count » : comptage seul (pas d'analyse des couleurs), « full » : description complète.
+    """
+    return await _vision.call("capture", max_age_ms=max_age_ms, mode=mode)
 
 
 async def capture_vision() -> str | None:
-    """Envoie une commande au daemon vision et retourne la description."""
-    global _vision_proc
-    async with _vision_lock:
-        try:
-            if _vision_proc is None or _vision_proc.returncode is not None:
-                await _start_vision_daemon()
-            if _vision_proc is None:
-                return None
-            _vision_proc.stdin.write(b"capture\n")
-            await _vision_proc.stdin.drain()
-            line = await asyncio.wait_for(_vision_proc.stdout.readline(), timeout=15)
-            if not line:
-                raise RuntimeError("Daemon vision: réponse vide")
-            data = json.loads(line.decode())
-            if "error" in data:
-                print(f"[VISION] {data['error']}")
-                return None
-            return data.get("description")
-        except Exception as e:
-            print(f"[VISION] Exception: {e}")
-            # Tuer le daemon défaillant — il sera relancé au prochain appel
-            if _vision_proc and _vision_proc.returncode is None:
-                _vision_proc.kill()
-            _vision_proc = None
-            return None
+    """Description de la scène (réutilise une détection complète récente du chat).
 
+    Un passage vigilance (personnes seules, basse résolution) ne couvre pas ce profil.
+    """
+    data = await _vision_request(VISION_MAX_AGE_MS, "full")
+    return data.get("description") if data else None
 
-async def _capture_vision_persons() -> int:
-    """Retourne le nb de personnes détectées (-1 si erreur/caméra indisponible)."""
-    global _vision_proc
-    async with _vision_lock:
-        try:
-            if _vision_proc is None or _vision_proc.returncode is not None:
-                await _start_vision_daemon()
-            if _vision_proc is None:
-                return -1
-            _vision_proc.stdin.write(b"capture\n")
-            await _vision_proc.stdin.drain()
-            line = await asyncio.wait_for(_vision_proc.stdout.readline(), timeout=15)
-            if not line:
-                return -1
-            data = json.loads(line.decode())
-            if "error" in data:
-                return -1
-            objects = data.get("objects", [])
-            return sum(1 for o in objects if o.get("label") == "personne")
-        except Exception as e:
-            print(f"[VIGILANCE] Erreur capture: {e}")
-            if _vision_proc and _vision_proc.returncode is None:
-                _vision_proc.kill()
-            _vision_proc = None
-            return -1
+
+async def handle_vision_stats(request: web.Request) -> web.Response:
+    """GET /api/vision/stats — État du daemon (supervision, caméra, cache, vigilance)."""
+    daemon = _vision.stats()
+    if daemon["running"]:
+        daemon.update(await _vision.call("stats", timeout=5) or {})
+    return web.json_response(daemon)
+
+
+async def handle_vision_frame(request: web.Request) -> web.Response:
+    """GET /api/vision/frame — Dernière image caméra en JPEG (debug, IPs locales)."""
+    ip, _ = _client(request)
+    if not _is_local_ip(ip):
+        return web.json_response({"error": "Accès refusé"}, status=403)
+    data = await _vision.call("frame", format="jpeg")
+    if data is None:
+        return web.json_response({"error": "Camera indisponible"}, status=503)
+    # L'image transite par /dev/shm, pas par le tube du protocole
+    body = await asyncio.get_running_loop().run_in_executor(None, Path(data["path"]).read_bytes)
+    return web.Response(body=body, content_type="image/jpeg")
 
 
 async def handle_vision(request: web.Request) -> web.StreamResponse:
@@ -1876,9 +1707,7 @@ async def handle_vision(request: web.Request) -> web.StreamResponse:
     if session_id not in conversations:
         conversations[session_id] = []
 
-    _vp = request.transport.get_extra_info("peername")
-    _vip = _vp[0] if _vp else "inconnu"
-    _vmac = resolve_mac(_vip)
+    _vip, _vmac = _client(request)
     user_display = get_user_display_name(request)
     asyncio.create_task(broadcast_monitor({"type": "user_msg", "user": user_display, "session_id": session_id, "message": user_msg}))
 
@@ -2002,11 +1831,14 @@ async def handle_health(request: web.Request) -> web.Response:
         "status": "en ligne" if llm_ok else "llm_hors_ligne",
         "kitt": "Knight Industries Two Thousand — opérationnel",
         "llm_server": llm_ok,
+        "whisper": f"{_whisper_device}/{_whisper_compute}",
+        "web_search": _web_cache.breaker.state,
+        "neighbours": _neighbours.stats(),
     })
 
 
 async def _save_session_summary(mac: str, user_name: str, history: list):
-    """Génère un résumé LLM de la session et le stocke dans user_memories."""
+    """Génère un résumé LLM de la session et le stocke dans la mémoire de l'utilisateur."""
     try:
         msgs = [{"role": "system", "content": "Tu es un assistant de synthèse. Résume en 1 phrase courte (max 30 mots) la conversation ci-dessous. Réponds uniquement avec la phrase de résumé, sans introduction."}]
         msgs.extend(history[-6:])
@@ -2020,14 +1852,11 @@ async def _save_session_summary(mac: str, user_name: str, history: list):
                 summary = re.sub(r'<think>.*?</think>', '', summary, flags=re.DOTALL).strip()
                 summary = re.sub(r'<\|[^|]+\|>', '', summary).strip()
                 if summary:
-                    mem = _load_user_memory(mac)
-                    mem.setdefault("summaries", []).append({
+                    await _user_memories.preload(mac)
+                    _user_memories.add_summary(mac, {
                         "date": datetime.now().isoformat()[:10],
                         "text": summary,
                     })
-                    if len(mem["summaries"]) > 5:
-                        mem["summaries"] = mem["summaries"][-5:]
-                    _save_user_memory(mac, mem)
                     print(f"[MEMORY] Résumé {user_name}: {summary}")
     except Exception as e:
         print(f"[MEMORY] Erreur résumé session: {e}")
@@ -2037,9 +1866,7 @@ async def handle_reset(request: web.Request) -> web.Response:
     body = await request.json()
     session_id = body.get("session_id", "default")
     # Résoudre MAC pour sauvegarder le résumé avant reset
-    _rp = request.transport.get_extra_info("peername")
-    _rip = _rp[0] if _rp else "inconnu"
-    _rmac = resolve_mac(_rip)
+    _rip, _rmac = _client(request)
     _rname = _get_user_name(_rmac) or "inconnu"
     history = conversations.get(session_id, [])
     if len(history) >= 4:
@@ -2050,11 +1877,9 @@ async def handle_reset(request: web.Request) -> web.Response:
 
 async def handle_memory(request: web.Request) -> web.Response:
     """GET /api/memory — Retourne les souvenirs du user connecté (filtrés par MAC)."""
-    _mp = request.transport.get_extra_info("peername")
-    _mip = _mp[0] if _mp else "inconnu"
-    _mmac = resolve_mac(_mip)
-    mem = _load_user_memory(_mmac)
-    return web.json_response(mem)
+    _mip, _mmac = _client(request)
+    await _user_memories.preload(_mmac)
+    return web.json_response(_user_memories.snapshot(_mmac))
 
 
 async def handle_memory_add(request: web.Request) -> web.Response:
@@ -2082,8 +1907,36 @@ _last_temp_alert = 0.0
 
 # ── Mode Vigilance ──────────────────────────────────────────────────────
 _vigilance_enabled: bool = False
-_vigilance_last_count: int = -1   # nb personnes détectées au dernier check
-_vigilance_last_check: float = 0.0
+_vigilance_last_count: int = -1   # nb personnes détectées au dernier événement
+_vigilance_last_motion: float = 0.0
+
+
+async def _on_vision_event(event: dict):
+    """Événements poussés par le daemon vision (mode vigilance)."""
+    global _vigilance_last_count, _vigilance_last_motion
+    if event.get("event") == "motion":
+        _vigilance_last_motion = time.time()
+        return
+    if event.get("event") != "persons" or not _vigilance_enabled:
+        return
+    count = int(event.get("count", -1))
+    prev = _vigilance_last_count
+    _vigilance_last_count = count
+    print(f"[VIGILANCE] Personnes: {prev} → {count}", flush=True)
+    if not _proactive_ws:
+        return
+    idle = time.time() - _last_interaction_time
+    if prev == 0 and count >= 1 and idle > 300:
+        # Terminal inactif depuis 5min — présence détectée
+        await send_vigilance_alert(
+            "Alerte. Présence détectée sur terminal inactif. "
+            "Identité non confirmée."
+        )
+    elif prev >= 1 and count >= 2 and prev < 2:
+        # Présence additionnelle dans la zone
+        await send_vigilance_alert(
+            "Vigilance. Présence non identifiée détectée dans la zone."
+        )
 _last_interaction_time: float = time.time()  # dernière interaction utilisateur
 
 async def handle_proactive_ws(request: web.Request) -> web.WebSocketResponse:
@@ -2202,29 +2055,6 @@ async def proactive_loop(app):
             if ram_avail < 100 and _proactive_ws:
                 await send_proactive(f"Attention Manix. Seulement {ram_avail}MB de RAM disponible. Mes systèmes sont en charge critique.", "worried")
 
-            # ── Mode Vigilance — surveillance caméra ─────────────────
-            global _vigilance_last_check, _vigilance_last_count
-            now_v = time.time()
-            if (_vigilance_enabled and _proactive_ws and VISION_SCRIPT.exists()
-                    and (now_v - _vigilance_last_check) >= 20):
-                _vigilance_last_check = now_v
-                count = await _capture_vision_persons()
-                if count >= 0:
-                    prev = _vigilance_last_count
-                    _vigilance_last_count = count
-                    idle = now_v - _last_interaction_time
-                    if prev == 0 and count >= 1 and idle > 300:
-                        # Terminal inactif depuis 5min — présence détectée
-                        await send_vigilance_alert(
-                            "Alerte. Présence détectée sur terminal inactif. "
-                            "Identité non confirmée."
-                        )
-                    elif prev >= 1 and count >= 2 and prev < 2:
-                        # Présence additionnelle dans la zone
-                        await send_vigilance_alert(
-                            "Vigilance. Présence non identifiée détectée dans la zone."
-                        )
-
         except Exception as e:
             print(f"[PROACTIVE] Erreur: {e}")
 
@@ -2275,6 +2105,9 @@ async def handle_vigilance(request: web.Request) -> web.Response:
     _vigilance_enabled = bool(body.get("enabled", False))
     _vigilance_last_count = -1  # reset à chaque toggle
     print(f"[VIGILANCE] Mode {'ACTIVÉ' if _vigilance_enabled else 'DÉSACTIVÉ'}")
+    # Le daemon détecte le mouvement en continu et pousse les changements du nb de personnes
+    if VISION_SCRIPT.exists():
+        await _vision.call("watch", enabled=_vigilance_enabled)
     return web.json_response({"vigilance": _vigilance_enabled})
 
 
@@ -2580,8 +2413,9 @@ async def handle_conv_identify(request):
     except Exception:
         body = {}
     c_uuid = body.get('uuid') or str(uuid.uuid4())
-    ip = request.remote
-    mac = None if ip in ('127.0.0.1', '::1') else resolve_mac(ip)
+    info = client_info(request, _neighbours)
+    # Client du tunnel (ou local) : l'IP change, on garde l'UUID du navigateur
+    mac = None if info.forwarded or info.ip in ('127.0.0.1', '::1') else info.mac
     uid = mac if mac else c_uuid
     users = _conv_load_users()
     if uid in users:
@@ -2605,7 +2439,7 @@ async def handle_conv_register(request):
         "created_at": datetime.now(timezone.utc).isoformat(),
         "conv_count": 0,
     }
-    _conv_save_users(users)
+    _conv_save_user(uid)
     (CONV_STORE_DIR / _conv_safe(name)).mkdir(exist_ok=True)
     print(f"[CONV] Nouvel utilisateur enregistré : {name} ({uid[:16]})")
     return web.json_response({"ok": True, "name": name})
@@ -2631,15 +2465,19 @@ async def handle_conv_save(request):
     ts   = datetime.now().strftime('%Y-%m-%d_%H-%M')
     fname = f"conv_{ts}.txt"
     lines = [f"Conversation KITT — {name} — {ts}\n{'='*50}\n"]
+    turns = []
+    now = time.time()
     for m in msgs:
         role = m.get('role', 'user')
         text = m.get('text', '').strip()
         t    = m.get('time', '')
         prefix = 'KITT' if role == 'assistant' else name.upper()
         lines.append(f"[{t}] {prefix}: {text}\n")
+        turns.append((now, safe, None, 'assistant' if role == 'assistant' else 'user', text, f"{safe}/{fname}"))
     (user_dir / fname).write_text(''.join(lines), encoding='utf-8')
+    _db.execute(insert_turns, turns)
     users[uid]['conv_count'] = users[uid].get('conv_count', 0) + 1
-    _conv_save_users(users)
+    _conv_save_user(uid)
     print(f"[CONV] Conversation sauvée : {name}/{fname} ({len(msgs)} messages)")
     return web.json_response({"ok": True, "file": fname})
 
@@ -2693,6 +2531,39 @@ async def handle_conv_read(request):
     return web.json_response({"content": content})
 
 
+async def handle_conv_search(request):
+    """GET /api/conv/search — Tours du journal filtrés (user, from, to, session, q), en NDJSON (protégé admin)."""
+    if not _conv_check_token(request):
+        return web.json_response({"error": "Non autorisé"}, status=401)
+    q = request.query
+    since, until = q.get('from', ''), q.get('to', '')
+    for day in (since, until):
+        if day and not re.fullmatch(r'\d{4}-\d{2}-\d{2}', day):
+            return web.json_response({"error": "Date attendue : AAAA-MM-JJ"}, status=400)
+    try:
+        limit = min(int(q.get('limit', SEARCH_LIMIT)), SEARCH_LIMIT_MAX)
+    except ValueError:
+        return web.json_response({"error": "limit invalide"}, status=400)
+    text = q.get('q', '').strip()
+    # Sélection par l'index (aucune I/O) puis lecture des seuls groupes retenus
+    refs = _conv_log.plan(q.get('user', '').strip(), since, until, q.get('session', '').strip())
+    resp = web.StreamResponse(headers={"Content-Type": "application/x-ndjson; charset=utf-8"})
+    await resp.prepare(request)
+    loop = asyncio.get_running_loop()
+    sent = 0
+    for ref in refs:
+        events = await loop.run_in_executor(None, _conv_log.read, ref)
+        chunk = [json.dumps(ev, ensure_ascii=False) for ev in events if _conv_log.matches(ev, text)]
+        chunk = chunk[:limit - sent]
+        if chunk:
+            await resp.write(("\n".join(chunk) + "\n").encode("utf-8"))
+            sent += len(chunk)
+        if sent >= limit:
+            break
+    await resp.write_eof()
+    return resp
+
+
 # ── App ──────────────────────────────────────────────────────────────────
 def create_app() -> web.Application:
     middlewares = []
@@ -2708,17 +2579,23 @@ def create_app() -> web.Application:
     app.router.add_post("/api/chat", handle_chat)
     app.router.add_post("/api/chat/stream", handle_chat_stream)
     app.router.add_post("/api/vision", handle_vision)
+    app.router.add_get("/api/vision/stats", handle_vision_stats)
+    app.router.add_get("/api/vision/frame", handle_vision_frame)
     app.router.add_get("/api/health", handle_health)
     app.router.add_post("/api/reset", handle_reset)
     app.router.add_post("/api/stt", handle_stt)
     app.router.add_post("/api/set-name", handle_set_name)
     app.router.add_get("/api/whoami", handle_whoami)
     app.router.add_get("/api/monitor/ws", handle_monitor_ws)
+    app.router.add_get("/api/monitor/stats", handle_monitor_stats)
     app.router.add_post("/api/set-lang", handle_set_lang)
     app.router.add_post("/api/ping", handle_ping)
     app.router.add_get("/api/stats", handle_stats)
     app.router.add_get("/api/visitors", handle_visitors)
     app.router.add_get("/api/memory", handle_memory)
+    app.router.add_get("/api/knowledge/status", handle_knowledge_status)
+    app.router.add_get("/api/web/stats", handle_web_stats)
+    app.router.add_get("/api/intents/stats", handle_intent_stats)
     app.router.add_post("/api/memory", handle_memory_add)
     app.router.add_get("/api/proactive/ws", handle_proactive_ws)
     app.router.add_post("/api/vigilance", handle_vigilance)
@@ -2742,6 +2619,7 @@ def create_app() -> web.Application:
     app.router.add_post("/api/conv/save",     handle_conv_save)
     app.router.add_post("/api/conv/auth",     handle_conv_auth)
     app.router.add_get( "/api/conv/list",     handle_conv_list)
+    app.router.add_get( "/api/conv/search",   handle_conv_search)
     app.router.add_get( "/api/conv/read/{user}/{filename}", handle_conv_read)
     app.router.add_static("/audio", AUDIO_DIR)
     app.router.add_static("/static", STATIC_DIR)
@@ -2749,21 +2627,28 @@ def create_app() -> web.Application:
     async def start_background(app):
         app["cleanup_task"] = asyncio.create_task(cleanup_audio(app))
         app["proactive_task"] = asyncio.create_task(proactive_loop(app))
+        app["knowledge_task"] = asyncio.create_task(_knowledge.watch(_on_knowledge_change))
+        app["memory_task"] = asyncio.create_task(_user_memories.run())
+        app["neighbour_task"] = asyncio.create_task(_neighbours.watch())
+        app["monitor_log_task"] = asyncio.create_task(_monitor_bus.run())
 
     async def stop_background(app):
-        for key in ("cleanup_task", "proactive_task"):
+        for key in ("cleanup_task", "proactive_task", "knowledge_task", "memory_task", "neighbour_task",
+                    "monitor_log_task"):
             task = app.get(key)
             if task:
                 task.cancel()
+        _monitor_bus.close()
+        _conv_log.rotate()
+        # Écrire les profils mémoire encore en attente
+        written = _user_memories.flush()
+        if written:
+            print(f"[MEMORY] {written} profil(s) sauvegardé(s) à l'arrêt")
+        _db.close()
         if _llm_session and not _llm_session.closed:
             await _llm_session.close()
         # Arrêter le daemon vision
-        if _vision_proc and _vision_proc.returncode is None:
-            _vision_proc.stdin.write(b"quit\n")
-            try:
-                await asyncio.wait_for(_vision_proc.wait(), timeout=3)
-            except asyncio.TimeoutError:
-                _vision_proc.kill()
+        await _vision.close()
 
     app.on_startup.append(start_background)
     app.on_cleanup.append(stop_background)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+KITT — Mémoire par utilisateur en RAM, écriture différée (write-behind).
+
+Chaque profil (faits + résumés d'une MAC) est lu une seule fois par load()
+puis servi depuis la RAM : la construction du prompt ne fait plus aucune I/O
+disque. Les modifications marquent le profil « sale » ; un flush périodique
+(ou à l'arrêt) écrit les profils sales par save() dans un thread de l'executor.
+
+Le stockage est interchangeable (load/save) : côté serveur, tables
+facts/summaries de kitt.db ; sans load/save, un fichier JSON par profil dans
+`directory` (écriture atomique : fichier temporaire + rename).
+
+Un verrou par utilisateur sérialise modifications et instantanés : un résumé
+de session et un fait ajoutés en même temps ne peuvent plus s'écraser, et le
+flush n'écrit jamais un profil à moitié modifié.
+"""
+
+import asyncio
+import copy
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+FLUSH_INTERVAL = 5.0   # s — délai max avant écriture d'un profil modifié
+MAX_FACTS = 50
+MAX_SUMMARIES = 5
+
+
+def mac_to_key(mac: str) -> str:
+    """Convertit une MAC/IP en nom de fichier sûr."""
+    return re.sub(r'[^a-zA-Z0-9_\-]', '_', mac)
+
+
+def empty_memory() -> dict:
+    return {"facts": [], "summaries": []}
+
+
+class UserMemoryStore:
+    """Cache des profils mémoire avec suivi des modifications et flush atomique."""
+
+    def __init__(self, directory: Path | None = None, flush_interval: float = FLUSH_INTERVAL,
+                 load=None, save=None):
+        self.directory = directory
+        self.load = load or self._load_file      # load(mac) -> dict | None
+        self.save = save or self._save_file      # save(mac, mem) — appelé hors boucle asyncio
+        self.flush_interval = flush_interval
+        self._mem: dict[str, dict] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._version: dict[str, int] = {}   # incrémenté à chaque modification
+        self._saved: dict[str, int] = {}     # version présente sur disque
+        self._guard = threading.Lock()       # protège la création des entrées
+        self._flushing = threading.Lock()    # un seul flush à la fois (timer / arrêt)
+        self.writes = 0
+        self.errors = 0
+
+    def _path(self, mac: str) -> Path:
+        return self.directory / f"{mac_to_key(mac)}.json"
+
+    def _load_file(self, mac: str) -> dict | None:
+        f = self._path(mac)
+        return json.loads(f.read_text()) if f.exists() else None
+
+    def _save_file(self, mac: str, mem: dict):
+        f = self._path(mac)
+        tmp = f.with_name(f.name + ".tmp")
+        tmp.write_text(json.dumps(mem, indent=2, ensure_ascii=False))
+        os.replace(tmp, f)
+
+    def _lock(self, mac: str) -> threading.Lock:
+        with self._guard:
+            lock = self._locks.get(mac)
+            if lock is None:
+                lock = self._locks[mac] = threading.Lock()
+            return lock
+
+    def _entry(self, mac: str) -> dict:
+        """Profil en RAM (chargé depuis le disque au premier accès)."""
+        mem = self._mem.get(mac)
+        if mem is not None:
+            return mem
+        mem = empty_memory()
+        try:
+            loaded = self.load(mac)
+            if loaded:
+                mem = loaded
+                mem.setdefault("facts", [])
+                mem.setdefault("summaries", [])
+        except Exception as e:
+            print(f"[MEMORY] Profil {mac} illisible: {e}", flush=True)
+        self._mem[mac] = mem
+        self._version.setdefault(mac, 0)
+        self._saved.setdefault(mac, 0)
+        return mem
+
+    def get(self, mac: str) -> dict:
+        """Profil d'un utilisateur (lecture seule — ne pas modifier le dict retourné)."""
+        if not mac:
+            return empty_memory()
+        with self._lock(mac):
+            return self._entry(mac)
+
+    async def preload(self, mac: str):
+        """Premier accès chargé dans l'executor : get() ne touche ensuite plus au stockage."""
+        if mac and mac not in self._mem:
+            await asyncio.get_running_loop().run_in_executor(None, self.get, mac)
+
+    def snapshot(self, mac: str) -> dict:
+        """Copie indépendante du profil (réponses API)."""
+        if not mac:
+            return empty_memory()
+        with self._lock(mac):
+            return copy.deepcopy(self._entry(mac))
+
+    def update(self, mac: str, fn):
+        """Applique fn(mem) sous le verrou de l'utilisateur et marque le profil sale."""
+        if not mac:
+            return None
+        with self._lock(mac):
+            mem = self._entry(mac)
+            result = fn(mem)
+            self._version[mac] += 1
+            return result
+
+    def add_fact(self, mac: str, fact: dict):
+        def _add(mem):
+            mem["facts"].append(fact)
+            if len(mem["facts"]) > MAX_FACTS:
+                mem["facts"] = mem["facts"][-MAX_FACTS:]
+        self.update(mac, _add)
+
+    def add_summary(self, mac: str, summary: dict):
+        def _add(mem):
+            mem.setdefault("summaries", []).append(summary)
+            if len(mem["summaries"]) > MAX_SUMMARIES:
+                mem["summaries"] = mem["summaries"][-MAX_SUMMARIES:]
+        self.update(mac, _add)
+
+    def clear_facts(self, mac: str):
+        self.update(mac, lambda mem: mem.__setitem__("facts", []))
+
+    @property
+    def dirty(self) -> list[str]:
+        return [mac for mac, v in self._version.items() if v != self._saved.get(mac)]
+
+    def flush(self) -> int:
+        """Écrit les profils modifiés (tmp + rename). Retourne le nombre de fichiers écrits."""
+        with self._flushing:
+            return self._flush()
+
+    def _flush(self) -> int:
+        written = 0
+        for mac in self.dirty:
+            with self._lock(mac):
+                version = self._version[mac]
+                data = copy.deepcopy(self._mem[mac])
+            try:
+                self.save(mac, data)
+            except Exception as e:
+                self.errors += 1
+                print(f"[MEMORY] Erreur écriture {mac}: {e}", flush=True)
+                continue
+            # Une modification pendant l'écriture laisse le profil sale pour le prochain flush
+            self._saved[mac] = version
+            written += 1
+        self.writes += written
+        return written
+
+    async def run(self):
+        """Boucle de flush périodique (tâche de fond du serveur)."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self.dirty:
+                await loop.run_in_executor(None, self.flush)
+
+    def stats(self) -> dict:
+        return {"cached": len(self._mem), "dirty": len(self.dirty),
+                "writes": self.writes, "errors": self.errors}
@@ -133,6 +133,8 @@ class MonitorApp:
                 self.append_text(timestamp, "user_name", user, "user_msg", message)
             elif msg_type == "assistant_msg":
                 self.append_text(timestamp, "kyronex_name", "KYRONEX", "kyronex_msg", message)
+            elif msg_type == "lagged":
+                self.append_system(f"{event.get('dropped', '?')} événement(s) perdu(s) (monitor en retard)")
             else:
                 self.append_system(f"Event inconnu: {msg_type}")
         except Exception as e:
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+KITT — Bus d'événements du monitor (non bloquant).
+
+Avant : broadcast_monitor attendait ws.send_str de chaque monitor l'un après
+l'autre puis ouvrait logs/conversations.jsonl sur la boucle asyncio à chaque
+événement — un client lent retardait tous les autres et l'I/O disque était sur
+le chemin de la requête. Maintenant :
+
+  • publish() est synchrone et O(abonnés) : aucun await, aucune I/O
+  • chaque abonné a une file bornée et sa propre tâche d'envoi ; file pleine →
+    les événements en trop sont comptés et un marqueur {"type": "lagged"}
+    est envoyé dès que le client rattrape ; trop en retard → déconnecté
+  • un écrivain de fond regroupe les lignes JSONL et les passe par lots à
+    writer(lines) dans un thread de l'executor (journal tournant conv_log.py)
+  • un tampon circulaire des N derniers événements est rejoué à la connexion
+"""
+
+import asyncio
+import json
+from collections import deque
+from datetime import datetime, timezone
+
+QUEUE_SIZE = 256          # événements en attente max par abonné
+MAX_LAG = 1000            # événements perdus avant déconnexion du client
+REPLAY_SIZE = 100         # événements rejoués à la connexion
+FLUSH_INTERVAL = 1.0      # s — regroupement des écritures JSONL
+FLUSH_BATCH = 200         # lignes — écriture anticipée si le lot est plein
+
+
+class Subscriber:
+    """Un monitor connecté : file bornée + tâche d'envoi."""
+
+    def __init__(self, ws, name: str = ""):
+        self.ws = ws
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+        self.dropped = 0       # perdus depuis le dernier marqueur « lagged »
+        self.total_dropped = 0
+        self.sent = 0
+        self.closed = False
+        self.task: asyncio.Task | None = None
+
+    def offer(self, msg: str) -> bool:
+        """Dépose un message sans attendre. False si le client est irrécupérable."""
+        try:
+            self.queue.put_nowait(msg)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self.total_dropped += 1
+            return self.dropped < MAX_LAG
+        return True
+
+    async def run(self):
+        try:
+            while True:
+                msg = await self.queue.get()
+                if self.dropped:
+                    lagged = {"type": "lagged", "dropped": self.dropped,
+                              "timestamp": datetime.now(timezone.utc).isoformat()}
+                    self.dropped = 0
+                    await self.ws.send_str(json.dumps(lagged))
+                await self.ws.send_str(msg)
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        finally:
+            self.closed = True
+
+
+class MonitorBus:
+    """Diffusion des événements aux monitors + journal JSONL différé."""
+
+    def __init__(self, writer=None, replay_size: int = REPLAY_SIZE):
+        self.writer = writer           # writer(lines) — appelé hors boucle asyncio
+        self._subs: dict[object, Subscriber] = {}
+        self._ring: deque[str] = deque(maxlen=replay_size)
+        self._pending: list[str] = []
+        self._wake: asyncio.Event | None = None
+        self.published = 0
+        self.kicked = 0
+        self.log_writes = 0
+        self.log_errors = 0
+
+    def __len__(self):
+        return len(self._subs)
+
+    def publish(self, event: dict) -> str:
+        """Horodate, diffuse et journalise un événement. Ne bloque jamais."""
+        event["timestamp"] = datetime.now(timezone.utc).isoformat()
+        msg = json.dumps(event, ensure_ascii=False)
+        self.published += 1
+        self._ring.append(msg)
+        for ws, sub in list(self._subs.items()):
+            if sub.closed or not sub.offer(msg):
+                self._kick(ws, sub)
+        if self.writer is not None:
+            self._pending.append(msg)
+            if len(self._pending) >= FLUSH_BATCH and self._wake is not None:
+                self._wake.set()
+        return msg
+
+    def subscribe(self, ws, name: str = "") -> Subscriber:
+        """Enregistre un monitor, lui rejoue le tampon et démarre sa tâche d'envoi."""
+        sub = Subscriber(ws, name)
+        for msg in self._ring:
+            sub.offer(msg)
+        sub.task = asyncio.create_task(sub.run())
+        self._subs[ws] = sub
+        return sub
+
+    def unsubscribe(self, ws):
+        sub = self._subs.pop(ws, None)
+        if sub and sub.task:
+            sub.task.cancel()
+
+    def _kick(self, ws, sub: Subscriber):
+        self.unsubscribe(ws)
+        self.kicked += 1
+        print(f"[MONITOR] Client trop lent déconnecté: {sub.name} ({sub.total_dropped} perdus)", flush=True)
+        asyncio.create_task(ws.close())
+
+    async def flush(self):
+        if not self._pending:
+            return
+        lines, self._pending = self._pending, []
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.writer, lines)
+            self.log_writes += 1
+        except Exception as e:
+            self.log_errors += 1
+            print(f"[MONITOR] Erreur écriture JSONL: {e}", flush=True)
+
+    async def run(self, interval: float = FLUSH_INTERVAL):
+        """Tâche de fond : écritures JSONL par lots (vidage final à l'annulation)."""
+        self._wake = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                await self.flush()
+        finally:
+            self.close()
+
+    def close(self):
+        """Écrit synchroniquement les lignes encore en attente (arrêt du serveur)."""
+        if self._pending and self.writer is not None:
+            lines, self._pending = self._pending, []
+            try:
+                self.writer(lines)
+            except Exception as e:
+                print(f"[MONITOR] Erreur écriture JSONL: {e}", flush=True)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": [{"name": s.name, "queued": s.queue.qsize(), "sent": s.sent,
+                             "dropped": s.total_dropped} for s in self._subs.values()],
+            "published": self.published, "kicked": self.kicked,
+            "replay": len(self._ring), "pending_log": len(self._pending),
+            "log_writes": self.log_writes, "log_errors": self.log_errors,
+        }
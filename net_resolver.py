@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+KITT — Résolution IP → MAC en cache (table de voisinage) + IP client réelle.
+
+Avant : chaque requête relisait /proc/net/arp, souvent 2-3 fois (handler,
+get_user_display_name, sauvegarde de conversation). Maintenant :
+
+  • table IP → MAC en RAM (IPv4 /proc/net/arp, IPv6 `ip -6 neigh`)
+  • rafraîchie par événements netlink (pyroute2, optionnel) ou par relecture
+    périodique ; un client inconnu déclenche une relecture limitée en débit
+  • mémoïsation par requête (client_info(request) ne calcule qu'une fois)
+  • X-Forwarded-For accepté uniquement depuis un proxy de confiance
+    (cloudflared sur 127.0.0.1 / ::1) : il donne l'IP réelle, pas l'identifiant
+    (les clients du tunnel restent identifiés par l'adresse du proxy)
+
+Usage :
+    venv/bin/python3 net_resolver.py              # table de voisinage actuelle
+    venv/bin/python3 net_resolver.py --benchmark  # coût par requête avant/après
+"""
+
+import asyncio
+import ipaddress
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+ARP_FILE = "/proc/net/arp"
+REFRESH_INTERVAL = 10.0     # s — relecture périodique sans netlink
+MISS_REFRESH_MIN = 1.0      # s — intervalle min entre deux relectures sur IP inconnue
+TRUSTED_PROXIES = {"127.0.0.1", "::1"}
+_NULL_MACS = {"00:00:00:00:00:00", ""}
+
+
+@dataclass(frozen=True)
+class ClientInfo:
+    ip: str            # IP réelle du client (X-Forwarded-For si proxy de confiance)
+    mac: str           # identifiant : MAC si connue, sinon l'IP du pair (repli historique)
+    forwarded: bool    # True si la requête arrive par le tunnel
+
+
+def normalize_ip(ip: str) -> str:
+    """'::ffff:192.168.1.5' → '192.168.1.5' ; supprime la zone IPv6 (%eth0)."""
+    ip = ip.strip().split("%", 1)[0]
+    if ":" not in ip:
+        return ip      # IPv4 : déjà canonique (chemin rapide)
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return ip
+    if addr.version == 6 and addr.ipv4_mapped:
+        return str(addr.ipv4_mapped)
+    return str(addr)
+
+
+def parse_arp(text: str) -> dict[str, str]:
+    """Contenu de /proc/net/arp → {ip: MAC}."""
+    table = {}
+    for line in text.splitlines()[1:]:
+        parts = line.split()
+        if len(parts) >= 4 and parts[3] not in _NULL_MACS:
+            table[parts[0]] = parts[3].upper()
+    return table
+
+
+def parse_ip_neigh(text: str) -> dict[str, str]:
+    """Sortie de `ip -6 neigh show` → {ip: MAC} (entrées FAILED/INCOMPLETE ignorées)."""
+    table = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if "lladdr" in parts and parts:
+            mac = parts[parts.index("lladdr") + 1].upper()
+            if mac not in _NULL_MACS:
+                table[normalize_ip(parts[0])] = mac
+    return table
+
+
+def legacy_resolve_mac(ip: str) -> str:
+    """Ancienne implémentation (scan de /proc/net/arp à chaque appel) — benchmark."""
+    try:
+        with open(ARP_FILE, "r") as f:
+            for line in f:
+                parts = line.split()
+                if parts and parts[0] == ip:
+                    mac = parts[3].upper()
+                    if mac != "00:00:00:00:00:00":
+                        return mac
+    except Exception:
+        pass
+    return ip
+
+
+class NeighbourTable:
+    """Table IP → MAC partagée, remplacée d'un bloc (lecture sans verrou)."""
+
+    def __init__(self):
+        self._v4: dict[str, str] = {}
+        self._v6: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._last_v4 = 0.0
+        self.source = "poll"
+        self.refreshes = 0
+        self.hits = 0
+        self.misses = 0
+        self.refresh_v4()
+
+    def refresh_v4(self):
+        try:
+            with open(ARP_FILE, "r") as f:
+                table = parse_arp(f.read())
+        except OSError:
+            table = {}
+        self._v4 = table
+        self._last_v4 = time.monotonic()
+        self.refreshes += 1
+
+    def refresh_v6(self):
+        try:
+            out = subprocess.run(["ip", "-6", "neigh", "show"], capture_output=True,
+                                 text=True, timeout=2).stdout
+        except Exception:
+            return
+        self._v6 = parse_ip_neigh(out)
+
+    def lookup(self, ip: str) -> str:
+        """MAC de l'IP, ou l'IP elle-même si inconnue (comportement historique)."""
+        ip = normalize_ip(ip)
+        table = self._v6 if ":" in ip else self._v4
+        mac = table.get(ip)
+        if mac is None and ":" not in ip and time.monotonic() - self._last_v4 >= MISS_REFRESH_MIN:
+            # Client tout juste apparu : relecture immédiate, limitée en débit
+            with self._lock:
+                self.refresh_v4()
+            mac = self._v4.get(ip)
+        if mac is None:
+            self.misses += 1
+            return ip
+        self.hits += 1
+        return mac
+
+    def set_neighbour(self, ip: str, mac: str | None):
+        """Mise à jour ponctuelle (événement netlink) — copie + remplacement atomique."""
+        ip = normalize_ip(ip)
+        attr = "_v6" if ":" in ip else "_v4"
+        table = dict(getattr(self, attr))
+        if mac and mac.upper() not in _NULL_MACS:
+            table[ip] = mac.upper()
+        else:
+            table.pop(ip, None)
+        setattr(self, attr, table)
+
+    def _netlink_loop(self):
+        """Thread : événements RTM_NEWNEIGH/RTM_DELNEIGH via pyroute2."""
+        from pyroute2 import IPRoute
+        with IPRoute() as ipr:
+            ipr.bind()
+            while True:
+                for msg in ipr.get():
+                    event = msg.get("event", "")
+                    if event not in ("RTM_NEWNEIGH", "RTM_DELNEIGH"):
+                        continue
+                    ip = msg.get_attr("NDA_DST")
+                    if not ip:
+                        continue
+                    mac = msg.get_attr("NDA_LLADDR") if event == "RTM_NEWNEIGH" else None
+                    self.set_neighbour(ip, mac)
+
+    def start_netlink(self) -> bool:
+        """Démarre le watcher netlink si pyroute2 est installé."""
+        try:
+            import pyroute2  # noqa: F401
+        except ImportError:
+            return False
+        threading.Thread(target=self._netlink_loop, name="neigh-watch", daemon=True).start()
+        self.source = "netlink"
+        return True
+
+    async def watch(self, interval: float = REFRESH_INTERVAL):
+        """Tâche de fond : netlink si possible, sinon relecture périodique v4 + v6."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.refresh_v6)
+        if self.start_netlink():
+            print("[NET] Table de voisinage : événements netlink", flush=True)
+            return
+        while True:
+            await asyncio.sleep(interval)
+            self.refresh_v4()
+            await loop.run_in_executor(None, self.refresh_v6)
+
+    def stats(self) -> dict:
+        return {"source": self.source, "ipv4": len(self._v4), "ipv6": len(self._v6),
+                "refreshes": self.refreshes, "hits": self.hits, "misses": self.misses}
+
+
+def forwarded_ip(peer_ip: str, xff: str) -> str | None:
+    """IP client d'après X-Forwarded-For : la plus à droite qui n'est pas un proxy de confiance."""
+    for candidate in reversed([p.strip() for p in xff.split(",") if p.strip()]):
+        ip = normalize_ip(candidate)
+        if ip not in TRUSTED_PROXIES:
+            return ip
+    return None
+
+
+def client_info(request, table: NeighbourTable) -> ClientInfo:
+    """(ip, mac, forwarded) de la requête aiohttp — calculé une fois, mémoïsé sur la requête."""
+    cached = request.get("kitt_client")
+    if cached is not None:
+        return cached
+    peername = request.transport.get_extra_info("peername") if request.transport else None
+    peer = normalize_ip(peername[0]) if peername else "inconnu"
+    info = None
+    if peer in TRUSTED_PROXIES:
+        ip = forwarded_ip(peer, request.headers.get("X-Forwarded-For", ""))
+        if ip:
+            # Client du tunnel : IP réelle pour les contrôles et les logs, mais
+            # identifiant inchangé (l'adresse du proxy, comme avant) : utilisateurs,
+            # mémoires et connexions déjà stockés sous cette clé restent rattachés.
+            # Une IP publique change au gré du FAI : elle ne ferait pas une identité stable.
+            info = ClientInfo(ip, peer, True)
+    if info is None:
+        info = ClientInfo(peer, table.lookup(peer), False)
+    request["kitt_client"] = info
+    return info
+
+
+def benchmark(rounds: int = 20000):
+    table = NeighbourTable()
+    ips = list(table._v4) or ["192.168.1.10"]
+    # Avant : 3 scans de /proc/net/arp par requête (handler + display name + auto-save)
+    t0 = time.perf_counter()
+    for i in range(rounds):
+        ip = ips[i % len(ips)]
+        for _ in range(3):
+            legacy_resolve_mac(ip)
+    before = (time.perf_counter() - t0) * 1e6 / rounds
+
+    class FakeTransport:
+        def __init__(self, ip):
+            self.ip = ip
+
+        def get_extra_info(self, key):
+            return (self.ip, 12345)
+
+    class FakeRequest(dict):
+        headers: dict = {}
+
+        def __init__(self, ip):
+            super().__init__()
+            self.transport = FakeTransport(ip)
+
+    t0 = time.perf_counter()
+    for i in range(rounds):
+        req = FakeRequest(ips[i % len(ips)])
+        for _ in range(3):
+            client_info(req, table)
+    after = (time.perf_counter() - t0) * 1e6 / rounds
+    print(f"{len(table._v4)} voisins IPv4 — {rounds} requêtes × 3 résolutions")
+    print(f"avant (scan /proc/net/arp) : {before:7.2f}µs/requête")
+    print(f"après (cache + mémo)       : {after:7.2f}µs/requête")
+
+
+def main():
+    if "--benchmark" in sys.argv:
+        benchmark()
+        return
+    table = NeighbourTable()
+    table.refresh_v6()
+    for ip, mac in sorted({**table._v4, **table._v6}.items()):
+        print(f"{ip:<40}{mac}")
+    print(table.stats())
+
+
+if __name__ == "__main__":
+    main()
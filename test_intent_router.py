@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test de non-régression du routeur d'intentions (intent_router.py) :
+phrases françaises étiquetées → intentions attendues + pertinence web.
+
+Usage:
+    venv/bin/python3 test_intent_router.py
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from intent_router import RULES, IntentRouter
+
+# (phrase, {intentions attendues} ∪ {"web:strong" | "web:maybe"})
+FIXTURE = [
+    # Commandes directes
+    ("Quelle heure est-il ?", {"func:time"}),
+    ("On est quel jour ?", {"func:date"}),
+    ("Lance un diagnostic de tes capteurs", {"func:system"}),
+    ("Comment vas-tu KITT ?", {"func:system"}),
+    ("Quelle est la météo à Arlon ?", {"func:weather", "web:strong"}),
+    ("Fera-t-il beau demain ?", {"func:weather"}),
+    ("Mets un timer de 5 minutes", {"func:timer"}),
+    ("timer 30 secondes", {"func:timer"}),
+    # Vision
+    ("Qu'est-ce que tu vois ?", {"vision"}),
+    ("De quelle couleur est mon pull ?", {"vision"}),
+    ("Décris-moi ce qu'il y a devant toi", {"vision"}),
+    ("Tu me vois ?", {"vision"}),
+    ("Qu'est-ce que la caméra voit ?", {"vision", "web:maybe"}),
+    # Mémoire
+    ("Je m'appelle Julien", {"memory"}),
+    ("J'adore les Pontiac Firebird", {"memory"}),
+    ("J'habite à Virton", {"memory"}),
+    ("Retiens que mon chien s'appelle Rex", {"memory"}),
+    ("Oublie tout ce que tu sais sur moi", {"forget"}),
+    ("Efface ma mémoire s'il te plaît", {"forget"}),
+    # Recherche web nécessaire
+    ("Quelles sont les actualités ?", {"web:strong"}),
+    ("Qui a gagné le match hier soir ?", {"web:strong"}),
+    ("Combien coûte une RTX 5090 ?", {"web:strong"}),
+    ("Quel est le classement de la Ligue 1 ?", {"web:strong"}),
+    ("Les résultats des élections aujourd'hui", {"web:strong"}),
+    ("Quelle est la dernière version de Python ?", {"web:strong"}),
+    # Recherche web éventuelle (chemin spéculatif)
+    ("Qu'est-ce que la photosynthèse ?", {"web:maybe"}),
+    ("Explique-moi la relativité", {"web:maybe"}),
+    ("Donne-moi la définition de l'entropie", {"web:maybe"}),
+    ("Quel est le meilleur téléphone ?", {"web:maybe"}),
+    ("Il vient de partir", {"web:maybe"}),
+    # Questions ordinaires : aucune recherche web
+    ("Qu'est-ce que tu fais ?", set()),
+    ("Qu'est-ce que tu en penses ?", set()),
+    ("Raconte-moi une blague", set()),
+    ("Bonjour KITT", set()),
+    ("Parle-moi de la série K2000", set()),
+    ("Tu es une voiture intelligente ?", set()),
+    # Entités privées : jamais de web
+    ("Quelles sont les actualités de Kyronex ?", {"private", "web:strong"}),
+    ("Qui est Manix ?", {"private"}),
+    # Combinaisons
+    ("Je suis à Arlon, quelle est la météo aujourd'hui ?", {"memory", "func:weather", "web:strong"}),
+    ("Regarde-moi et dis-moi quelle heure il est", {"vision", "func:time"}),
+    # Règles qui se chevauchent : toutes reconnues
+    ("Oublie la météo de ta mémoire", {"forget", "func:weather", "web:strong"}),
+]
+
+
+def expected_labels(res) -> set[str]:
+    labels = res.labels() - {"search"}
+    relevance = res.web_relevance()
+    if relevance != "none":
+        labels.add(f"web:{relevance}")
+    return labels
+
+
+def test_fixture():
+    router = IntentRouter()
+    errors = []
+    for text, expected in FIXTURE:
+        got = expected_labels(router.route(text))
+        if got != expected:
+            errors.append(f"{text!r}: attendu {sorted(expected)}, obtenu {sorted(got)}")
+    assert not errors, "\n" + "\n".join(errors)
+
+
+def test_timer_groups():
+    func, match = IntentRouter().route("mets un timer de 12 min").function()
+    assert func == "timer"
+    assert match.group("timer_n") == "12" and match.group("timer_unit") == "min"
+
+
+def test_function_priority():
+    # Même ordre que l'ancien _FUNC_PATTERNS : l'heure avant la date
+    func, _ = IntentRouter().route("Quel jour et quelle heure ?").function()
+    assert func == "time"
+
+
+def test_counters():
+    router = IntentRouter()
+    router.route("Quelle heure est-il ?")
+    router.route("Quelles sont les actualités ?")
+    router.route("Bonjour")
+    st = router.stats()["counters"]
+    assert st["messages"] == 3
+    assert st["func:time"] == 1 and st["search"] == 1
+
+
+def _best_us(fn, texts, rounds=40, repeat=5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for t in texts:
+                fn(t)
+        best = min(best, (time.perf_counter() - t0) * 1e6 / (rounds * len(texts)))
+    return best
+
+
+def test_single_pass_speed():
+    # Référence : une recherche par règle (les scans successifs d'avant le routeur)
+    router = IntentRouter()
+    separate = [re.compile(p, re.I) for _, p, _ in RULES]
+    long_text = ("Je voudrais te raconter ma journée, il y avait beaucoup de monde "
+                 "et tout le monde parlait en même temps. " * 40)[:4000]
+    for texts in ([t for t, _ in FIXTURE], [long_text]):
+        rounds = 40 if len(texts) > 1 else 5
+        baseline = _best_us(lambda t: [r.search(t) for r in separate], texts, rounds)
+        routed = _best_us(router.route, texts, rounds)
+        assert routed < baseline, f"{routed:.1f}µs/message, scans successifs {baseline:.1f}µs"
+
+
+if __name__ == "__main__":
+    tests = [test_fixture, test_timer_groups, test_function_priority, test_counters, test_single_pass_speed]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"✅ {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests du banc vision hors ligne (vision_bench.py) : appariement des
+détections, précision / rappel par classe, détection des régressions.
+Pas de modèle ni de caméra nécessaires.
+
+Usage:
+    /usr/bin/python3 test_vision_bench.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from vision_bench import Accuracy, compare, match_detections
+
+
+def _obj(name, box, conf=0.9, **extra):
+    return {"name": name, "box": box, "confidence": conf, **extra}
+
+
+def test_match_same_class_and_iou():
+    expected = [_obj("personne", [0, 0, 100, 200]), _obj("tasse", [300, 300, 340, 350])]
+    found = [_obj("personne", [5, 5, 100, 190]),          # bon
+             _obj("chat", [300, 300, 340, 350]),          # mauvaise classe
+             _obj("personne", [400, 0, 500, 200])]        # pas de recouvrement
+    pairs, false_pos, missed = match_detections(found, expected)
+    assert [(d["name"], e["name"]) for d, e in pairs] == [("personne", "personne")]
+    assert sorted(d["name"] for d in false_pos) == ["chat", "personne"]
+    assert [e["name"] for e in missed] == ["tasse"]
+
+
+def test_duplicate_counts_once():
+    expected = [_obj("personne", [0, 0, 100, 200])]
+    found = [_obj("personne", [0, 0, 100, 200], 0.9), _obj("personne", [2, 2, 100, 200], 0.5)]
+    pairs, false_pos, missed = match_detections(found, expected)
+    assert len(pairs) == 1 and pairs[0][0]["confidence"] == 0.9
+    assert len(false_pos) == 1 and not missed
+
+
+def test_accuracy_report():
+    acc = Accuracy()
+    acc.add("a.jpg", [_obj("personne", [0, 0, 100, 200], upper_color="bleu")],
+            [_obj("personne", [0, 0, 100, 200], upper_color="bleu"), _obj("tasse", [0, 0, 10, 10])])
+    acc.add("b.jpg", [_obj("tasse", [0, 0, 10, 10]), _obj("chat", [50, 50, 90, 90])],
+            [_obj("tasse", [0, 0, 10, 10])])
+    r = acc.report()
+    assert r["classes"]["personne"]["recall"] == 1.0
+    assert r["classes"]["tasse"]["recall"] == 0.5
+    assert r["classes"]["chat"]["precision"] == 0.0
+    assert r["overall"] == {"tp": 2, "fp": 1, "fn": 1, "precision": 0.6667, "recall": 0.6667}
+    assert r["colour"] == {"checked": 1, "correct": 1, "accuracy": 1.0}
+    assert [f["frame"] for f in r["failures"]] == ["a.jpg", "b.jpg"]
+
+
+def test_compare_regressions():
+    def report(recall, p50):
+        cls = {"personne": {"recall": recall}}
+        return {"accuracy": {"classes": cls, "overall": {"recall": recall}},
+                "stages_ms": {"total": {"p50": p50}}}
+    assert compare(report(0.9, 50), report(0.9, 50)) == []
+    assert compare(report(0.89, 55), report(0.9, 50)) == []          # dans les tolérances
+    problems = compare(report(0.8, 70), report(0.9, 50))
+    assert len(problems) == 3, problems                               # global, personne, latence
+
+
+if __name__ == "__main__":
+    tests = [test_match_same_class_and_iou, test_duplicate_counts_once, test_accuracy_report,
+             test_compare_regressions]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"✅ {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
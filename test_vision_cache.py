@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests du cache de détection du daemon (vision.DetectionCache / handle_capture) :
+une requête servie par le cache n'attend pas une détection en cours, et la
+vigilance n'évince pas la détection complète du chat (un emplacement par profil).
+Détection simulée (lente), aucune caméra ni modèle requis.
+
+Usage:
+    /usr/bin/python3 test_vision_cache.py
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+import vision
+
+
+class FakeGrabber:
+    error = None
+
+    def latest(self):
+        return np.zeros((480, 640, 3), np.uint8), time.time(), {"wait": 0.0}
+
+
+def fake_detection(delay):
+    def run_detection(frame, size=vision.SIZE_FULL, classes=None, region=None):
+        time.sleep(delay)
+        return [(0, 0.9, 10, 10, 100, 200)], frame, {"detect": delay * 1000}, "fake", 100.0
+    return run_detection
+
+
+def with_fakes(delay, fn):
+    saved = vision.run_detection, vision._get_net
+    vision.run_detection = fake_detection(delay)
+    vision._get_net = lambda size=vision.INPUT_SIZE: SimpleNamespace(size=size)
+    try:
+        return fn()
+    finally:
+        vision.run_detection, vision._get_net = saved
+
+
+def test_cache_hit_does_not_wait_for_detection():
+    def scenario():
+        grabber, cache = FakeGrabber(), vision.DetectionCache()
+        vision.handle_capture(grabber, cache, 0, "count")          # remplit le cache
+        slow = threading.Thread(target=vision.handle_capture, args=(grabber, cache, 0, "count"))
+        slow.start()
+        time.sleep(0.05)                                            # détection en cours
+        t0 = time.perf_counter()
+        res = vision.handle_capture(grabber, cache, 60000, "count")
+        waited = time.perf_counter() - t0
+        slow.join()
+        return res, waited, cache
+    res, waited, cache = with_fakes(0.5, scenario)
+    assert res["cached"] and res["persons"] == 1, res
+    assert waited < 0.1, f"{waited:.2f}s d'attente"
+    assert cache.hits == 1 and cache.misses == 2
+
+
+def test_waiter_reuses_detection_finished_meanwhile():
+    def scenario():
+        grabber, cache = FakeGrabber(), vision.DetectionCache()
+        first = threading.Thread(target=vision.handle_capture, args=(grabber, cache, 0, "count"))
+        first.start()
+        time.sleep(0.05)
+        res = vision.handle_capture(grabber, cache, 60000, "count")  # attend, puis réutilise
+        first.join()
+        return res
+    res = with_fakes(0.3, scenario)
+    assert res["cached"], res
+
+
+def test_vigilance_does_not_evict_chat_detection():
+    def scenario():
+        grabber, cache = FakeGrabber(), vision.DetectionCache()
+        vision.handle_capture(grabber, cache, 0, "full")            # chat
+        vision.handle_capture(grabber, cache, 0, "persons")         # passage vigilance
+        return vision.handle_capture(grabber, cache, 60000, "full"), cache
+    res, cache = with_fakes(0.0, scenario)
+    assert res["cached"], res
+    assert cache.hits == 1 and cache.misses == 2
+    assert len(cache.entries) == 2
+
+
+def test_lookup_picks_freshest_covering_entry():
+    def scenario():
+        grabber, cache = FakeGrabber(), vision.DetectionCache()
+        vision.handle_capture(grabber, cache, 0, "full")
+        time.sleep(0.01)
+        vision.handle_capture(grabber, cache, 0, "persons")
+        persons = cache.lookup(60000, vision.SIZE_VIGIL, (0,))
+        full = cache.lookup(60000, vision.SIZE_FULL, None)
+        return persons, full
+    persons, full = with_fakes(0.0, scenario)
+    assert persons.size == vision.SIZE_VIGIL and persons.classes == (0,)
+    assert full.size == vision.SIZE_FULL and full.classes is None
+
+
+if __name__ == "__main__":
+    tests = [test_cache_hit_does_not_wait_for_detection, test_waiter_reuses_detection_finished_meanwhile,
+             test_vigilance_does_not_evict_chat_detection, test_lookup_picks_freshest_covering_entry]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"✅ {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
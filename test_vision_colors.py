@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Tests de l'analyse couleur vectorisée (vision.roi_colors / build_description) :
+scènes synthétiques déterministes (fond bruité, aplats colorés, zones grises,
+boîtes minuscules et hors cadre) comparées à l'implémentation de référence
+(cvtColor + calcHist par ROI, deux fois par personne).
+
+Usage:
+    /usr/bin/python3 test_vision_colors.py              # tests
+    /usr/bin/python3 test_vision_colors.py --benchmark  # scènes chargées
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+import cv2
+import vision
+from vision import COLOR_RANGES, build_description, roi_colors
+
+FRAME_SHAPE = (480, 640, 3)
+
+
+def reference_detect_color(roi):
+    """Ancienne implémentation (une conversion HSV + calcHist par ROI)."""
+    if roi.size == 0 or roi.shape[0] < 5 or roi.shape[1] < 5:
+        return None
+    hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+    h, s, v = cv2.split(hsv)
+    mean_s = float(np.mean(s))
+    mean_v = float(np.mean(v))
+    if mean_s < 30:
+        return "blanc" if mean_v > 170 else ("noir" if mean_v < 60 else "gris")
+    mask = (s > 40) & (v > 40)
+    if np.sum(mask) < 20:
+        return "gris"
+    hist = cv2.calcHist([h], [0], mask.astype(np.uint8) * 255, [180], [0, 180])
+    dominant_hue = int(np.argmax(hist))
+    for (lo, hi), name in COLOR_RANGES:
+        if lo <= dominant_hue < hi:
+            return name
+    return None
+
+
+def reference_colors(frame, detections):
+    """Couleurs par détection comme l'ancien build_description."""
+    out = []
+    for class_id, _, x1, y1, x2, y2 in detections:
+        if class_id == 0:
+            h = y2 - y1
+            if h < 30:
+                out.append((None, None))
+                continue
+            out.append((reference_detect_color(frame[y1 + int(h * 0.15):y1 + int(h * 0.45), x1:x2]),
+                        reference_detect_color(frame[y1 + int(h * 0.55):y1 + int(h * 0.90), x1:x2])))
+        else:
+            out.append(reference_detect_color(frame[y1:y2, x1:x2]))
+    return out
+
+
+def synthetic_scene(n_objects=12, seed=0):
+    """Image bruitée + aplats colorés ; détections couvrant aplats, bords et cas limites."""
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, FRAME_SHAPE, dtype=np.uint8)
+    h, w = FRAME_SHAPE[:2]
+    dets = []
+    for i in range(n_objects):
+        bw, bh = int(rng.integers(2, 260)), int(rng.integers(2, 300))
+        x1, y1 = int(rng.integers(0, w - 1)), int(rng.integers(0, h - 1))
+        x2, y2 = min(w, x1 + bw), min(h, y1 + bh)
+        kind = i % 4
+        if kind == 0:      # aplat saturé bruité
+            hue = int(rng.integers(0, 180))
+            patch = np.dstack([np.full((y2 - y1, x2 - x1), hue, np.uint8),
+                               rng.integers(120, 256, (y2 - y1, x2 - x1), dtype=np.uint8),
+                               rng.integers(80, 256, (y2 - y1, x2 - x1), dtype=np.uint8)])
+            frame[y1:y2, x1:x2] = cv2.cvtColor(patch, cv2.COLOR_HSV2BGR)
+        elif kind == 1:    # gris / blanc / noir
+            frame[y1:y2, x1:x2] = int(rng.choice([20, 128, 230]))
+        cls = 0 if i % 3 == 0 else int(rng.integers(1, 80))
+        dets.append((cls, float(rng.uniform(0.4, 1.0)), x1, y1, x2, y2))
+    return frame, dets
+
+
+def test_equivalence_reference():
+    for seed in range(30):
+        frame, dets = synthetic_scene(seed=seed)
+        desc = build_description(frame, dets)
+        ref = reference_colors(frame, dets)
+        for obj, expected in zip(desc["objects"], ref):
+            if isinstance(expected, tuple):
+                assert (obj.get("upper_color"), obj.get("lower_color")) == expected, (seed, obj, expected)
+            else:
+                assert obj.get("color") == expected, (seed, obj, expected)
+
+
+def test_detect_color_compat():
+    for seed in range(10):
+        frame, dets = synthetic_scene(seed=seed)
+        for _, _, x1, y1, x2, y2 in dets:
+            roi = frame[y1:y2, x1:x2]
+            assert vision.detect_color(roi) == reference_detect_color(roi)
+
+
+def test_tiny_and_empty_rois():
+    frame, _ = synthetic_scene(seed=1)
+    assert roi_colors(frame, [(10, 14, 10, 100), (10, 100, 50, 50), (470, 500, 600, 700), (0, 0, 0, 0)]) == \
+        [None, None, reference_detect_color(frame[470:500, 600:700]), None]
+    assert roi_colors(frame, []) == []
+
+
+def test_uniform_colors():
+    frame = np.zeros(FRAME_SHAPE, dtype=np.uint8)
+    frame[:, :320] = (0, 0, 255)       # rouge (BGR)
+    frame[:, 320:] = (255, 0, 0)       # bleu
+    assert roi_colors(frame, [(0, 100, 0, 320), (0, 100, 320, 640)]) == ["rouge", "bleu"]
+
+
+def _reference_roi_colors(frame, rois, max_pixels=0):
+    return [reference_detect_color(frame[y1:y2, x1:x2]) for y1, y2, x1, x2 in rois]
+
+
+def benchmark(rounds=50):
+    """build_description de bout en bout : analyse par ROI (référence) vs une passe."""
+    print(f"{'scène':<22}{'ROI':>6}{'référence':>12}{'vectorisé':>12}")
+    vectorized = vision.roi_colors
+    for label, n in (("normale (6 objets)", 6), ("chargée (30 objets)", 30), ("foule (100 objets)", 100)):
+        frame, dets = synthetic_scene(n_objects=n, seed=2)
+        res = []
+        for impl in (_reference_roi_colors, vectorized):
+            vision.roi_colors = impl
+            try:
+                t0 = time.perf_counter()
+                for _ in range(rounds):
+                    build_description(frame, dets)
+                res.append((time.perf_counter() - t0) * 1000 / rounds)
+            finally:
+                vision.roi_colors = vectorized
+        n_roi = sum(2 if c == 0 else 1 for c, *_ in dets)
+        print(f"{label:<22}{n_roi:>6}{res[0]:>10.2f}ms{res[1]:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit(0)
+    tests = [test_equivalence_reference, test_detect_color_compat, test_tiny_and_empty_rois,
+             test_uniform_colors]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"✅ {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests de l'amélioration d'image (vision.enhance_image / check_brightness /
+EnhanceGate) : luminosité mesurée sur image sous-échantillonnée, CLAHE du
+régime sombre identique à l'ancienne version, LUT gamma du régime « dim »,
+décision de sauter l'amélioration quand elle n'aide pas le détecteur.
+
+Usage:
+    /usr/bin/python3 test_vision_enhance.py              # tests
+    /usr/bin/python3 test_vision_enhance.py --benchmark  # ancien vs nouveau, par régime
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+import cv2
+from vision import EnhanceGate, brightness_regime, check_brightness, detection_gain, enhance_image
+
+
+def reference_enhance(frame):
+    """Ancienne implémentation (CLAHE créé à chaque appel, deux régimes LAB)."""
+    mean_brightness = float(np.mean(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)))
+    for limit, clip in ((60, 3.0), (90, 2.0)):
+        if mean_brightness < limit:
+            l, a, b = cv2.split(cv2.cvtColor(frame, cv2.COLOR_BGR2LAB))
+            l = cv2.createCLAHE(clipLimit=clip, tileGridSize=(8, 8)).apply(l)
+            return cv2.cvtColor(cv2.merge([l, a, b]), cv2.COLOR_LAB2BGR)
+    return frame
+
+
+def scene(level, seed=0):
+    """Image texturée de luminosité moyenne ~level."""
+    rng = np.random.default_rng(seed)
+    base = cv2.GaussianBlur(rng.integers(0, 256, (480, 640, 3), dtype=np.uint8), (0, 0), 3)
+    return cv2.convertScaleAbs(base, alpha=level / max(1.0, float(base.mean())))
+
+
+def test_brightness_subsampled():
+    for level in (20, 75, 140, 220):
+        frame = scene(level, seed=level)
+        exact = float(np.mean(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)))
+        assert abs(check_brightness(frame) - exact) < 1.5, (level, check_brightness(frame), exact)
+
+
+def test_dark_clahe_unchanged():
+    frame = scene(35)
+    assert brightness_regime(check_brightness(frame)) == "dark"
+    assert np.array_equal(enhance_image(frame), reference_enhance(frame))
+
+
+def test_dim_lut_brightens():
+    frame = scene(75)
+    b = check_brightness(frame)
+    assert brightness_regime(b) == "dim"
+    out = enhance_image(frame, b)
+    assert out.shape == frame.shape and out.dtype == np.uint8
+    assert b + 15 < check_brightness(out) < 140
+
+
+def test_bright_untouched():
+    frame = scene(160)
+    assert enhance_image(frame) is frame
+
+
+def test_gate_skips_useless_enhancement():
+    gate = EnhanceGate(probe_every=5, min_probes=2)
+    dets = [(0, 0.8, 0, 0, 10, 10)]
+    for _ in range(2):                       # premières images : mesurées
+        assert gate.enabled("dark") and gate.should_probe("dark")
+        gate.record("dark", dets, dets)      # aucun gain
+    assert not gate.enabled("dark")
+    probes = sum(gate.should_probe("dark") for _ in range(10))
+    assert probes == 2                       # puis une image sur 5
+    gate.record("dark", [], dets)            # une mesure favorable la réactive
+    assert gate.enabled("dark")
+    assert gate.enabled("dim")               # régimes indépendants
+    assert EnhanceGate.key("dark", 320, (0,)) != EnhanceGate.key("dark", 640, None)
+
+
+def test_gain_ignores_spurious_boxes():
+    raw = [(0, 0.80, 100, 100, 200, 300)]
+    # Même personne, un peu moins sûre, plus trois boîtes parasites : pas un gain
+    enh = [(0, 0.75, 102, 98, 201, 305), (56, 0.36, 0, 0, 30, 30),
+           (56, 0.38, 400, 0, 440, 40), (62, 0.40, 500, 300, 600, 400)]
+    assert sum(d[1] for d in enh) > sum(d[1] for d in raw)   # l'ancien critère se trompait
+    assert detection_gain(raw, enh) < 0
+    # Un objet sûr retrouvé grâce à l'amélioration : gain
+    assert detection_gain(raw, raw + [(2, 0.7, 300, 200, 500, 300)]) > 0
+    assert detection_gain([], []) == 0.0
+
+
+def benchmark(rounds=100):
+    print(f"{'régime':<10}{'ancien':>10}{'nouveau':>10}")
+    for label, level in (("dark", 35), ("dim", 75), ("bright", 160)):
+        frame = scene(level)
+        res = []
+        for fn in (lambda f: (reference_enhance(f), float(np.mean(cv2.cvtColor(f, cv2.COLOR_BGR2GRAY)))),
+                   lambda f: enhance_image(f, check_brightness(f))):
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                fn(frame)
+            res.append((time.perf_counter() - t0) * 1000 / rounds)
+        print(f"{label:<10}{res[0]:>8.2f}ms{res[1]:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit(0)
+    tests = [test_brightness_subsampled, test_dark_clahe_unchanged, test_dim_lut_brightens,
+             test_bright_untouched, test_gate_skips_useless_enhancement, test_gain_ignores_spurious_boxes]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"✅ {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Tests du post-traitement YOLOX vectorisé (vision.postprocess) :
+sorties brutes synthétiques [1, 8400, 85] générées de façon déterministe
+(objets plantés, doublons, bruit) comparées à l'implémentation de référence
+(ancienne boucle Python + NMS OpenCV, par classe).
+
+Usage:
+    /usr/bin/python3 test_vision_postprocess.py              # tests
+    /usr/bin/python3 test_vision_postprocess.py --benchmark  # scènes chargées
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+import cv2
+from vision import CONF_THRESHOLD, GRIDS, NMS_THRESHOLD, STRIDES_GRID, merge_crop_detections, postprocess
+
+FRAME_SHAPE = (480, 640, 3)
+# Letterbox 640x480 -> 640x640 : scale 1.0, pad vertical 80
+SCALE, PAD_W, PAD_H = 1.0, 0, 80
+
+
+def reference_postprocess(output, orig_shape, scale, pad_w, pad_h):
+    """Ancienne boucle, NMS par classe (cv2.dnn.NMSBoxesBatched)."""
+    img_h, img_w = orig_shape[:2]
+    p = output[0]
+    cx = (p[:, 0] + GRIDS[:, 0]) * STRIDES_GRID[:, 0]
+    cy = (p[:, 1] + GRIDS[:, 1]) * STRIDES_GRID[:, 0]
+    w = np.exp(p[:, 2]) * STRIDES_GRID[:, 0]
+    h = np.exp(p[:, 3]) * STRIDES_GRID[:, 0]
+    scores = p[:, 4] * np.max(p[:, 5:], axis=1)
+    mask = scores > CONF_THRESHOLD
+    cx, cy, w, h = cx[mask], cy[mask], w[mask], h[mask]
+    fs = scores[mask]
+    ids = np.argmax(p[mask, 5:], axis=1)
+    rects, confs, cls = [], [], []
+    for i in range(len(fs)):
+        rects.append([int((cx[i] - w[i] / 2 - pad_w) / scale), int((cy[i] - h[i] / 2 - pad_h) / scale),
+                      int(w[i] / scale), int(h[i] / scale)])
+        confs.append(float(fs[i]))
+        cls.append(int(ids[i]))
+    out = []
+    if rects:
+        for idx in np.asarray(cv2.dnn.NMSBoxesBatched(rects, confs, cls, CONF_THRESHOLD, NMS_THRESHOLD)).flatten():
+            x1, y1, bw, bh = rects[idx]
+            out.append((cls[idx], confs[idx], max(0, x1), max(0, y1), min(img_w, x1 + bw), min(img_h, y1 + bh)))
+    return out
+
+
+def synthetic_output(n_objects=6, dup=4, seed=0, noise=0.05):
+    """Sortie brute YOLOX avec n objets plantés, chacun répété sur `dup` ancres voisines."""
+    rng = np.random.default_rng(seed)
+    out = np.zeros((1, len(GRIDS), 85), dtype=np.float32)
+    out[0, :, 4] = rng.uniform(0, 0.3, len(GRIDS))           # objectness de fond
+    out[0, :, 5:] = rng.uniform(0, noise, (len(GRIDS), 80))
+    stride8 = np.flatnonzero(STRIDES_GRID[:, 0] == 8)
+    for _ in range(n_objects):
+        cls = int(rng.integers(0, 80))
+        anchor = int(rng.choice(stride8[:-dup - 1]))
+        bw, bh = rng.uniform(30, 200, 2)
+        for d in range(dup):
+            a = anchor + d
+            s = STRIDES_GRID[a, 0]
+            out[0, a, 0] = rng.uniform(-0.5, 0.5)
+            out[0, a, 1] = rng.uniform(-0.5, 0.5)
+            out[0, a, 2] = np.log(bw / s * rng.uniform(0.95, 1.05))
+            out[0, a, 3] = np.log(bh / s * rng.uniform(0.95, 1.05))
+            out[0, a, 4] = rng.uniform(0.7, 1.0)
+            out[0, a, 5 + cls] = rng.uniform(0.6, 1.0)
+    return out
+
+
+def _same(a, b):
+    assert len(a) == len(b), f"{len(a)} détections vs {len(b)} (référence)"
+    for got, ref in zip(sorted(a), sorted(b)):
+        assert got[0] == ref[0] and got[2:] == ref[2:], f"{got} != {ref}"
+        assert abs(got[1] - ref[1]) < 1e-6, f"{got} != {ref}"
+
+
+def test_equivalence_reference():
+    for seed in range(20):
+        out = synthetic_output(seed=seed)
+        _same(postprocess(out, FRAME_SHAPE, SCALE, PAD_W, PAD_H, top_k=0),
+              reference_postprocess(out, FRAME_SHAPE, SCALE, PAD_W, PAD_H))
+
+
+def test_per_class_nms():
+    # Deux boîtes identiques de classes différentes : les deux restent
+    out = np.zeros((1, len(GRIDS), 85), dtype=np.float32)
+    for a, cls in ((1000, 0), (1000, 56)):
+        out[0, a, 2:4] = np.log(12.0)
+        out[0, a, 4] = 0.9
+        out[0, a, 5 + cls] = 0.9
+    out[0, 1001] = out[0, 1000]
+    out[0, 1001, 5:] = 0
+    out[0, 1001, 5 + 56] = 0.8
+    dets = postprocess(out, FRAME_SHAPE, SCALE, PAD_W, PAD_H)
+    assert sorted(d[0] for d in dets) == [0, 56], dets
+
+
+def test_sorted_and_clipped():
+    out = synthetic_output(n_objects=10, seed=3)
+    dets = postprocess(out, FRAME_SHAPE, SCALE, PAD_W, PAD_H)
+    scores = [d[1] for d in dets]
+    assert scores == sorted(scores, reverse=True)
+    for _, _, x1, y1, x2, y2 in dets:
+        assert 0 <= x1 and 0 <= y1 and x2 <= FRAME_SHAPE[1] and y2 <= FRAME_SHAPE[0]
+
+
+def test_top_k_and_class_filter():
+    out = synthetic_output(n_objects=30, dup=8, seed=5)
+    full = postprocess(out, FRAME_SHAPE, SCALE, PAD_W, PAD_H, top_k=0)
+    # top-k large : mêmes détections
+    _same(postprocess(out, FRAME_SHAPE, SCALE, PAD_W, PAD_H, top_k=1000), full)
+    persons = postprocess(out, FRAME_SHAPE, SCALE, PAD_W, PAD_H, classes=[0])
+    assert all(d[0] == 0 for d in persons)
+
+
+def test_input_size_320():
+    # 320x320 : 2100 ancres ; ancre stride 8 en (gx=10, gy=20) -> centre (80, 160) dans l'entrée
+    out = np.zeros((1, 2100, 85), dtype=np.float32)
+    a = 20 * 40 + 10
+    out[0, a, 2:4] = np.log(4.0)              # 32x32 px
+    out[0, a, 4] = 0.9
+    out[0, a, 5] = 0.9
+    # 640x480 -> 320x320 : scale 0.5, pad vertical 40
+    dets = postprocess(out, FRAME_SHAPE, 0.5, 0, 40, input_size=320)
+    assert dets == [(0, dets[0][1], 128, 208, 192, 272)], dets
+
+
+def test_empty():
+    out = np.zeros((1, len(GRIDS), 85), dtype=np.float32)
+    assert postprocess(out, FRAME_SHAPE, SCALE, PAD_W, PAD_H) == []
+
+
+def test_merge_crop_detections():
+    # Deux personnes dans la pièce, une seule dans la zone en mouvement : le
+    # recadrage ne doit pas faire « disparaître » celle de gauche (2 -> 1 -> 2)
+    full = [(0, 0.9, 20, 100, 120, 400), (0, 0.8, 400, 100, 500, 400)]
+    region = (350, 50, 600, 450)
+    crop = [(0, 0.85, 405, 110, 505, 410)]
+    merged = merge_crop_detections(crop, full, region)
+    assert sorted(d[2] for d in merged) == [20, 405], merged
+    # Personne sortie de la zone : seul le recadrage fait foi dans la zone
+    assert merge_crop_detections([], full, region) == [full[0]]
+
+
+def benchmark(rounds=200):
+    print(f"{'scène':<22}{'candidats':>10}{'référence':>12}{'vectorisé':>12}")
+    for label, n, dup in (("vide", 0, 1), ("normale (6 objets)", 6, 4),
+                          ("chargée (60 objets)", 60, 8), ("foule (200 objets)", 200, 10)):
+        out = synthetic_output(n_objects=n, dup=dup, seed=1)
+        n_cand = int((out[0, :, 4] * out[0, :, 5:].max(axis=1) > CONF_THRESHOLD).sum())
+        res = []
+        for fn in (reference_postprocess, postprocess):
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                fn(out, FRAME_SHAPE, SCALE, PAD_W, PAD_H)
+            res.append((time.perf_counter() - t0) * 1000 / rounds)
+        print(f"{label:<22}{n_cand:>10}{res[0]:>10.2f}ms{res[1]:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit(0)
+    tests = [test_equivalence_reference, test_per_class_nms, test_sorted_and_clipped,
+             test_top_k_and_class_filter, test_input_size_320, test_empty, test_merge_crop_detections]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"✅ {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
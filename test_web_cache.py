@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Test du cache de recherche web contre un faux backend local (sans réseau) :
+1. Normalisation + catégories de TTL
+2. Hit / expiration / cache négatif
+3. Fusion des requêtes simultanées
+4. max_results : une entrée (SEARCH_MAX_RESULTS résultats) servie à toutes les tailles
+5. Disjoncteur : ouverture après échecs, timeout court-circuité, refermeture
+
+Usage:
+    venv/bin/python3 test_web_cache.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from web_cache import SEARCH_MAX_RESULTS, CircuitBreaker, WebSearchCache, categorize, normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeBackend:
+    """Backend local : résultats canned, panne ou lenteur simulées."""
+
+    def __init__(self, results=None, fail=False, delay=0.0):
+        self.results = results if results is not None else [{"title": "Météo Arlon", "body": "12°C, averses"}]
+        self.fail = fail
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self, query, max_results):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("réseau coupé")
+        return list(self.results)
+
+
+def make(backend, clock=None, timeout=1.0):
+    clock = clock or FakeClock()
+    return WebSearchCache(backend, timeout=timeout, clock=clock,
+                          breaker=CircuitBreaker(threshold=2, cooldown=30, clock=clock)), clock
+
+
+def test_normalize_and_categories():
+    assert normalize_query("  Météo à ARLON ?! ") == "meteo a arlon"
+    assert categorize("meteo a arlon")[0] == "meteo"
+    assert categorize("qui a gagne le match")[0] == "score"
+    assert categorize("definition de photon")[0] == "definition"
+    assert categorize("bonjour")[0] == "general"
+    assert categorize("meteo a arlon")[1] < categorize("definition de photon")[1]
+
+
+def test_hit_and_expiry():
+    backend = FakeBackend()
+    cache, clock = make(backend)
+
+    async def run():
+        a = await cache.search("Météo à Arlon ?")
+        b = await cache.search("meteo a arlon")
+        assert a == b and "12°C" in a
+        assert backend.calls == 1
+        clock.now += 1801  # TTL météo dépassé
+        await cache.search("meteo a arlon")
+        assert backend.calls == 2
+
+    asyncio.run(run())
+    st = cache.stats()
+    assert st["hits"] == 1 and st["misses"] == 2
+    assert st["backend_p50_ms"] is not None
+
+
+def test_negative_cache():
+    backend = FakeBackend(results=[])
+    cache, clock = make(backend)
+
+    async def run():
+        assert await cache.search("score du match") == ""
+        assert await cache.search("score du match") == ""
+        assert backend.calls == 1
+        clock.now += cache.negative_ttl + 1
+        await cache.search("score du match")
+        assert backend.calls == 2
+
+    asyncio.run(run())
+    assert cache.stats()["negative_hits"] == 1
+
+
+def test_coalesced_inflight():
+    backend = FakeBackend(delay=0.05)
+    cache, _ = make(backend)
+
+    async def run():
+        return await asyncio.gather(*(cache.search("actualité du jour") for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(set(results)) == 1 and results[0]
+    assert backend.calls == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_circuit_breaker():
+    backend = FakeBackend(fail=True)
+    cache, clock = make(backend)
+
+    async def run():
+        await cache.search("prix du cuivre")
+        await cache.search("prix de l'or")
+        assert cache.breaker.state == "open"
+        t0 = time.perf_counter()
+        assert await cache.search("prix de l'argent") == ""
+        assert (time.perf_counter() - t0) < 0.01  # court-circuité, pas d'appel réseau
+        assert backend.calls == 2
+        # Après le cooldown : un essai, qui réussit → disjoncteur refermé
+        clock.now += 31
+        backend.fail = False
+        assert await cache.search("prix de l'argent")
+        assert cache.breaker.state == "closed"
+
+    asyncio.run(run())
+    st = cache.stats()
+    assert st["errors"] == 2 and st["breaker_skips"] == 1 and st["breaker_trips"] == 1
+
+
+def test_timeout_counts_as_failure():
+    backend = FakeBackend(delay=0.2)
+    cache, _ = make(backend, timeout=0.05)
+
+    async def run():
+        assert await cache.search("news") == ""
+        assert await cache.search("nouvelles") == ""
+
+    asyncio.run(run())
+    assert cache.stats()["timeouts"] == 2
+    assert cache.breaker.state == "open"
+
+
+def test_max_results_sliced_from_one_entry():
+    backend = FakeBackend(results=[{"title": f"Titre {i}", "body": "extrait"} for i in range(8)])
+    seen = []
+    cache, _ = make(lambda q, n: seen.append(n) or backend(q, n))
+
+    async def run():
+        one = await cache.search("definition de photon", max_results=1)
+        three = await cache.search("definition de photon", max_results=3)
+        many = await cache.search("definition de photon", max_results=50)
+        return one, three, many
+
+    one, three, many = asyncio.run(run())
+    assert one.count("•") == 1 and three.count("•") == 3, (one, three)
+    assert many.count("•") == SEARCH_MAX_RESULTS
+    assert seen == [SEARCH_MAX_RESULTS] and backend.calls == 1
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"✅ {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
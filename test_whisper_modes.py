@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests de la sélection du mode Whisper (whisper_modes.pick_compute_type) et
+du WER (word_error_rate). Modes supportés et empreintes imposés : ni
+CTranslate2, ni modèle, ni /proc/meminfo requis.
+
+Usage:
+    venv/bin/python3 test_whisper_modes.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import whisper_modes
+from whisper_modes import MEMORY_MARGIN_MB, pick_compute_type, word_error_rate
+
+FOOTPRINTS = {"float32": 1100, "float16": 620, "int8_float16": 380, "int8": 340}
+
+
+def pick(device, mem, modes=None, footprints=FOOTPRINTS):
+    saved = whisper_modes.supported_modes
+    if modes is not None:
+        whisper_modes.supported_modes = lambda d: list(modes)
+    try:
+        return pick_compute_type(device, mem, footprints)
+    finally:
+        whisper_modes.supported_modes = saved
+
+
+def test_most_precise_mode_that_fits():
+    assert pick("cuda", 8000, whisper_modes.COMPUTE_MODES["cuda"]) == "float16"
+    assert pick("cpu", 8000, whisper_modes.COMPUTE_MODES["cpu"]) == "float32"
+
+
+def test_margin_is_respected():
+    cuda = whisper_modes.COMPUTE_MODES["cuda"]
+    limit = FOOTPRINTS["float16"] + MEMORY_MARGIN_MB
+    assert pick("cuda", limit, cuda) == "float16"            # tient tout juste
+    assert pick("cuda", limit - 1, cuda) == "int8_float16"   # 1 MB de moins : mode suivant
+
+
+def test_fallback_follows_preference_order():
+    cuda = whisper_modes.COMPUTE_MODES["cuda"]
+    assert pick("cuda", FOOTPRINTS["int8_float16"] + MEMORY_MARGIN_MB, cuda) == "int8_float16"
+    assert pick("cuda", FOOTPRINTS["int8"] + MEMORY_MARGIN_MB, cuda) == "int8"
+    # Rien ne tient : le plus économe, pas le premier de la liste
+    assert pick("cuda", 100, cuda) == "int8"
+    assert pick("cpu", 100, whisper_modes.COMPUTE_MODES["cpu"]) == "int8"
+
+
+def test_measured_footprints_override_estimates():
+    cuda = whisper_modes.COMPUTE_MODES["cuda"]
+    measured = {**FOOTPRINTS, "float16": 2000}
+    assert pick("cuda", 1500, cuda, measured) == "int8_float16"
+    assert pick("cuda", 1500, cuda) == "float16"
+
+
+def test_unsupported_modes_skipped():
+    assert pick("cuda", 8000, ["int8_float16", "int8"]) == "int8_float16"
+
+
+def test_unreadable_ram_and_no_mode():
+    assert pick("cuda", -1, whisper_modes.COMPUTE_MODES["cuda"]) == "float16"
+    assert pick("cuda", 8000, []) == "float16"
+    assert pick("cpu", 8000, []) == "float32"
+
+
+def test_word_error_rate():
+    assert word_error_rate("Allume la lumière du salon", "allume la lumiere du salon !") == 0.0
+    assert word_error_rate("allume la lumière", "allume lumière") == 1 / 3            # suppression
+    assert word_error_rate("allume la lumière", "allume la la lumière") == 1 / 3      # insertion
+    assert word_error_rate("allume la lumière", "éteins la lumière") == 1 / 3         # substitution
+    assert word_error_rate("quelle heure est-il", "") == 1.0
+    assert word_error_rate("", "") == 0.0
+    assert word_error_rate("...", "bonjour") == 1.0
+    assert word_error_rate("bonjour", "bonjour kitt comment vas tu") == 4.0          # WER peut dépasser 1
+
+
+if __name__ == "__main__":
+    tests = [test_most_precise_mode_that_fits, test_margin_is_respected,
+             test_fallback_follows_preference_order, test_measured_footprints_override_estimates,
+             test_unsupported_modes_skipped, test_unreadable_ram_and_no_mode, test_word_error_rate]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"✅ {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
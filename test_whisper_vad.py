@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests du VAD serveur (whisper_vad.trim_speech) sur des clips synthétiques :
+silence, parole entourée de silence, et clip parlé d'un bout à l'autre
+(cas normal du mode wake-word, qui n'envoie que de l'audio déjà audible).
+
+Usage:
+    venv/bin/python3 test_whisper_vad.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+from whisper_vad import SAMPLE_RATE, trim_speech
+
+
+def voiced(seconds, level_db=-20.0, seed=0):
+    """Signal voisé (harmoniques de 140 Hz modulées en amplitude + souffle)."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    sig = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 8))
+    sig *= 0.85 + 0.15 * np.sin(2 * np.pi * 4 * t)        # syllabes enchaînées
+    sig += 0.05 * rng.standard_normal(len(t))
+    rms = np.sqrt(np.mean(sig ** 2))
+    return (sig / rms * 10 ** (level_db / 20)).astype(np.float32)
+
+
+def silence(seconds, level_db=-65.0, seed=1):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 10 ** (level_db / 20)).astype(np.float32)
+
+
+def test_silence_rejected():
+    res = trim_speech(silence(1.5), use_silero=False)
+    assert res.rejected and res.speech_ms == 0 and res.audio.size == 0
+
+
+def test_speech_in_silence_trimmed():
+    audio = np.concatenate([silence(1.0), voiced(0.8), silence(1.0)])
+    res = trim_speech(audio, use_silero=False)
+    assert not res.rejected, res
+    assert 0.6 <= res.start_s <= 1.0 and 1.8 <= res.end_s <= 2.2, (res.start_s, res.end_s)
+
+
+def test_all_speech_clip_kept():
+    # Régression : le plancher de bruit pris au 10e percentile du clip lui-même
+    # rejetait un clip entièrement parlé (speech_ms=0) avant même Silero
+    for seconds in (0.6, 1.2):
+        res = trim_speech(voiced(seconds), use_silero=False)
+        assert not res.rejected, (seconds, res.speech_ms)
+        assert res.speech_ms >= seconds * 1000 * 0.8, (seconds, res.speech_ms)
+
+
+if __name__ == "__main__":
+    tests = [test_silence_rejected, test_speech_in_silence_trimmed, test_all_speech_clip_kept]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"✅ {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
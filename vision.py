@@ -2,17 +2,22 @@
 """
 KYRONEX Vision Module — YOLOX-S (Apache 2.0) + auto-enhancement.
 Runs with system python3 + cv2 (no venv needed).
+onnxruntime (optional) adds TensorRT / CUDA / CPU backends.
 
 Usage:
     /usr/bin/python3 vision.py              # capture + detect, JSON to stdout
     /usr/bin/python3 vision.py --test       # test camera only
     /usr/bin/python3 vision.py --debug      # save debug images
-    /usr/bin/python3 vision.py --benchmark  # speed test
+    /usr/bin/python3 vision.py --benchmark  # latency table per backend, saves the fastest
+    /usr/bin/python3 vision_bench.py DIR    # offline: recorded frames, per-stage latency + accuracy
 """
 
+import functools
 import json
 import os
+import struct
 import sys
+import threading
 import time
 import numpy as np
 from pathlib import Path
@@ -21,13 +26,51 @@ from collections import Counter
 os.environ["OPENCV_LOG_LEVEL"] = "ERROR"
 import cv2
 
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
 # ── Paths ────────────────────────────────────────────────────
 BASE_DIR = Path(__file__).parent
 ONNX_MODEL = BASE_DIR / "models" / "yolox_s.onnx"
+BACKEND_FILE = BASE_DIR / "models" / "vision_backend.json"   # choix du --benchmark
+TRT_CACHE_DIR = BASE_DIR / "models" / "trt_cache"
+# Image de debug transmise par mémoire partagée (tmpfs)
+SHM_DIR = Path("/dev/shm") if Path("/dev/shm").is_dir() else Path("/tmp")
 
 INPUT_SIZE = 640
+# Résolution par type de requête : 320 / 416 / 640. Une taille autre que 640 utilise
+# models/yolox_s_<taille>.onnx s'il existe, sinon yolox_s.onnx s'il a été exporté
+# en forme dynamique (YOLOX tools/export_onnx.py --dynamic), sinon retombe sur 640.
+SIZE_FULL = int(os.environ.get("KITT_VISION_SIZE_FULL", str(INPUT_SIZE)))    # chat : description
+SIZE_VIGIL = int(os.environ.get("KITT_VISION_SIZE_VIGIL", "320"))             # vigilance : personnes
 CONF_THRESHOLD = 0.35
 NMS_THRESHOLD = 0.45
+TOP_K = 1000             # candidats max avant NMS (borne le coût des scènes chargées)
+
+# Daemon : caméra gardée ouverte, libérée après N secondes sans requête
+CAMERA_IDLE_RELEASE = float(os.environ.get("KITT_CAMERA_IDLE", "120"))
+
+# Vigilance : détection de mouvement (image réduite en niveaux de gris) avant YOLOX
+MOTION_FPS = 5.0              # analyses de mouvement par seconde
+MOTION_SIZE = (160, 120)      # taille de l'image d'analyse
+MOTION_THRESHOLD = 0.01       # fraction de pixels changés = mouvement
+MOTION_EVENT_INTERVAL = 2.0   # s entre deux événements « motion » poussés
+VIGIL_MIN_INTERVAL = 1.0      # s entre deux détections déclenchées par le mouvement
+VIGIL_SANITY_INTERVAL = 60.0  # s — détection de contrôle même sans mouvement
+# Détection limitée à la zone en mouvement (les personnes immobiles hors zone ne
+# sont alors pas comptées) ; le contrôle périodique reste sur l'image entière
+VIGIL_CROP = os.environ.get("KITT_VIGIL_CROP", "0") == "1"
+VIGIL_CROP_MARGIN = 0.25      # marge autour de la zone (fraction de sa taille)
+VIGIL_CROP_MAX = 0.5          # zone > 50 % de l'image : image entière
+
+# Amélioration des images sombres : une détection sur N faite brute ET améliorée
+ENHANCE_PROBE_EVERY = int(os.environ.get("KITT_ENHANCE_PROBE_EVERY", "10"))
+ENHANCE_MIN_CONF = 0.5        # objet vu par une seule variante : compté s'il est au moins aussi sûr
+
+# Couleurs : teinte des ROI de plus de N pixels sous-échantillonnée (0 = exact)
+COLOR_MAX_PIXELS = int(os.environ.get("KITT_COLOR_MAX_PIXELS", "0"))
 
 # ── COCO class names (French) ───────────────────────────────
 COCO_NAMES = [
@@ -62,31 +105,169 @@ COLOR_RANGES = [
 # Image preprocessing
 # ══════════════════════════════════════════════════════════════
 
-def enhance_image(frame):
-    """Auto-enhance brightness and contrast for better detection."""
-    grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    mean_brightness = float(np.mean(grey))
+# Luminosité moyenne : < DARK -> CLAHE fort, < DIM -> courbe gamma (LUT), sinon rien
+BRIGHTNESS_DARK = 60
+BRIGHTNESS_DIM = 90
+BRIGHTNESS_TARGET = 110        # moyenne visée par la LUT gamma du régime « dim »
+BRIGHTNESS_STEP = 4            # sous-échantillonnage pour la mesure de luminosité
+
+
+def check_brightness(frame):
+    """Mean brightness (0-255), measured on a frame subsampled BRIGHTNESS_STEP times."""
+    h, w = frame.shape[:2]
+    small = cv2.resize(frame, (max(1, w // BRIGHTNESS_STEP), max(1, h // BRIGHTNESS_STEP)),
+                       interpolation=cv2.INTER_NEAREST)
+    return cv2.mean(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))[0]
+
+
+def brightness_regime(brightness):
+    """'dark' (CLAHE), 'dim' (LUT gamma) ou None (image laissée telle quelle)."""
+    if brightness < BRIGHTNESS_DARK:
+        return "dark"
+    if brightness < BRIGHTNESS_DIM:
+        return "dim"
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def _clahe(clip_limit):
+    """Objet CLAHE réutilisé (appelé sous _detect_lock dans le daemon)."""
+    return cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(8, 8))
+
+
+def _gamma_lut(brightness):
+    """LUT 256 entrées : gamma qui amène une moyenne `brightness` vers BRIGHTNESS_TARGET."""
+    gamma = np.log(BRIGHTNESS_TARGET / 255) / np.log(max(brightness, 1) / 255)
+    return np.clip(255 * (np.arange(256) / 255) ** gamma + 0.5, 0, 255).astype(np.uint8)
 
-    if mean_brightness < 60:
-        # Dark image: apply CLAHE (adaptive histogram equalization)
-        lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
-        l, a, b = cv2.split(lab)
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-        l = clahe.apply(l)
-        enhanced = cv2.merge([l, a, b])
-        frame = cv2.cvtColor(enhanced, cv2.COLOR_LAB2BGR)
-    elif mean_brightness < 90:
-        # Slightly dark: mild brightness boost
-        lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
-        l, a, b = cv2.split(lab)
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        l = clahe.apply(l)
-        enhanced = cv2.merge([l, a, b])
-        frame = cv2.cvtColor(enhanced, cv2.COLOR_LAB2BGR)
 
+_DIM_LUTS = {b: _gamma_lut(b) for b in range(BRIGHTNESS_DARK, BRIGHTNESS_DIM)}
+
+
+def enhance_image(frame, brightness=None):
+    """Auto-enhance brightness and contrast for better detection.
+
+    `brightness`: mean already measured by check_brightness (avoids a second pass).
+    """
+    if brightness is None:
+        brightness = check_brightness(frame)
+    regime = brightness_regime(brightness)
+    if regime == "dark":
+        # Dark image: CLAHE (adaptive histogram equalization) on the L channel only
+        lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
+        cv2.insertChannel(_clahe(3.0).apply(cv2.extractChannel(lab, 0)), lab, 0)
+        return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+    if regime == "dim":
+        # Slightly dark: precomputed gamma curve, one LUT pass on BGR (no LAB round trip)
+        return cv2.LUT(frame, _DIM_LUTS[int(brightness)])
     return frame
 
 
+def box_iou(a, b):
+    """IoU de deux boîtes (x1, y1, x2, y2)."""
+    iw = min(a[2], b[2]) - max(a[0], b[0])
+    ih = min(a[3], b[3]) - max(a[1], b[1])
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_boxes(found, reference, iou_min=0.5):
+    """Appariement glouton : même classe, meilleure IoU >= iou_min, confiance décroissante.
+
+    found, reference : listes de (classe, confiance, boîte). Partagé par
+    detection_gain et vision_bench. -> (paires [(i_found, j_ref)],
+    indices de found non appariés, indices de reference non appariés).
+    """
+    pairs, lone = [], []
+    left = list(range(len(reference)))
+    for i in sorted(range(len(found)), key=lambda i: -found[i][1]):
+        cls, _, box = found[i]
+        best, best_iou = None, iou_min
+        for j in left:
+            if reference[j][0] == cls:
+                overlap = box_iou(box, reference[j][2])
+                if overlap >= best_iou:
+                    best, best_iou = j, overlap
+        if best is None:
+            lone.append(i)
+        else:
+            left.remove(best)
+            pairs.append((i, best))
+    return pairs, lone, left
+
+
+def detection_gain(raw_dets, enhanced_dets, iou_min=0.5, min_conf=ENHANCE_MIN_CONF):
+    """Gain de confiance moyen par objet de la variante améliorée sur la brute.
+
+    Boîtes appariées entre les deux variantes (match_boxes) : écart de
+    confiance. Un objet vu par une seule variante compte pour 0 dans l'autre
+    s'il est sûr (>= min_conf), sinon il est ignoré — des boîtes parasites
+    peu sûres ne sont pas un gain.
+    """
+    raw = sorted(((cls, conf, box) for cls, conf, *box in raw_dets), key=lambda d: -d[1])
+    enhanced = [(cls, conf, box) for cls, conf, *box in enhanced_dets]
+    pairs, lone, left = match_boxes(enhanced, raw, iou_min)
+    deltas = [enhanced[i][1] - raw[j][1] for i, j in pairs]
+    deltas += [enhanced[i][1] for i in lone if enhanced[i][1] >= min_conf]
+    deltas += [-raw[j][1] for j in left if raw[j][1] >= min_conf]
+    return sum(deltas) / len(deltas) if deltas else 0.0
+
+
+class EnhanceGate:
+    """L'amélioration aide-t-elle vraiment le détecteur ? Mesuré par régime et profil.
+
+    Clé = régime de luminosité + profil de détection (résolution, classes) :
+    l'amélioration peut aider YOLOX en 640 toutes classes et pas en 320
+    personnes seules. Les premières images sombres de chaque clé, puis une
+    sur ENHANCE_PROBE_EVERY, sont détectées deux fois (brute et améliorée) ;
+    la meilleure des deux est gardée et le gain par objet (detection_gain)
+    moyenné. Gain nul ou négatif : l'amélioration est sautée pour cette clé
+    jusqu'à ce qu'une mesure suivante la justifie de nouveau.
+    """
+
+    def __init__(self, probe_every=ENHANCE_PROBE_EVERY, min_probes=3):
+        self.probe_every = probe_every
+        self.min_probes = min_probes
+        self.regimes = {}
+
+    @staticmethod
+    def key(regime, size, classes=None):
+        """« dark/320/0 », « dim/640/all » — clé JSON des statistiques."""
+        return f"{regime}/{size}/{','.join(map(str, classes)) if classes else 'all'}"
+
+    def _stats(self, regime):
+        return self.regimes.setdefault(regime, {"frames": 0, "probes": 0, "gain": 0.0, "skipped": 0})
+
+    def should_probe(self, regime):
+        st = self._stats(regime)
+        st["frames"] += 1
+        return st["probes"] < self.min_probes or st["frames"] % self.probe_every == 0
+
+    def record(self, regime, raw_dets, enhanced_dets):
+        """Enregistre une mesure ; retourne son gain (> 0 : l'image améliorée est meilleure)."""
+        st = self._stats(regime)
+        gain = detection_gain(raw_dets, enhanced_dets)
+        st["gain"] = gain if st["probes"] == 0 else 0.7 * st["gain"] + 0.3 * gain
+        st["probes"] += 1
+        return gain
+
+    def enabled(self, regime):
+        st = self._stats(regime)
+        if st["probes"] >= self.min_probes and st["gain"] <= 0:
+            st["skipped"] += 1
+            return False
+        return True
+
+    def stats(self):
+        return {r: {**st, "gain": round(st["gain"], 3)} for r, st in self.regimes.items()}
+
+
+_enhance_gate = EnhanceGate()
+
+
 def letterbox(frame, target=640):
     """Resize with padding (letterbox) — preserves aspect ratio."""
     img_h, img_w = frame.shape[:2]
@@ -103,9 +284,15 @@ def letterbox(frame, target=640):
     return padded, scale, pad_w, pad_h
 
 
-def preprocess(frame):
-    """Letterbox + NCHW float32 blob (YOLOX: 0-255, BGR, no normalization)."""
-    padded, scale, pad_w, pad_h = letterbox(frame, INPUT_SIZE)
+def preprocess(frame, out=None, size=INPUT_SIZE):
+    """Letterbox + NCHW float32 blob (YOLOX: 0-255, BGR, no normalization).
+
+    `out`: optional preallocated (1, 3, size, size) float32 buffer filled in place.
+    """
+    padded, scale, pad_w, pad_h = letterbox(frame, size)
+    if out is not None:
+        out[0] = padded.transpose(2, 0, 1)  # HWC -> CHW, uint8 -> float32 (0-255)
+        return out, scale, pad_w, pad_h
     blob = padded.astype(np.float32)  # YOLOX expects 0-255
     blob = blob.transpose(2, 0, 1)   # HWC -> CHW
     blob = blob[np.newaxis, ...]     # add batch dim -> NCHW
@@ -117,14 +304,22 @@ def preprocess(frame):
 # Camera capture
 # ══════════════════════════════════════════════════════════════
 
-def capture_frame():
-    """Capture a single fresh frame from the webcam."""
-    cap = cv2.VideoCapture(0, cv2.CAP_V4L2)
+def open_camera(device=0):
+    """Open the webcam (V4L2, 640x480, 1-frame buffer). None if unavailable."""
+    cap = cv2.VideoCapture(device, cv2.CAP_V4L2)
     if not cap.isOpened():
         return None
     cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
     cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
     cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+def capture_frame():
+    """Capture a single fresh frame from the webcam (one-shot modes)."""
+    cap = open_camera()
+    if cap is None:
+        return None
 
     # Flush stale frames (BUFFERSIZE=1 réduit le besoin)
     for _ in range(5):
@@ -135,10 +330,186 @@ def capture_frame():
     return frame if ret else None
 
 
+class FrameGrabber:
+    """Caméra persistante : un thread lit en continu et garde la dernière image.
+
+    Tampon à une seule place (image + horodatage) : `latest()` ne fait aucune
+    I/O caméra, il rend l'image la plus récente. La caméra est relâchée après
+    `idle_release` secondes sans demande (économie d'énergie) et rouverte à la
+    demande suivante.
+    """
+
+    def __init__(self, device=0, idle_release=CAMERA_IDLE_RELEASE):
+        self.device = device
+        self.idle_release = idle_release
+        self._cond = threading.Condition()
+        self._frame = None
+        self._frame_ts = 0.0
+        self._last_request = 0.0
+        self._wanted = threading.Event()
+        self._thread = None
+        self._stop = False
+        self.opened = False
+        self.error = None
+        self.last_open_ms = 0.0
+        self.opens = 0
+        self.frames = 0
+        self.watching = False       # vigilance : caméra jamais relâchée
+        self.on_frame = None        # callback(frame, ts) dans le thread de capture
+
+    def _run(self):
+        cap = None
+        while not self._stop:
+            if cap is None:
+                self._wanted.wait()
+                if self._stop:
+                    break
+                t0 = time.perf_counter()
+                cap = open_camera(self.device)
+                with self._cond:
+                    self.last_open_ms = (time.perf_counter() - t0) * 1000
+                    if cap is None:
+                        self.error = "Camera indisponible"
+                        if not self.watching:
+                            self._wanted.clear()
+                        self._cond.notify_all()
+                if cap is None:
+                    if self.watching:
+                        time.sleep(5)  # vigilance : nouvelle tentative
+                    continue
+                with self._cond:
+                    self.opens += 1
+                    self.opened = True
+                    self.error = None
+            ret, frame = cap.read()
+            now = time.time()
+            with self._cond:
+                if ret:
+                    self._frame, self._frame_ts = frame, now
+                    self.frames += 1
+                else:
+                    self.error = "Lecture camera impossible"
+                idle = not self.watching and now - self._last_request > self.idle_release
+                if not ret or idle:
+                    # Caméra relâchée : l'image gardée serait périmée
+                    cap.release()
+                    cap = None
+                    self.opened = False
+                    self._frame = None
+                    if not self.watching:
+                        self._wanted.clear()
+                    if idle:
+                        print(f"[VISION] Camera relachee (inactive {self.idle_release:.0f}s)",
+                              file=sys.stderr, flush=True)
+                self._cond.notify_all()
+            if ret and self.on_frame is not None:
+                self.on_frame(frame, now)
+        if cap is not None:
+            cap.release()
+
+    def watch(self, enabled):
+        """Vigilance : garde la caméra ouverte en continu (pas de relâche sur inactivité)."""
+        with self._cond:
+            self.watching = enabled
+            self._last_request = time.time()
+            if enabled:
+                self._wanted.set()
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="frame-grabber", daemon=True)
+                    self._thread.start()
+
+    def latest(self, timeout=3.0):
+        """(frame, timestamp, info) — sans attente si la caméra tourne déjà.
+
+        info : {"wait": ms d'attente, "open": ms d'ouverture si elle a eu lieu ici}
+        """
+        t0 = time.perf_counter()
+        opens = self.opens
+        with self._cond:
+            self._last_request = time.time()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="frame-grabber", daemon=True)
+                self._thread.start()
+            if self._frame is None:
+                self.error = None
+                self._wanted.set()
+                self._cond.wait_for(lambda: self._frame is not None or self.error is not None, timeout)
+            frame, ts = self._frame, self._frame_ts
+            info = {"wait": round((time.perf_counter() - t0) * 1000, 1)}
+            if self.opens != opens:
+                info["open"] = round(self.last_open_ms)
+        return frame, ts, info
+
+    def stop(self):
+        self._stop = True
+        self._wanted.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def stats(self):
+        return {"opened": self.opened, "opens": self.opens, "frames": self.frames,
+                "last_open_ms": round(self.last_open_ms), "idle_release_s": self.idle_release}
+
+
+class MotionDetector:
+    """Premier étage de la vigilance : différence d'images sur un fond glissant.
+
+    Image réduite en niveaux de gris + flou, fond = moyenne glissante
+    (accumulateWeighted) ; score = fraction de pixels qui s'en écartent.
+    Quelques dixièmes de ms par image : YOLOX ne tourne que sur mouvement.
+    """
+
+    def __init__(self, threshold=MOTION_THRESHOLD, fps=MOTION_FPS, size=MOTION_SIZE):
+        self.threshold = threshold
+        self.interval = 1.0 / fps
+        self.size = size
+        self._background = None
+        self._last = 0.0
+        self.score = 0.0
+        self.region = None      # (x1, y1, x2, y2) de la zone en mouvement, coordonnées image
+        self.frame_shape = (0, 0)
+
+    def update(self, frame, ts):
+        """True si mouvement détecté (analyse limitée à `fps` images/s)."""
+        if ts - self._last < self.interval:
+            return False
+        self._last = ts
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        grey = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        if self._background is None:
+            self._background = grey.astype(np.float32)
+            return False
+        diff = cv2.absdiff(grey, cv2.convertScaleAbs(self._background))
+        cv2.accumulateWeighted(grey, self._background, 0.05)
+        moving = diff > 25
+        self.score = float(np.count_nonzero(moving)) / moving.size
+        if self.score < self.threshold:
+            return False
+        ys, xs = np.nonzero(moving)
+        sx = frame.shape[1] / self.size[0]
+        sy = frame.shape[0] / self.size[1]
+        self.region = (int(xs.min() * sx), int(ys.min() * sy), int((xs.max() + 1) * sx), int((ys.max() + 1) * sy))
+        self.frame_shape = frame.shape[:2]
+        return True
+
+    def crop(self, margin=VIGIL_CROP_MARGIN, max_fraction=VIGIL_CROP_MAX):
+        """Zone en mouvement élargie de `margin`, ou None si elle couvre l'essentiel de l'image."""
+        if self.region is None:
+            return None
+        h, w = self.frame_shape
+        x1, y1, x2, y2 = self.region
+        mx, my = int((x2 - x1) * margin), int((y2 - y1) * margin)
+        x1, y1, x2, y2 = max(0, x1 - mx), max(0, y1 - my), min(w, x2 + mx), min(h, y2 + my)
+        if (x2 - x1) * (y2 - y1) > max_fraction * w * h:
+            return None
+        return x1, y1, x2, y2
+
+
 # ══════════════════════════════════════════════════════════════
 # YOLOX grid generation
 # ══════════════════════════════════════════════════════════════
 
+@functools.lru_cache(maxsize=None)
 def _make_grids(input_size=640, strides=(8, 16, 32)):
     """Build YOLOX anchor grids for decoding raw predictions."""
     grids = []
@@ -155,146 +526,447 @@ GRIDS, STRIDES_GRID = _make_grids(INPUT_SIZE)
 
 
 # ══════════════════════════════════════════════════════════════
-# ONNX inference (YOLOX-S)
+# Detector backends (YOLOX-S)
 # ══════════════════════════════════════════════════════════════
 
-_cached_net = None
+class CvDnnBackend:
+    """cv2.dnn — CPU on the Jetson unless OpenCV was built with CUDA."""
+    name = "cv2-dnn"
+
+    def __init__(self, model_path, size=INPUT_SIZE):
+        self.size = size
+        self.net = cv2.dnn.readNetFromONNX(str(model_path))
+        self._out_names = self.net.getUnconnectedOutLayersNames()
+
+    def input_buffer(self):
+        return None
+
+    def infer(self, blob):
+        self.net.setInput(blob)
+        return self.net.forward(self._out_names)[0]
+
+
+class OrtBackend:
+    """onnxruntime with a fixed provider chain and IO binding.
+
+    The input tensor is allocated once and bound once; preprocess() writes
+    straight into it, so no per-frame allocation or copy to the session.
+    """
+
+    PROVIDERS = {
+        "ort-tensorrt": ["TensorrtExecutionProvider", "CUDAExecutionProvider", "CPUExecutionProvider"],
+        "ort-cuda": ["CUDAExecutionProvider", "CPUExecutionProvider"],
+        "ort-cpu": ["CPUExecutionProvider"],
+    }
+
+    def __init__(self, model_path, name="ort-cpu", size=INPUT_SIZE):
+        self.name = name
+        self.size = size
+        providers = []
+        for p in self.PROVIDERS[name]:
+            if p == "TensorrtExecutionProvider":
+                TRT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                providers.append((p, {"trt_fp16_enable": True,
+                                      "trt_engine_cache_enable": True,
+                                      "trt_engine_cache_path": str(TRT_CACHE_DIR)}))
+            else:
+                providers.append(p)
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(model_path), sess_options=opts, providers=providers)
+        # Le fournisseur demandé doit être réellement actif (sinon ORT retombe en silence sur le CPU)
+        active = self.session.get_providers()[0]
+        if active != self.PROVIDERS[name][0]:
+            raise RuntimeError(f"{name}: fournisseur actif {active}")
+        inp = self.session.get_inputs()[0]
+        # Modèle à taille fixe : elle doit être celle demandée ; forme dynamique : toute taille
+        self.dynamic = not all(isinstance(d, int) for d in inp.shape[2:])
+        if not self.dynamic and tuple(inp.shape[2:]) != (size, size):
+            raise RuntimeError(f"{name}: modèle {inp.shape[2]}x{inp.shape[3]}, {size} demandé")
+        self._input_name = inp.name
+        self._output_name = self.session.get_outputs()[0].name
+        self._input = np.zeros((1, 3, size, size), dtype=np.float32)
+        self._binding = self.session.io_binding()
+        self._binding.bind_cpu_input(self._input_name, self._input)
+        self._binding.bind_output(self._output_name)
+
+    def input_buffer(self):
+        return self._input
+
+    def infer(self, blob):
+        if blob is not self._input:
+            np.copyto(self._input, blob)
+        self.session.run_with_iobinding(self._binding)
+        return self._binding.copy_outputs_to_cpu()[0]
+
+
+def available_backends():
+    """Backend names usable on this machine, fastest first (a priori)."""
+    names = []
+    if ort is not None:
+        have = set(ort.get_available_providers())
+        for name, chain in OrtBackend.PROVIDERS.items():
+            if chain[0] in have:
+                names.append(name)
+    names.append(CvDnnBackend.name)
+    return names
+
+
+def load_backend(name, model_path=None, size=INPUT_SIZE):
+    model_path = model_path or ONNX_MODEL
+    if name == CvDnnBackend.name:
+        return CvDnnBackend(model_path, size)
+    if ort is None:
+        raise RuntimeError("onnxruntime non installe")
+    return OrtBackend(model_path, name, size)
+
+
+def model_path_for(size):
+    """models/yolox_s_<taille>.onnx s'il existe, sinon le modèle principal (forme dynamique ?)."""
+    if size != INPUT_SIZE:
+        variant = ONNX_MODEL.with_name(f"{ONNX_MODEL.stem}_{size}{ONNX_MODEL.suffix}")
+        if variant.exists():
+            return variant
+    return ONNX_MODEL
+
+
+def load_sized_backend(name, size):
+    """Backend `name` en entrée size x size, vérifié par une inférence (nombre d'ancres)."""
+    net = load_backend(name, model_path_for(size), size)
+    out = net.infer(np.zeros((1, 3, size, size), dtype=np.float32))
+    anchors = len(_make_grids(size)[0])
+    if out.shape[1] != anchors:
+        raise RuntimeError(f"sortie {tuple(out.shape)}, {anchors} ancres attendues")
+    return net
+
+
+def _preferred_backend():
+    """KITT_VISION_BACKEND, sinon le choix du dernier --benchmark, sinon None."""
+    forced = os.environ.get("KITT_VISION_BACKEND", "").strip()
+    if forced:
+        return forced
+    try:
+        return json.loads(BACKEND_FILE.read_text()).get("backend")
+    except Exception:
+        return None
+
 
-def _get_net():
-    """Charge le modèle YOLOX-S une seule fois (cache global)."""
-    global _cached_net
-    if _cached_net is None:
-        _cached_net = cv2.dnn.readNetFromONNX(str(ONNX_MODEL))
-    return _cached_net
+_nets = {}       # taille d'entrée -> backend chargé
+_nets_lock = threading.Lock()
 
 
-def run_onnx(frame, enhanced, model_path):
-    """Run YOLOX-S via cv2.dnn (modèle en cache)."""
-    net = _get_net()
-    blob, scale, pad_w, pad_h = preprocess(enhanced)
-    net.setInput(blob)
-    outputs = net.forward(net.getUnconnectedOutLayersNames())
-    return postprocess(outputs[0], frame.shape, scale, pad_w, pad_h)
+def _get_net(size=INPUT_SIZE):
+    """Détecteur pour cette taille d'entrée, chargé une seule fois.
+
+    640 : backend préféré, sinon le premier qui marche. Autre taille : même
+    backend sur la variante du modèle ; indisponible -> détecteur 640.
+    """
+    net = _nets.get(size)
+    if net is not None:
+        return net
+    with _nets_lock:
+        if size not in _nets:
+            _nets[size] = _load_main_net() if size == INPUT_SIZE else _load_variant(size)
+        return _nets[size]
+
+
+def _load_variant(size):
+    main = _nets.get(INPUT_SIZE) or _load_main_net()
+    _nets[INPUT_SIZE] = main
+    try:
+        return load_sized_backend(main.name, size)
+    except Exception as e:
+        print(f"[VISION] Entree {size} indisponible ({e}) : {INPUT_SIZE} utilise", file=sys.stderr, flush=True)
+        return main
+
+
+def _load_main_net():
+    candidates = available_backends()
+    preferred = _preferred_backend()
+    if preferred in candidates:
+        candidates.remove(preferred)
+        candidates.insert(0, preferred)
+    errors = []
+    for name in candidates:
+        try:
+            net = load_backend(name)
+            break
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+    else:
+        raise RuntimeError("Aucun backend vision: " + "; ".join(errors))
+    if errors:
+        print("[VISION] Backends ignores: " + "; ".join(errors), file=sys.stderr, flush=True)
+    return net
+
+
+def run_onnx(frame, enhanced, model_path, size=INPUT_SIZE, classes=None, timing=None):
+    """Run YOLOX-S on the cached backend for this input size.
+
+    `timing`: optional dict, receives preprocess / inference / postprocess ms.
+    """
+    net = _get_net(size)
+    t0 = time.perf_counter()
+    blob, scale, pad_w, pad_h = preprocess(enhanced, out=net.input_buffer(), size=net.size)
+    t1 = time.perf_counter()
+    output = net.infer(blob)
+    t2 = time.perf_counter()
+    detections = postprocess(output, frame.shape, scale, pad_w, pad_h, classes=classes, input_size=net.size)
+    if timing is not None:
+        timing["preprocess"] = round((t1 - t0) * 1000, 1)
+        timing["inference"] = round((t2 - t1) * 1000, 1)
+        timing["postprocess"] = round((time.perf_counter() - t2) * 1000, 1)
+    return detections
+
+
+def benchmark_backends(frames, runs=20, model_path=None):
+    """Latency of every available backend on the same frames. Returns {name: stats}."""
+    results = {}
+    for name in available_backends():
+        try:
+            t0 = time.perf_counter()
+            backend = load_backend(name, model_path)
+            load_ms = (time.perf_counter() - t0) * 1000
+        except Exception as e:
+            results[name] = {"error": str(e)}
+            continue
+        blobs = [preprocess(enhance_image(f)) for f in frames]
+        backend.infer(blobs[0][0])  # warmup (TensorRT: construction / lecture du cache moteur)
+        times = []
+        for i in range(runs):
+            blob = blobs[i % len(blobs)][0]
+            t0 = time.perf_counter()
+            backend.infer(blob)
+            times.append((time.perf_counter() - t0) * 1000)
+        times.sort()
+        results[name] = {"load_ms": round(load_ms), "min": round(times[0], 1),
+                         "p50": round(times[len(times) // 2], 1),
+                         "p90": round(times[int(len(times) * 0.9)], 1)}
+    return results
 
 
 # ══════════════════════════════════════════════════════════════
 # Post-processing (YOLOX)
 # ══════════════════════════════════════════════════════════════
 
-def postprocess(output, orig_shape, scale, pad_w, pad_h):
+def nms_per_class(boxes, scores, class_ids, iou_threshold):
+    """Greedy NMS per class (pure NumPy) -> kept indices, best score first.
+
+    Boxes of different classes never suppress each other: each class is
+    shifted by its own offset, then a single NMS runs on all boxes
+    ("batched NMS"). IoU uses areas w*h as cv2.dnn.NMSBoxes does.
+    """
+    if len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    span = float(boxes.max() - boxes.min()) + 1.0
+    offset = class_ids.astype(np.float64)[:, None] * span
+    b = boxes.astype(np.float64) + offset
+    x1, y1, x2, y2 = b[:, 0], b[:, 1], b[:, 2], b[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = w * h
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def postprocess(output, orig_shape, scale, pad_w, pad_h, top_k=TOP_K, classes=None, input_size=INPUT_SIZE):
     """Parse YOLOX output -> list of (class_id, confidence, x1, y1, x2, y2).
 
-    YOLOX output: [1, 8400, 85] = 4 bbox + 1 objectness + 80 class scores.
+    YOLOX output: [1, 8400, 85] = 4 bbox + 1 objectness + 80 class scores
+    (8400 anchors at 640, 3549 at 416, 2100 at 320 — `input_size`).
     Bbox coords are raw offsets; decoded via grid + stride.
+    Fully vectorized: score filter first, then decode / unletterbox / clip
+    only the surviving anchors, optional top-k, per-class NMS.
+    `classes`: optional list of class ids to keep (e.g. [0] = persons only).
     """
     img_h, img_w = orig_shape[:2]
 
-    # output shape: [1, 8400, 85]
-    predictions = output[0]  # (8400, 85)
-
-    # Decode bbox: cx = (raw_x + grid_x) * stride, cy = (raw_y + grid_y) * stride
-    #              w  = exp(raw_w) * stride,        h  = exp(raw_h) * stride
-    cx = (predictions[:, 0] + GRIDS[:, 0]) * STRIDES_GRID[:, 0]
-    cy = (predictions[:, 1] + GRIDS[:, 1]) * STRIDES_GRID[:, 0]
-    w = np.exp(predictions[:, 2]) * STRIDES_GRID[:, 0]
-    h = np.exp(predictions[:, 3]) * STRIDES_GRID[:, 0]
+    predictions = output[0]  # (anchors, 85)
 
-    # Score = objectness * max(class_scores)
-    objectness = predictions[:, 4]
-    class_scores = predictions[:, 5:]
-    max_class_scores = np.max(class_scores, axis=1)
-    scores = objectness * max_class_scores
+    # score = objectness * class score <= objectness : cheap pre-filter on objectness
+    cand = np.flatnonzero(predictions[:, 4] > CONF_THRESHOLD)
+    if cand.size == 0:
+        return []
+    pred = predictions[cand]
+    class_scores = pred[:, 5:]
+    if classes is not None:
+        class_scores = class_scores[:, classes]
+    best = np.argmax(class_scores, axis=1)
+    scores = pred[:, 4] * class_scores[np.arange(len(best)), best]
+    class_ids = np.asarray(classes)[best] if classes is not None else best
 
     mask = scores > CONF_THRESHOLD
-    cx, cy, w, h = cx[mask], cy[mask], w[mask], h[mask]
-    filtered_scores = scores[mask]
-    class_ids = np.argmax(class_scores[mask], axis=1)
-
-    rects = []
-    confidences = []
-    ids = []
-
-    for i in range(len(filtered_scores)):
-        x1 = int((cx[i] - w[i] / 2 - pad_w) / scale)
-        y1 = int((cy[i] - h[i] / 2 - pad_h) / scale)
-        bw = int(w[i] / scale)
-        bh = int(h[i] / scale)
-        rects.append([x1, y1, bw, bh])
-        confidences.append(float(filtered_scores[i]))
-        ids.append(int(class_ids[i]))
-
-    detections = []
-    if rects:
-        indices = cv2.dnn.NMSBoxes(rects, confidences, CONF_THRESHOLD, NMS_THRESHOLD)
-        if len(indices) > 0:
-            for idx in indices.flatten():
-                x1, y1, bw, bh = rects[idx]
-                x2, y2 = x1 + bw, y1 + bh
-                x1 = max(0, x1)
-                y1 = max(0, y1)
-                x2 = min(img_w, x2)
-                y2 = min(img_h, y2)
-                detections.append((ids[idx], confidences[idx], x1, y1, x2, y2))
+    if not mask.any():
+        return []
+    cand, pred, scores, class_ids = cand[mask], pred[mask], scores[mask], class_ids[mask]
 
-    return detections
+    if top_k and len(scores) > top_k:
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        cand, pred, scores, class_ids = cand[top], pred[top], scores[top], class_ids[top]
+
+    # Decode bbox: cx = (raw_x + grid_x) * stride, cy = (raw_y + grid_y) * stride
+    #              w  = exp(raw_w) * stride,        h  = exp(raw_h) * stride
+    grids, strides = _make_grids(input_size)
+    stride = strides[cand, 0]
+    cx = (pred[:, 0] + grids[cand, 0]) * stride
+    cy = (pred[:, 1] + grids[cand, 1]) * stride
+    w = np.exp(pred[:, 2]) * stride
+    h = np.exp(pred[:, 3]) * stride
+
+    # Unletterbox (truncation vers zéro comme int(), pour des boîtes identiques à l'ancienne boucle)
+    x1 = np.trunc((cx - w / 2 - pad_w) / scale).astype(np.int64)
+    y1 = np.trunc((cy - h / 2 - pad_h) / scale).astype(np.int64)
+    x2 = x1 + np.trunc(w / scale).astype(np.int64)
+    y2 = y1 + np.trunc(h / scale).astype(np.int64)
+    boxes = np.stack([x1, y1, x2, y2], axis=1)
+
+    keep = nms_per_class(boxes, scores, class_ids, NMS_THRESHOLD)
+    boxes = boxes[keep]
+    # Clip après NMS (comme avant) : x1, y1 >= 0 ; x2 <= largeur, y2 <= hauteur
+    boxes[:, :2] = np.maximum(boxes[:, :2], 0)
+    boxes[:, 2] = np.minimum(boxes[:, 2], img_w)
+    boxes[:, 3] = np.minimum(boxes[:, 3], img_h)
+    return [(int(c), float(sc), int(bx[0]), int(bx[1]), int(bx[2]), int(bx[3]))
+            for c, sc, bx in zip(class_ids[keep], scores[keep], boxes.tolist())]
 
 
 # ══════════════════════════════════════════════════════════════
 # Color analysis
 # ══════════════════════════════════════════════════════════════
 
-def detect_color(roi):
-    """Detect dominant color in a region of interest."""
-    if roi.size == 0 or roi.shape[0] < 5 or roi.shape[1] < 5:
-        return None
-
-    hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
-    h, s, v = cv2.split(hsv)
+_SAT_LO, _SAT_HI = (0, 41, 41), (255, 255, 255)   # masque couleur : S > 40 et V > 40
 
-    mean_s = float(np.mean(s))
-    mean_v = float(np.mean(v))
 
+def _color_name(mean_s, mean_v, n_mask, dominant_hue):
+    """Règles de couleur (ROI déjà résumée : moyennes S/V, pixels saturés, teinte dominante)."""
     if mean_s < 30:
         return "blanc" if mean_v > 170 else ("noir" if mean_v < 60 else "gris")
-
-    mask = (s > 40) & (v > 40)
-    if np.sum(mask) < 20:
+    if n_mask < 20:
         return "gris"
-
-    hist = cv2.calcHist([h], [0], mask.astype(np.uint8) * 255, [180], [0, 180])
-    dominant_hue = int(np.argmax(hist))
-
     for (lo, hi), name in COLOR_RANGES:
         if lo <= dominant_hue < hi:
             return name
     return None
 
 
-def detect_clothing_colors(frame, box):
-    """For person detections, analyze upper/lower body colors."""
+def _hsv_stats(hsv, mask, max_pixels):
+    """(moyenne S, moyenne V, pixels saturés, teinte dominante) d'une ROI HSV + masque."""
+    area = hsv.shape[0] * hsv.shape[1]
+    _, s_sum, v_sum, _ = cv2.sumElems(hsv)
+    mean_s, mean_v = s_sum / area, v_sum / area
+    n_mask = cv2.countNonZero(mask)
+    dominant = 0
+    if mean_s >= 30 and n_mask >= 20:     # histogramme seulement s'il sert
+        if max_pixels and area > max_pixels:
+            step = int(np.ceil(np.sqrt(area / max_pixels)))
+            hsv, mask = np.ascontiguousarray(hsv[::step, ::step]), np.ascontiguousarray(mask[::step, ::step])
+        dominant = int(np.argmax(cv2.calcHist([hsv], [0], mask, [180], [0, 180])))
+    return mean_s, mean_v, n_mask, dominant
+
+
+def roi_colors(frame, rois, max_pixels=COLOR_MAX_PIXELS):
+    """Couleur dominante (ou None) de chaque ROI (y1, y2, x1, x2) de l'image, en une passe.
+
+    Avant, chaque ROI (deux par personne) refaisait cvtColor + split + mean
+    + masque numpy + calcHist. Ici les ROI se recouvrant souvent (personne
+    assise, objets sur une table), la zone qu'elles couvrent est convertie
+    en HSV une seule fois, le masque S/V calculé une fois (inRange), puis
+    chaque ROI est une vue : sommes et histogramme sans copie ni split.
+    Si les ROI sont éparses (boîte englobante plus grande que la somme des
+    ROI), chacune est convertie seule — aucun pixel n'est traité inutilement.
+    Résultat identique à l'ancien detect_color ; max_pixels > 0
+    sous-échantillonne l'histogramme des grandes ROI (approché).
+    """
+    result = [None] * len(rois)
+    # Bornes normalisées comme le ferait frame[y1:y2, x1:x2] ; ROI < 5 px ignorées
+    h, w = frame.shape[:2]
+    boxes = []
+    for i, (y1, y2, x1, x2) in enumerate(rois):
+        y1, y2, _ = slice(y1, y2).indices(h)
+        x1, x2, _ = slice(x1, x2).indices(w)
+        if y2 - y1 >= 5 and x2 - x1 >= 5:
+            boxes.append((i, y1, y2, x1, x2))
+    if not boxes:
+        return result
+    oy, ox = min(b[1] for b in boxes), min(b[3] for b in boxes)
+    ey, ex = max(b[2] for b in boxes), max(b[4] for b in boxes)
+    shared = (ey - oy) * (ex - ox) <= sum((y2 - y1) * (x2 - x1) for _, y1, y2, x1, x2 in boxes)
+    if shared:
+        hsv = cv2.cvtColor(frame[oy:ey, ox:ex], cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, _SAT_LO, _SAT_HI)
+    for i, y1, y2, x1, x2 in boxes:
+        if shared:
+            sl = (slice(y1 - oy, y2 - oy), slice(x1 - ox, x2 - ox))
+            roi_hsv, roi_mask = hsv[sl], mask[sl]
+        else:
+            roi_hsv = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2HSV)
+            roi_mask = cv2.inRange(roi_hsv, _SAT_LO, _SAT_HI)
+        result[i] = _color_name(*_hsv_stats(roi_hsv, roi_mask, max_pixels))
+    return result
+
+
+def detect_color(roi):
+    """Detect dominant color in a region of interest."""
+    return roi_colors(roi, [(0, roi.shape[0], 0, roi.shape[1])])[0] if roi.size else None
+
+
+def clothing_rois(box):
+    """ROI haut / bas du corps d'une personne, ou None si la boîte est trop petite."""
     x1, y1, x2, y2 = box
     h = y2 - y1
     if h < 30:
-        return None, None
+        return None
+    return ((y1 + int(h * 0.15), y1 + int(h * 0.45), x1, x2),
+            (y1 + int(h * 0.55), y1 + int(h * 0.90), x1, x2))
 
-    upper_roi = frame[y1 + int(h * 0.15):y1 + int(h * 0.45), x1:x2]
-    lower_roi = frame[y1 + int(h * 0.55):y1 + int(h * 0.90), x1:x2]
 
-    return detect_color(upper_roi), detect_color(lower_roi)
+def detect_clothing_colors(frame, box):
+    """For person detections, analyze upper/lower body colors."""
+    rois = clothing_rois(box)
+    if rois is None:
+        return None, None
+    upper, lower = roi_colors(frame, rois)
+    return upper, lower
 
 
 # ══════════════════════════════════════════════════════════════
 # Build description
 # ══════════════════════════════════════════════════════════════
 
-def check_brightness(frame):
-    """Mean brightness (0-255)."""
-    return float(np.mean(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)))
+def description_rois(detections):
+    """ROI couleur de chaque détection -> (rois, slots).
+
+    slots[i] : index de la ROI de l'objet i, (haut, bas) pour une personne,
+    None si la personne est trop petite.
+    """
+    rois, slots = [], []
+    for class_id, conf, x1, y1, x2, y2 in detections:
+        if class_id == 0:  # person: haut / bas
+            body = clothing_rois((x1, y1, x2, y2))
+            slots.append((len(rois), len(rois) + 1) if body else None)
+            rois.extend(body or ())
+        else:
+            slots.append(len(rois))
+            rois.append((y1, y2, x1, x2))
+    return rois, slots
+
 
+def build_description(frame, detections, brightness=None, colors=None):
+    """Build French description from detections.
 
-def build_description(frame, detections):
-    """Build French description from detections."""
-    brightness = check_brightness(frame)
+    `brightness`: already measured, if known; `colors`: result of
+    roi_colors(frame, description_rois(detections)[0]), if already computed.
+    """
+    if brightness is None:
+        brightness = check_brightness(frame)
     dark_warning = ""
     if brightness < 30:
         dark_warning = " La scene est tres sombre, les resultats peuvent etre imprecis."
@@ -306,15 +978,20 @@ def build_description(frame, detections):
         return {"objects": [], "brightness": round(brightness),
                 "description": "Aucun objet detecte dans le champ de vision."}
 
+    # Toutes les ROI de l'image analysées en une passe
+    rois, slots = description_rois(detections)
+    if colors is None:
+        colors = roi_colors(frame, rois)
+
     objects = []
     description_parts = []
 
-    for class_id, conf, x1, y1, x2, y2 in detections:
+    for (class_id, conf, x1, y1, x2, y2), slot in zip(detections, slots):
         name = COCO_NAMES[class_id] if class_id < len(COCO_NAMES) else f"objet_{class_id}"
         obj = {"name": name, "confidence": round(conf, 2)}
 
         if class_id == 0:  # person
-            upper, lower = detect_clothing_colors(frame, (x1, y1, x2, y2))
+            upper, lower = (colors[slot[0]], colors[slot[1]]) if slot else (None, None)
             clothing = []
             if upper:
                 clothing.append(f"haut {upper}")
@@ -327,7 +1004,7 @@ def build_description(frame, detections):
             else:
                 description_parts.append("une personne")
         else:
-            color = detect_color(frame[y1:y2, x1:x2])
+            color = colors[slot]
             if color:
                 obj["color"] = color
                 description_parts.append(f"{name} ({color})")
@@ -349,31 +1026,83 @@ def build_description(frame, detections):
 # Main detection pipeline
 # ══════════════════════════════════════════════════════════════
 
+def run_detection(frame, size=SIZE_FULL, classes=None, region=None):
+    """brightness -> enhance (if it helps) -> YOLOX.
+
+    Returns (detections, enhanced, timing_ms, backend, brightness); raises on error.
+    `size`: input resolution (see SIZE_*), `classes`: class ids to keep,
+    `region`: (x1, y1, x2, y2) crop analysed instead of the whole frame
+    (boxes are returned in full-frame coordinates).
+    """
+    if not ONNX_MODEL.exists():
+        raise FileNotFoundError("Modele YOLOX-S introuvable: " + str(ONNX_MODEL))
+    t0 = time.perf_counter()
+    src = frame
+    if region is not None:
+        rx, ry, rx2, ry2 = region
+        src = frame[ry:ry2, rx:rx2]
+    timing = {}
+    brightness = check_brightness(src)
+    t_bright = time.perf_counter()
+    regime = brightness_regime(brightness)
+    gate_key = _enhance_gate.key(regime, _get_net(size).size, classes) if regime is not None else None
+    enhanced = src
+    if gate_key is not None and _enhance_gate.enabled(gate_key):
+        enhanced = enhance_image(src, brightness)
+    t_enhance = time.perf_counter()
+    detections = run_onnx(src, enhanced, ONNX_MODEL, size, classes, timing)
+    t_detect = time.perf_counter()
+    if gate_key is not None and _enhance_gate.should_probe(gate_key):
+        # Mesure du gain : l'autre variante (brute ou améliorée) est aussi détectée
+        other = src if enhanced is not src else enhance_image(src, brightness)
+        other_dets = run_onnx(src, other, ONNX_MODEL, size, classes)
+        raw, enh = (other_dets, detections) if enhanced is not src else (detections, other_dets)
+        gain = _enhance_gate.record(gate_key, raw, enh)
+        if (gain > 0) == (other is not src):
+            detections, enhanced = other_dets, other
+        timing["probe"] = round((time.perf_counter() - t_detect) * 1000, 1)
+    if region is not None:
+        detections = [(c, sc, x1 + rx, y1 + ry, x2 + rx, y2 + ry) for c, sc, x1, y1, x2, y2 in detections]
+    timing["brightness"] = round((t_bright - t0) * 1000, 1)
+    timing["enhance"] = round((t_enhance - t_bright) * 1000, 1)
+    timing["detect"] = round((t_detect - t_enhance) * 1000, 1)
+    net = _get_net(size)
+    backend = f"YOLOX-S/{net.name}" + (f"@{net.size}" if net.size != INPUT_SIZE else "")
+    return detections, enhanced, timing, backend, brightness
+
+
+def count_objects(detections):
+    """{nom: nombre} — sans analyse de couleur (vigilance)."""
+    counts = Counter(COCO_NAMES[c] if c < len(COCO_NAMES) else f"objet_{c}" for c, *_ in detections)
+    return dict(counts)
+
+
+def merge_crop_detections(crop_dets, full_dets, region):
+    """Détections d'un recadrage + celles de la dernière image entière hors de la zone.
+
+    Le recadrage ne voit qu'une partie de la pièce : hors zone, la dernière
+    détection sur l'image entière fait foi (centre de boîte hors `region`).
+    """
+    x1, y1, x2, y2 = region
+    outside = [d for d in full_dets
+               if not (x1 <= (d[2] + d[4]) / 2 < x2 and y1 <= (d[3] + d[5]) / 2 < y2)]
+    return outside + list(crop_dets)
+
+
 def detect(frame, debug=False):
     """Full pipeline: enhance -> detect -> describe."""
     t0 = time.time()
-    enhanced = enhance_image(frame)
-    t_enhance = time.time()
-
-    # Run YOLOX-S ONNX
     try:
-        if ONNX_MODEL.exists():
-            detections = run_onnx(frame, enhanced, ONNX_MODEL)
-            backend_name = "YOLOX-S"
-        else:
-            return {"error": "Modele YOLOX-S introuvable: " + str(ONNX_MODEL)}
+        detections, enhanced, timing, backend_name, brightness = run_detection(frame)
     except Exception as e:
         return {"error": str(e)}
 
-    t_detect = time.time()
-
-    result = build_description(frame, detections)
+    t_desc = time.time()
+    result = build_description(frame, detections, brightness)
+    timing["describe"] = round((time.time() - t_desc) * 1000, 1)
     result["backend"] = backend_name
-    result["timing_ms"] = {
-        "enhance": round((t_enhance - t0) * 1000),
-        "detect": round((t_detect - t_enhance) * 1000),
-        "total": round((time.time() - t0) * 1000),
-    }
+    timing["total"] = round((time.time() - t0) * 1000)
+    result["timing_ms"] = timing
 
     if debug:
         debug_frame = frame.copy()
@@ -390,25 +1119,348 @@ def detect(frame, debug=False):
     return result
 
 
+class CacheEntry:
+    """Une détection mémorisée (image, détections, description calculée à la demande)."""
+
+    def __init__(self, frame, frame_ts, detections, timing, backend, size=INPUT_SIZE, classes=None,
+                 cropped=False, brightness=None):
+        self.frame, self.frame_ts = frame, frame_ts
+        self.detections, self.timing, self.backend = detections, timing, backend
+        self.size = size           # résolution d'entrée réellement utilisée
+        self.classes = classes     # classes détectées (None = toutes)
+        self.cropped = cropped
+        self.brightness = brightness  # luminosité mesurée par run_detection (réutilisée par la description)
+        self.full = None           # résultat build_description (calculé à la demande)
+
+    def covers(self, size, classes):
+        if self.cropped or self.size < size:
+            return False
+        return self.classes is None or (classes is not None and set(classes) <= set(self.classes))
+
+
+class DetectionCache:
+    """Derniers résultats du daemon, un emplacement par profil (taille, classes).
+
+    Chaque emplacement garde l'image, ses détections et (si déjà calculée) la
+    description complète avec couleurs. Une requête dont le max_age_ms couvre
+    l'âge de l'image réutilise l'entrée la plus récente qui la couvre
+    (résolution au moins égale, classes incluses, image entière) ; les modes
+    « count » et « persons » ne calculent jamais les histogrammes de couleur.
+    Un emplacement par profil : la vigilance (personnes en 320) n'évince pas
+    la dernière détection complète du chat.
+
+    Le verrou interne ne protège que les entrées mémorisées (quelques
+    microsecondes) : une requête servie par le cache n'attend jamais une
+    détection en cours, seule la détection prend _detect_lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries: dict[tuple, CacheEntry] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, max_age_ms, size=INPUT_SIZE, classes=None):
+        """Entrée la plus récente qui couvre ce profil et a moins de max_age_ms, ou None."""
+        if max_age_ms <= 0:
+            return None
+        with self._lock:
+            entries = list(self.entries.values())
+        now = time.time()
+        fresh = [e for e in entries
+                 if (now - e.frame_ts) * 1000 <= max_age_ms and e.covers(size, classes)]
+        return max(fresh, key=lambda e: e.frame_ts, default=None)
+
+    def store(self, entry):
+        key = (entry.size, tuple(entry.classes) if entry.classes is not None else None)
+        with self._lock:
+            self.entries[key] = entry
+
+    def count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+_detect_lock = threading.Lock()   # requêtes stdin et vigilance partagent le modèle
+
+
+# Profil de détection par mode de requête : (résolution d'entrée, classes)
+DETECT_PROFILES = {
+    "full": (SIZE_FULL, None),        # chat : description complète
+    "count": (SIZE_FULL, None),       # comptage de tous les objets
+    "persons": (SIZE_VIGIL, (0,)),    # vigilance : personnes seulement, basse résolution
+}
+
+
+def handle_capture(grabber, cache, max_age_ms=0, mode="full", region=None):
+    """Commande `capture [max_age_ms] [full|count|persons]` du daemon -> dict JSON."""
+    return _capture(grabber, cache, max_age_ms, mode, region)[0]
+
+
+def _detect(grabber, size, classes, region, timing):
+    """Image la plus récente + détection (sous _detect_lock) -> CacheEntry, ou dict d'erreur."""
+    frame, frame_ts, grab = grabber.latest()
+    if frame is None:
+        return {"error": grabber.error or "Camera indisponible"}
+    try:
+        detections, _, det_timing, backend, brightness = run_detection(frame, size, classes, region)
+    except Exception as e:
+        return {"error": str(e)}
+    # Ouverture caméra / attente image / détection mesurées séparément
+    timing["grab"] = grab["wait"]
+    if "open" in grab:
+        timing["open"] = grab["open"]
+    timing.update(det_timing)
+    return CacheEntry(frame, frame_ts, detections, det_timing, backend,
+                      _get_net(size).size, classes, region is not None, brightness)
+
+
+def _warm_net(size):
+    """Charge le détecteur de cette taille et fait une inférence de chauffe."""
+    net = _get_net(size)
+    net.infer(preprocess(np.zeros((480, 640, 3), dtype=np.uint8), out=net.input_buffer(), size=net.size)[0])
+    return net
+
+
+def _warm_later(sizes):
+    """Chauffe en tâche de fond (après « ready ») ; une requête arrivée avant attend le chargement."""
+    for size in sizes:
+        try:
+            _warm_net(size)
+        except Exception as e:
+            print(f"[VISION] Chauffe {size} impossible: {e}", file=sys.stderr, flush=True)
+
+
+def _capture(grabber, cache, max_age_ms, mode, region):
+    """-> (résultat JSON, CacheEntry utilisée ou None en cas d'erreur)."""
+    t0 = time.time()
+    timing = {}
+    size, classes = DETECT_PROFILES.get(mode, DETECT_PROFILES["full"])
+    entry = cache.lookup(max_age_ms, size, classes) if region is None else None
+    if entry is None:
+        with _detect_lock:
+            # Une détection terminée pendant l'attente du verrou peut suffire
+            entry = cache.lookup(max_age_ms, size, classes) if region is None else None
+            if entry is None:
+                entry = _detect(grabber, size, classes, region, timing)
+                if isinstance(entry, dict):
+                    return entry, None
+                if region is None:
+                    cache.store(entry)
+                cached = False
+            else:
+                cached = True
+    else:
+        cached = True
+    cache.count(cached)
+
+    if mode in ("count", "persons"):
+        counts = count_objects(entry.detections)
+        result = {"counts": counts, "persons": counts.get(COCO_NAMES[0], 0)}
+    else:
+        full = entry.full
+        if full is None:
+            t_desc = time.time()
+            full = entry.full = build_description(entry.frame, entry.detections, entry.brightness)
+            timing["describe"] = round((time.time() - t_desc) * 1000, 1)
+        result = dict(full)
+        result["persons"] = sum(1 for c, *_ in entry.detections if c == 0)
+    result["backend"] = entry.backend
+    result["cached"] = cached
+    result["frame_age_ms"] = round((time.time() - entry.frame_ts) * 1000)
+    timing["total"] = round((time.time() - t0) * 1000)
+    result["timing_ms"] = timing
+    return result, entry
+
+
+# ── Protocole daemon : trames longueur (4 octets big-endian) + JSON ─────────
+_HEADER = struct.Struct(">I")
+_emit_lock = threading.Lock()
+_frame_out = sys.stdout.buffer   # remplacé par un fd privé en mode daemon
+
+
+def emit(obj):
+    """Écrit une trame (réponses et événements poussés ne s'entremêlent pas)."""
+    data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    with _emit_lock:
+        _frame_out.write(_HEADER.pack(len(data)) + data)
+        _frame_out.flush()
+
+
+def read_request(stream):
+    """Trame suivante du serveur (dict), None en fin de flux."""
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    (size,) = _HEADER.unpack(header)
+    data = stream.read(size)
+    if len(data) < size:
+        return None
+    return json.loads(data)
+
+
+def export_frame(frame, fmt="jpeg"):
+    """Debug : dernière image dans /dev/shm (JPEG ou BGR brut), sans passer par le tube."""
+    if fmt == "raw":
+        path = SHM_DIR / "kitt_vision_frame.bgr"
+        data = np.ascontiguousarray(frame).tobytes()
+    else:
+        path = SHM_DIR / "kitt_vision_frame.jpg"
+        data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes()
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return {"path": str(path), "format": fmt, "size": len(data), "shape": list(frame.shape)}
+
+
+class VigilanceWorker:
+    """Vigilance dans le daemon : mouvement -> YOLOX (comptage) -> événements poussés.
+
+    Le détecteur de mouvement tourne dans le thread de capture ; ce thread-ci
+    attend un mouvement (ou le contrôle périodique) et lance alors une
+    détection en mode « persons » (SIZE_VIGIL, classe personne seulement ;
+    limitée à la zone en mouvement si VIGIL_CROP, le reste de la pièce étant
+    repris de la dernière image entière). Événements poussés :
+        {"event": "motion", "score": ...}
+        {"event": "persons", "count": n, "prev": m}
+    """
+
+    def __init__(self, grabber, cache):
+        self.grabber = grabber
+        self.cache = cache
+        self.motion = MotionDetector()
+        self._triggered = threading.Event()
+        self._enabled = False
+        self._thread = None
+        self._last_motion_event = 0.0
+        self.persons = -1
+        self._boxes = None       # personnes de la pièce entière (dernière image entière + recadrages)
+        self.detections = 0
+        self.motion_events = 0
+
+    def _on_frame(self, frame, ts):
+        if self.motion.update(frame, ts):
+            self._triggered.set()
+            if ts - self._last_motion_event >= MOTION_EVENT_INTERVAL:
+                self._last_motion_event = ts
+                self.motion_events += 1
+                emit({"event": "motion", "score": round(self.motion.score, 4)})
+
+    def set_enabled(self, enabled):
+        self._enabled = enabled
+        self.persons = -1
+        self._boxes = None
+        self.grabber.on_frame = self._on_frame if enabled else None
+        self.grabber.watch(enabled)
+        if enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="vigilance", daemon=True)
+            self._thread.start()
+        self.motion.region = None
+        self._triggered.set()  # premier comptage immédiat (image entière)
+
+    def _run(self):
+        while True:
+            moved = self._triggered.wait(VIGIL_SANITY_INTERVAL)
+            self._triggered.clear()
+            if not self._enabled:
+                continue
+            # Recadrage seulement si une image entière sert de référence hors zone
+            region = self.motion.crop() if moved and VIGIL_CROP and self._boxes is not None else None
+            result, entry = _capture(self.grabber, self.cache, 0, "persons", region)
+            self.detections += 1
+            if entry is None:
+                time.sleep(VIGIL_MIN_INTERVAL)
+                continue
+            dets = entry.detections
+            if region is not None:
+                dets = merge_crop_detections(dets, self._boxes, region)
+                result["counts"] = count_objects(dets)
+                result["persons"] = result["counts"].get(COCO_NAMES[0], 0)
+            self._boxes = [d for d in dets if d[0] == 0]
+            if result["persons"] != self.persons:
+                emit({"event": "persons", "count": result["persons"], "prev": self.persons,
+                      "counts": result["counts"]})
+                self.persons = result["persons"]
+            time.sleep(VIGIL_MIN_INTERVAL)
+
+    def stats(self):
+        return {"enabled": self._enabled, "persons": self.persons, "detections": self.detections,
+                "motion_events": self.motion_events, "motion_score": round(self.motion.score, 4)}
+
+
 def daemon_mode():
-    """Mode persistant: modèle chargé une fois, requêtes via stdin/stdout."""
-    _get_net()  # Charge le modèle au démarrage
-    print("READY", flush=True)
+    """Mode persistant: modèle chargé une fois, caméra gardée ouverte, protocole tramé.
 
-    for line in sys.stdin:
-        cmd = line.strip()
+    Requêtes {"id", "cmd", ...} traitées en parallèle (pool de threads) :
+        capture {max_age_ms, mode: full|count|persons}   watch {enabled}   frame {format: jpeg|raw}
+        stats   ping   quit
+    Réponses {"id", "result"} / {"id", "error"} ; événements {"event": ...}.
+    """
+    global _frame_out
+    from concurrent.futures import ThreadPoolExecutor
+
+    # stdout réservé aux trames : fd privé, et tout print parasite part sur stderr
+    _frame_out = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    # Modèle principal chargé + inférence de chauffe AVANT de se déclarer prêt ;
+    # les autres tailles (vigilance) sont chauffées après « ready », en tâche de
+    # fond : deux constructions de moteur TensorRT ne tiennent pas dans READY_TIMEOUT.
+    net = _warm_net(SIZE_FULL)
+    others = sorted({size for size, _ in DETECT_PROFILES.values()} - {SIZE_FULL}, reverse=True)
+    grabber = FrameGrabber()
+    cache = DetectionCache()
+    vigilance = VigilanceWorker(grabber, cache)
+
+    def run(req):
+        cmd = req.get("cmd")
         if cmd == "capture":
-            try:
-                frame = capture_frame()
-                if frame is None:
-                    print(json.dumps({"error": "Camera indisponible"}), flush=True)
-                    continue
-                result = detect(frame)
-                print(json.dumps(result, ensure_ascii=False), flush=True)
-            except Exception as e:
-                print(json.dumps({"error": str(e)}), flush=True)
-        elif cmd == "quit":
+            result = handle_capture(grabber, cache, int(req.get("max_age_ms", 0)), req.get("mode", "full"))
+        elif cmd == "watch":
+            vigilance.set_enabled(bool(req.get("enabled")))
+            result = {"watch": vigilance.stats()}
+        elif cmd == "frame":
+            frame, _, _ = grabber.latest()
+            result = export_frame(frame, req.get("format", "jpeg")) if frame is not None \
+                else {"error": grabber.error or "Camera indisponible"}
+        elif cmd == "stats":
+            result = {"camera": grabber.stats(), "cache": {"hits": cache.hits, "misses": cache.misses},
+                      "vigilance": vigilance.stats(), "enhance": _enhance_gate.stats(),
+                      "profiles": {mode: {"size": _get_net(size).size, "classes": classes}
+                                   for mode, (size, classes) in DETECT_PROFILES.items()}}
+        else:
+            result = {"error": f"commande inconnue: {cmd}"}
+        return result
+
+    def serve(req):
+        try:
+            result = run(req)
+            if "error" in result:
+                emit({"id": req["id"], "error": result["error"]})
+            else:
+                emit({"id": req["id"], "result": result})
+        except Exception as e:
+            emit({"id": req.get("id"), "error": str(e)})
+
+    emit({"event": "ready", "backend": net.name, "pid": os.getpid()})
+    if others:
+        threading.Thread(target=_warm_later, args=(others,), name="vision-warmup", daemon=True).start()
+    pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="vision-req")
+    stream = sys.stdin.buffer
+    while True:
+        req = read_request(stream)
+        if req is None or req.get("cmd") == "quit":
             break
+        if req.get("cmd") == "ping":
+            emit({"id": req["id"], "result": {"pong": time.time()}})
+            continue
+        pool.submit(serve, req)
+    pool.shutdown(wait=False)
+    grabber.stop()
 
 
 def main():
@@ -429,6 +1481,22 @@ def main():
         if frame is None:
             print("ERREUR: Camera indisponible")
             sys.exit(1)
+        # Tous les backends sur les mêmes images ; le plus rapide est retenu pour le daemon
+        frames = [frame] + [capture_frame() for _ in range(2)]
+        frames = [f for f in frames if f is not None]
+        table = benchmark_backends(frames)
+        print(f"{'backend':<14}{'chargement':>12}{'min':>9}{'p50':>9}{'p90':>9}")
+        for name, r in table.items():
+            if "error" in r:
+                print(f"{name:<14}  indisponible: {r['error']}")
+            else:
+                print(f"{name:<14}{r['load_ms']:>10}ms{r['min']:>7}ms{r['p50']:>7}ms{r['p90']:>7}ms")
+        ok = {n: r for n, r in table.items() if "error" not in r}
+        if ok:
+            best = min(ok, key=lambda n: ok[n]["p50"])
+            BACKEND_FILE.write_text(json.dumps({"backend": best, "results": table,
+                                                "date": time.strftime("%Y-%m-%d %H:%M")}, indent=2))
+            print(f"Backend retenu: {best} -> {BACKEND_FILE.name}")
         # Warmup
         detect(frame)
         # Benchmark 5 runs
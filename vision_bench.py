@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+KITT — Banc d'essai vision hors ligne + suite de non-régression.
+
+`vision.py --benchmark` exige une caméra et chronomètre 5 passes d'une seule
+image : inutilisable en CI ou sur un poste de dev, et aveugle à la
+précision. Ici, sur un répertoire d'images JPEG enregistrées :
+
+  • latences par étape (brightness, enhance, preprocess, inference, postprocess,
+    colour, description) : p50 / p90 / p99 / moyenne / max
+  • précision et rappel par classe contre les détections attendues
+    (appariement même classe, IoU >= 0.5), couleurs vérifiées si annotées
+  • mémoire : RSS max du processus, pic Python/NumPy (tracemalloc, passe à part)
+  • --sizes 320,416,640 : balayage latence / rappel par résolution d'entrée
+  • rapport JSON (stdout ou --out) ; --baseline compare à un rapport
+    précédent et sort en erreur si le rappel ou la latence régressent
+
+Fixtures : pour chaque image `nom.jpg`, un fichier `nom.json` :
+
+    {"objects": [{"name": "personne", "box": [x1, y1, x2, y2],
+                  "upper_color": "bleu", "lower_color": "noir"},
+                 {"name": "tasse", "box": [...], "color": "rouge"}]}
+
+Une image sans .json n'est que chronométrée. `--record` capture des images
+depuis la caméra avec les détections actuelles comme attendus (à relire).
+
+Usage:
+    /usr/bin/python3 vision_bench.py fixtures/vision
+    /usr/bin/python3 vision_bench.py fixtures/vision --backend ort-cpu --conf 0.3 --out new.json
+    /usr/bin/python3 vision_bench.py fixtures/vision --baseline old.json
+    /usr/bin/python3 vision_bench.py fixtures/vision --sizes 320,416,640 --classes 0   # profil vigilance
+    /usr/bin/python3 vision_bench.py fixtures/vision --record 20
+"""
+
+import argparse
+import json
+import resource
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+import cv2
+import vision
+
+STAGES = ("brightness", "enhance", "preprocess", "inference", "postprocess", "colour", "description", "total")
+IOU_MATCH = 0.5
+MAX_RECALL_DROP = 0.02      # baseline : baisse de rappel tolérée (par classe et globale)
+MAX_SLOWDOWN = 1.20         # baseline : p50 total toléré (x baseline)
+
+
+# ── Fixtures ──────────────────────────────────────────────────────────
+
+def load_fixtures(directory: Path) -> list[dict]:
+    """[{name, frame, expected (liste ou None)}] triés par nom."""
+    fixtures = []
+    for path in sorted(directory.glob("*.jp*g")):
+        frame = cv2.imread(str(path))
+        if frame is None:
+            print(f"[BENCH] Image illisible: {path.name}", file=sys.stderr)
+            continue
+        meta = path.with_suffix(".json")
+        expected = json.loads(meta.read_text())["objects"] if meta.exists() else None
+        fixtures.append({"name": path.name, "frame": frame, "expected": expected})
+    return fixtures
+
+
+def record(directory: Path, count: int, interval: float = 1.0):
+    """Enregistre `count` images caméra + détections actuelles comme attendus (à relire)."""
+    directory.mkdir(parents=True, exist_ok=True)
+    cap = vision.open_camera()
+    if cap is None:
+        print("ERREUR: Camera indisponible", file=sys.stderr)
+        sys.exit(1)
+    try:
+        for _ in range(5):   # exposition automatique
+            cap.read()
+        for i in range(count):
+            ok, frame = cap.read()
+            if not ok:
+                continue
+            name = f"rec-{time.strftime('%Y%m%d-%H%M%S')}-{i:03d}"
+            dets, _, _, _, brightness = vision.run_detection(frame)
+            desc = vision.build_description(frame, dets, brightness)
+            objects = []
+            for (cls, _, x1, y1, x2, y2), obj in zip(dets, desc["objects"]):
+                objects.append({k: v for k, v in obj.items() if k != "confidence"} | {"box": [x1, y1, x2, y2]})
+            cv2.imwrite(str(directory / f"{name}.jpg"), frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+            (directory / f"{name}.json").write_text(json.dumps({"objects": objects}, ensure_ascii=False, indent=1))
+            print(f"{name}: {len(objects)} objet(s)")
+            time.sleep(interval)
+    finally:
+        cap.release()
+
+
+# ── Précision / rappel ────────────────────────────────────────────────
+
+def match_detections(found: list[dict], expected: list[dict], iou_min: float = IOU_MATCH):
+    """Appariement vision.match_boxes sur les dicts -> (paires, faux positifs, manqués)."""
+    pairs, lone, left = vision.match_boxes(
+        [(d["name"], d.get("confidence", 0), d["box"]) for d in found],
+        [(e["name"], 0, e["box"]) for e in expected], iou_min)
+    return ([(found[i], expected[j]) for i, j in pairs],
+            [found[i] for i in lone], [expected[j] for j in left])
+
+
+class Accuracy:
+    """Compteurs TP / FP / FN par classe + couleurs annotées."""
+
+    COLOR_KEYS = ("color", "upper_color", "lower_color")
+
+    def __init__(self):
+        self.counts = defaultdict(lambda: {"tp": 0, "fp": 0, "fn": 0})
+        self.color_checked = 0
+        self.color_correct = 0
+        self.failures = []
+
+    def add(self, name: str, found: list[dict], expected: list[dict]):
+        pairs, false_pos, missed = match_detections(found, expected)
+        for det, _ in pairs:
+            self.counts[det["name"]]["tp"] += 1
+        for det in false_pos:
+            self.counts[det["name"]]["fp"] += 1
+        for exp in missed:
+            self.counts[exp["name"]]["fn"] += 1
+        for det, exp in pairs:
+            for key in self.COLOR_KEYS:
+                if key in exp:
+                    self.color_checked += 1
+                    self.color_correct += det.get(key) == exp[key]
+        if false_pos or missed:
+            self.failures.append({"frame": name,
+                                  "missed": [e["name"] for e in missed],
+                                  "false_positives": [d["name"] for d in false_pos]})
+
+    @staticmethod
+    def _scores(c: dict) -> dict:
+        found, real = c["tp"] + c["fp"], c["tp"] + c["fn"]
+        return {**c, "precision": round(c["tp"] / found, 4) if found else None,
+                "recall": round(c["tp"] / real, 4) if real else None}
+
+    def report(self) -> dict:
+        total = {"tp": 0, "fp": 0, "fn": 0}
+        for c in self.counts.values():
+            for k in total:
+                total[k] += c[k]
+        return {"classes": {name: self._scores(c) for name, c in sorted(self.counts.items())},
+                "overall": self._scores(total),
+                "colour": {"checked": self.color_checked, "correct": self.color_correct,
+                           "accuracy": round(self.color_correct / self.color_checked, 4)
+                           if self.color_checked else None},
+                "failures": self.failures}
+
+
+# ── Pipeline chronométré ──────────────────────────────────────────────
+
+def run_pipeline(net, frame, timing: dict | None = None, classes=None) -> list[dict]:
+    """Pipeline de detect() découpé par étape ; objets avec boîte et couleurs."""
+    def lap(stage, t0):
+        now = time.perf_counter()
+        if timing is not None:
+            timing[stage].append((now - t0) * 1000)
+        return now
+
+    t_start = t = time.perf_counter()
+    brightness = vision.check_brightness(frame)
+    t = lap("brightness", t)
+    enhanced = vision.enhance_image(frame, brightness)      # sans EnhanceGate : coût toujours mesuré
+    t = lap("enhance", t)
+    blob, scale, pad_w, pad_h = vision.preprocess(enhanced, out=net.input_buffer(), size=net.size)
+    t = lap("preprocess", t)
+    output = net.infer(blob)
+    t = lap("inference", t)
+    dets = vision.postprocess(output, frame.shape, scale, pad_w, pad_h, classes=classes, input_size=net.size)
+    t = lap("postprocess", t)
+    colors = vision.roi_colors(frame, vision.description_rois(dets)[0]) if dets else None
+    t = lap("colour", t)
+    desc = vision.build_description(frame, dets, brightness, colors)
+    lap("description", t)
+    lap("total", t_start)
+    return [obj | {"box": [x1, y1, x2, y2]} for obj, (_, _, x1, y1, x2, y2) in zip(desc["objects"], dets)]
+
+
+def percentiles(values: list[float]) -> dict:
+    a = np.asarray(values)
+    return {"p50": round(float(np.percentile(a, 50)), 2), "p90": round(float(np.percentile(a, 90)), 2),
+            "p99": round(float(np.percentile(a, 99)), 2), "mean": round(float(a.mean()), 2),
+            "max": round(float(a.max()), 2), "n": len(a)}
+
+
+def _rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)   # Linux : Ko
+
+
+def bench(fixtures: list[dict], backend: str | None = None, runs: int = 3, warmup: int = 2,
+          size: int = vision.INPUT_SIZE, classes=None) -> dict:
+    rss_start = _rss_mb()
+    if size == vision.INPUT_SIZE and not backend:
+        net = vision._get_net()
+    else:
+        net = vision.load_sized_backend(backend or vision._get_net().name, size)
+    rss_loaded = _rss_mb()
+    # Filtre de classes : seuls les attendus de ces classes comptent pour le rappel
+    wanted = None if classes is None else {vision.COCO_NAMES[c] for c in classes}
+    for fx in fixtures[:warmup]:
+        run_pipeline(net, fx["frame"], classes=classes)
+
+    # Passes chronométrées (tracemalloc désactivé : il fausserait les temps)
+    timing = defaultdict(list)
+    accuracy = Accuracy()
+    for r in range(runs):
+        for fx in fixtures:
+            objects = run_pipeline(net, fx["frame"], timing, classes)
+            if r == 0 and fx["expected"] is not None:
+                expected = [e for e in fx["expected"] if wanted is None or e["name"] in wanted]
+                accuracy.add(fx["name"], objects, expected)
+
+    # Passe mémoire séparée : pic des allocations Python/NumPy par image
+    tracemalloc.start()
+    peak = 0
+    for fx in fixtures:
+        tracemalloc.reset_peak()
+        run_pipeline(net, fx["frame"], classes=classes)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    return {
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "backend": net.name,
+        "model": vision.ONNX_MODEL.name,
+        "input_size": net.size,
+        "classes": list(classes) if classes is not None else None,
+        "conf_threshold": vision.CONF_THRESHOLD,
+        "nms_threshold": vision.NMS_THRESHOLD,
+        "frames": len(fixtures),
+        "annotated": sum(fx["expected"] is not None for fx in fixtures),
+        "runs": runs,
+        "stages_ms": {s: percentiles(timing[s]) for s in STAGES if timing[s]},
+        "accuracy": accuracy.report(),
+        "memory_mb": {"rss_start": rss_start, "rss_after_load": rss_loaded, "rss_max": _rss_mb(),
+                      "python_peak_per_frame": round(peak / 1024 / 1024, 2)},
+    }
+
+
+# ── Comparaison à un rapport de référence ─────────────────────────────
+
+def compare(report: dict, baseline: dict, max_recall_drop: float = MAX_RECALL_DROP,
+            max_slowdown: float = MAX_SLOWDOWN) -> list[str]:
+    """Régressions de `report` par rapport à `baseline` (liste vide = OK)."""
+    problems = []
+    new_cls = report["accuracy"]["classes"]
+    old_cls = baseline["accuracy"]["classes"]
+    checks = [("global", report["accuracy"]["overall"], baseline["accuracy"]["overall"])]
+    checks += [(name, new_cls.get(name, {}), old) for name, old in old_cls.items()]
+    for name, new, old in checks:
+        if old.get("recall") is None:
+            continue
+        recall = new.get("recall") or 0.0
+        if recall < old["recall"] - max_recall_drop:
+            problems.append(f"rappel {name}: {old['recall']:.3f} -> {recall:.3f}")
+    old_t = baseline["stages_ms"].get("total", {}).get("p50")
+    new_t = report["stages_ms"].get("total", {}).get("p50")
+    if old_t and new_t and new_t > old_t * max_slowdown:
+        problems.append(f"latence p50 totale: {old_t:.1f}ms -> {new_t:.1f}ms")
+    return problems
+
+
+def sweep(fixtures: list[dict], sizes, backend=None, runs=3, classes=None) -> dict:
+    """Latence / rappel pour chaque résolution d'entrée (variantes absentes : erreur notée)."""
+    reports = []
+    for size in sizes:
+        try:
+            reports.append(bench(fixtures, backend, runs, size=size, classes=classes))
+        except Exception as e:
+            reports.append({"input_size": size, "error": str(e)})
+    return {"sweep": reports}
+
+
+def print_sweep(result: dict):
+    person = vision.COCO_NAMES[0]
+    print(f"{'entrée':<8}{'total p50':>11}{'inférence':>11}{'précision':>11}{'rappel':>9}{'rappel ' + person:>18}",
+          file=sys.stderr)
+    for r in result["sweep"]:
+        if "error" in r:
+            print(f"{r['input_size']:<8}  indisponible: {r['error']}", file=sys.stderr)
+            continue
+        o = r["accuracy"]["overall"]
+        p = r["accuracy"]["classes"].get(person, {})
+        print(f"{r['input_size']:<8}{r['stages_ms']['total']['p50']:>9.1f}ms"
+              f"{r['stages_ms']['inference']['p50']:>9.1f}ms{o['precision'] or 0:>11.3f}"
+              f"{o['recall'] or 0:>9.3f}{p.get('recall') or 0:>18.3f}", file=sys.stderr)
+
+
+def print_summary(report: dict):
+    print(f"{report['frames']} images ({report['annotated']} annotées) x {report['runs']} — "
+          f"{report['backend']}, conf {report['conf_threshold']}", file=sys.stderr)
+    print(f"{'étape':<14}{'p50':>9}{'p90':>9}{'p99':>9}", file=sys.stderr)
+    for stage, p in report["stages_ms"].items():
+        print(f"{stage:<14}{p['p50']:>7.1f}ms{p['p90']:>7.1f}ms{p['p99']:>7.1f}ms", file=sys.stderr)
+    o = report["accuracy"]["overall"]
+    if o["precision"] is not None or o["recall"] is not None:
+        print(f"précision {o['precision']}  rappel {o['recall']}  "
+              f"(TP {o['tp']}, FP {o['fp']}, FN {o['fn']})", file=sys.stderr)
+    print(f"mémoire : {report['memory_mb']}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai vision hors ligne (images enregistrées)")
+    parser.add_argument("fixtures", nargs="?", default=str(Path(__file__).parent / "fixtures" / "vision"))
+    parser.add_argument("--backend", choices=vision.available_backends(), default=None)
+    parser.add_argument("--model", default="", help="modèle ONNX (défaut models/yolox_s.onnx)")
+    parser.add_argument("--conf", type=float, default=None, help="seuil de confiance (défaut vision.py)")
+    parser.add_argument("--nms", type=float, default=None, help="seuil NMS (défaut vision.py)")
+    parser.add_argument("--sizes", default=str(vision.INPUT_SIZE),
+                        help="résolution(s) d'entrée, ex. 320,416,640 : plusieurs = balayage latence / rappel")
+    parser.add_argument("--classes", default="", help="ids de classes gardés, ex. 0 (personnes, comme la vigilance)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--out", default="", help="fichier du rapport JSON (défaut stdout)")
+    parser.add_argument("--baseline", default="", help="rapport précédent : code 1 si régression")
+    parser.add_argument("--max-recall-drop", type=float, default=MAX_RECALL_DROP)
+    parser.add_argument("--max-slowdown", type=float, default=MAX_SLOWDOWN)
+    parser.add_argument("--record", type=int, default=0, metavar="N", help="enregistrer N images caméra")
+    args = parser.parse_args()
+
+    directory = Path(args.fixtures)
+    if args.record:
+        record(directory, args.record)
+        return
+    if args.model:
+        vision.ONNX_MODEL = Path(args.model)
+    if args.conf is not None:
+        vision.CONF_THRESHOLD = args.conf
+    if args.nms is not None:
+        vision.NMS_THRESHOLD = args.nms
+    fixtures = load_fixtures(directory)
+    if not fixtures:
+        print(f"ERREUR: aucune image dans {directory}", file=sys.stderr)
+        sys.exit(2)
+
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    classes = tuple(int(x) for x in args.classes.split(",") if x.strip()) or None
+    if len(sizes) > 1:
+        report = sweep(fixtures, sizes, args.backend, args.runs, classes)
+        print_sweep(report)
+    else:
+        report = bench(fixtures, args.backend, args.runs, size=sizes[0], classes=classes)
+        print_summary(report)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).write_text(text)
+    else:
+        print(text)
+
+    if args.baseline and "sweep" not in report:
+        problems = compare(report, json.loads(Path(args.baseline).read_text()),
+                           args.max_recall_drop, args.max_slowdown)
+        for p in problems:
+            print(f"❌ {p}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+        print("✅ aucune régression", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+KITT — Client du daemon vision (vision.py --daemon) : protocole tramé,
+requêtes concurrentes, événements poussés, heartbeat, redémarrage supervisé.
+
+Trame = longueur (4 octets big-endian) + JSON UTF-8, dans les deux sens :
+
+    serveur → daemon   {"id": 7, "cmd": "capture", "max_age_ms": 3000, "mode": "full"}
+    daemon → serveur   {"id": 7, "result": {...}}  |  {"id": 7, "error": "..."}
+                       {"event": "ready" | "motion" | "persons" | ...}
+
+Chaque requête a son id : plusieurs commandes peuvent être en vol (un
+« capture » servi depuis le cache n'attend plus une détection en cours).
+Un print parasite côté daemon part sur stderr (stdout est réservé aux trames).
+Le daemon n'est « prêt » qu'après chargement + inférence de chauffe du modèle
+principal ; les autres tailles d'entrée (vigilance) sont chauffées ensuite.
+Heartbeat : ping périodique ; sans réponse, le daemon est relancé avec un
+délai croissant (1 s → 60 s), remis à zéro après une minute de stabilité.
+Un daemon qui meurt avant « ready » est constaté aussitôt (pas d'attente de
+READY_TIMEOUT) ; pendant le délai de relance, les appels échouent immédiatement.
+"""
+
+import asyncio
+import json
+import struct
+import time
+
+HEADER = struct.Struct(">I")
+MAX_FRAME = 16 * 1024 * 1024
+READY_TIMEOUT = 120.0       # chargement modèle principal (+ construction moteur TensorRT au 1er démarrage)
+HEARTBEAT_INTERVAL = 10.0
+HEARTBEAT_TIMEOUT = 5.0
+BACKOFF_MIN = 1.0
+BACKOFF_MAX = 60.0
+STABLE_AFTER = 60.0         # s de fonctionnement avant remise à zéro du délai
+
+
+def encode_frame(obj) -> bytes:
+    data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    return HEADER.pack(len(data)) + data
+
+
+async def read_frame(reader: asyncio.StreamReader):
+    """Trame suivante (dict), ou None en fin de flux."""
+    try:
+        header = await reader.readexactly(HEADER.size)
+        (size,) = HEADER.unpack(header)
+        if size > MAX_FRAME:
+            raise ValueError(f"trame trop grande ({size} octets)")
+        return json.loads(await reader.readexactly(size))
+    except asyncio.IncompleteReadError:
+        return None
+
+
+async def wait_first(*aws, timeout: float):
+    """Attend la première des coroutines à se terminer (ou le délai) ; annule les autres."""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class VisionDaemon:
+    """Processus vision supervisé ; `call()` est sûr en concurrence."""
+
+    def __init__(self, argv, on_event=None, on_start=None):
+        self.argv = argv
+        self.on_event = on_event      # async on_event(event: dict)
+        self.on_start = on_start      # async on_start() — après chaque démarrage (ex. reprise vigilance)
+        self._proc = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._ready = asyncio.Event()
+        self._down = asyncio.Event()  # tentative échouée : en attente de relance
+        self._start_lock = asyncio.Lock()
+        self._tasks: list[asyncio.Task] = []
+        self._supervisor: asyncio.Task | None = None
+        self._wanted = False
+        self._closing = False
+        self.backoff = BACKOFF_MIN
+        self.started_at = 0.0
+        self.restarts = 0
+        self.info: dict = {}
+
+    @property
+    def running(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None and self._ready.is_set()
+
+    # ── Cycle de vie ──────────────────────────────────────────────────────
+
+    async def ensure_started(self) -> bool:
+        """Démarre le daemon si besoin (supervision activée au premier appel)."""
+        if self.running:
+            return True
+        self._wanted = True
+        async with self._start_lock:
+            if self.running:
+                return True
+            if self._supervisor is None or self._supervisor.done():
+                self._down.clear()
+                self._supervisor = asyncio.create_task(self._supervise())
+            elif self._down.is_set():
+                return False          # superviseur en délai de relance
+        await wait_first(self._ready.wait(), self._down.wait(), timeout=READY_TIMEOUT)
+        return self._ready.is_set()
+
+    async def _spawn(self):
+        self._ready.clear()
+        self._down.clear()
+        self._proc = await asyncio.create_subprocess_exec(
+            *self.argv,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        self._tasks = [asyncio.create_task(self._read_loop(self._proc)),
+                       asyncio.create_task(self._stderr_loop(self._proc))]
+
+    async def _supervise(self):
+        """Boucle : lance, attend READY, heartbeat ; relance avec backoff en cas d'échec."""
+        while self._wanted and not self._closing:
+            t0 = time.monotonic()
+            try:
+                await self._spawn()
+                proc = self._proc
+                await wait_first(self._ready.wait(), proc.wait(), timeout=READY_TIMEOUT)
+                if not self._ready.is_set():
+                    if proc.returncode is not None:
+                        raise RuntimeError(f"processus terminé avant ready (code {proc.returncode})")
+                    raise RuntimeError(f"pas prêt après {READY_TIMEOUT:.0f}s")
+                self.started_at = time.time()
+                print(f"[VISION] Daemon prêt ({self.info.get('backend', '?')}, "
+                      f"{(time.monotonic() - t0):.1f}s)", flush=True)
+                if self.on_start:
+                    asyncio.create_task(self.on_start())
+                await self._heartbeat()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[VISION] Daemon défaillant: {e}", flush=True)
+            self._kill()
+            self._down.set()
+            if self._closing:
+                break
+            # Remise à zéro du délai si le daemon a tenu assez longtemps
+            if time.monotonic() - t0 > STABLE_AFTER:
+                self.backoff = BACKOFF_MIN
+            self.restarts += 1
+            print(f"[VISION] Redémarrage dans {self.backoff:.0f}s", flush=True)
+            await asyncio.sleep(self.backoff)
+            self.backoff = min(self.backoff * 2, BACKOFF_MAX)
+
+    async def _heartbeat(self):
+        """Retourne (ou lève) quand le daemon meurt ou ne répond plus."""
+        proc = self._proc
+        while proc.returncode is None:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            if proc.returncode is not None:
+                break
+            await self._request("ping", {}, HEARTBEAT_TIMEOUT)
+        raise RuntimeError(f"processus terminé (code {proc.returncode})")
+
+    def _kill(self):
+        self._ready.clear()
+        if self._proc is not None and self._proc.returncode is None:
+            self._proc.kill()
+        for task in self._tasks:
+            task.cancel()
+        self._fail_pending(RuntimeError("Daemon vision arrêté"))
+
+    def _fail_pending(self, exc):
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(exc)
+        self._pending.clear()
+
+    async def close(self):
+        """Arrêt propre (commande quit, puis kill après 3 s)."""
+        self._closing = True
+        self._wanted = False
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+        proc = self._proc
+        if proc is not None and proc.returncode is None:
+            try:
+                proc.stdin.write(encode_frame({"id": 0, "cmd": "quit"}))
+                await asyncio.wait_for(proc.wait(), timeout=3)
+            except Exception:
+                proc.kill()
+        self._kill()
+        self._down.set()
+
+    # ── Lecture ───────────────────────────────────────────────────────────
+
+    async def _read_loop(self, proc):
+        while True:
+            try:
+                msg = await read_frame(proc.stdout)
+            except Exception as e:
+                print(f"[VISION] Trame invalide: {e}", flush=True)
+                break
+            if msg is None:
+                break
+            if "id" in msg:
+                fut = self._pending.pop(msg["id"], None)
+                if fut is not None and not fut.done():
+                    if "error" in msg:
+                        fut.set_exception(RuntimeError(msg["error"]))
+                    else:
+                        fut.set_result(msg.get("result", {}))
+            elif msg.get("event") == "ready":
+                self.info = msg
+                self._ready.set()
+            elif self.on_event is not None:
+                asyncio.create_task(self.on_event(msg))
+        self._fail_pending(RuntimeError("Daemon vision: flux fermé"))
+
+    async def _stderr_loop(self, proc):
+        """Logs du daemon (et prints parasites) — vidé en continu pour ne pas bloquer le tube."""
+        while True:
+            line = await proc.stderr.readline()
+            if not line:
+                break
+            print(line.decode(errors="replace").rstrip(), flush=True)
+
+    # ── Requêtes ──────────────────────────────────────────────────────────
+
+    async def _request(self, cmd: str, args: dict, timeout: float):
+        self._next_id += 1
+        rid = self._next_id
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[rid] = fut
+        try:
+            self._proc.stdin.write(encode_frame({"id": rid, "cmd": cmd, **args}))
+            await self._proc.stdin.drain()
+            return await asyncio.wait_for(fut, timeout=timeout)
+        finally:
+            self._pending.pop(rid, None)
+
+    async def call(self, cmd: str, timeout: float = 15.0, **args) -> dict | None:
+        """Commande au daemon ; None en cas d'erreur (le superviseur gère les relances)."""
+        try:
+            if not await self.ensure_started():
+                print("[VISION] Daemon indisponible", flush=True)
+                return None
+            return await self._request(cmd, args, timeout)
+        except Exception as e:
+            print(f"[VISION] {cmd}: {e}", flush=True)
+            return None
+
+    def stats(self) -> dict:
+        return {"running": self.running, "backend": self.info.get("backend"),
+                "pid": self._proc.pid if self._proc else None,
+                "uptime_s": round(time.time() - self.started_at) if self.running else 0,
+                "in_flight": len(self._pending), "restarts": self.restarts,
+                "backoff_s": self.backoff}
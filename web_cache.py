@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+KITT — Cache + disjoncteur pour la recherche web (DuckDuckGo).
+
+  • clé = requête normalisée (minuscules, sans accents ni ponctuation) ;
+    le backend est toujours interrogé pour SEARCH_MAX_RESULTS résultats, chaque
+    appel n'en formate que max_results : une même entrée sert toutes les tailles
+  • TTL par catégorie : météo/scores courts, définitions longues
+  • cache négatif : un résultat vide est mémorisé quelques minutes
+  • requêtes identiques simultanées fusionnées (un seul appel réseau)
+  • disjoncteur : après N échecs consécutifs, plus d'appel réseau pendant
+    un temps de refroidissement (réseau coupé → réponse immédiate, pas 6 s)
+  • statistiques : hits, misses, latence p50/p95 du backend, état du disjoncteur
+
+Le backend est une simple fonction synchrone (query, max_results) -> list[dict]
+exécutée dans l'executor : DuckDuckGo en production, un faux backend en test
+(voir test_web_cache.py).
+
+Usage :
+    venv/bin/python3 web_cache.py "météo Arlon"   # deux appels : réseau puis cache
+"""
+
+import asyncio
+import re
+import sys
+import time
+from collections import OrderedDict
+
+from knowledge_index import fold_accents
+
+SEARCH_TIMEOUT = 6.0         # s — délai max d'un appel backend
+SEARCH_MAX_RESULTS = 5       # résultats demandés au backend (max_results plafonné à cette valeur)
+CACHE_MAX_ENTRIES = 256
+NEGATIVE_TTL = 300           # s — résultat vide mémorisé 5 min
+BREAKER_THRESHOLD = 3        # échecs consécutifs avant ouverture
+BREAKER_COOLDOWN = 60.0      # s — durée d'ouverture avant nouvel essai
+LATENCY_WINDOW = 200         # nb de mesures conservées pour p50/p95
+
+# (catégorie, motif sur la requête normalisée, TTL en secondes) — premier qui matche
+CATEGORY_TTL = [
+    ("score", re.compile(r"\b(score|resultat|match|qui a gagne|classement)\b"), 600),
+    ("meteo", re.compile(r"\b(meteo|temps qu.il fait|temperature|pluie|neige)\b"), 1800),
+    ("news", re.compile(r"\b(actualite|news|nouvelles?|aujourd.hui|ce soir|ce matin|en ce moment|recent|vient de)\b"), 900),
+    ("prix", re.compile(r"\b(prix|combien coute|cours)\b"), 3600),
+    ("definition", re.compile(r"\b(definition|qu.est.ce que|wikipedia|explique.moi)\b"), 86400),
+]
+DEFAULT_TTL = 6 * 3600
+
+
+def normalize_query(query: str) -> str:
+    """Forme canonique d'une requête : « Météo à Arlon ? » → « meteo a arlon »."""
+    text = fold_accents(query)
+    text = re.sub(r"[^\w']+", " ", text)
+    return " ".join(text.split())
+
+
+def categorize(normalized: str) -> tuple[str, int]:
+    """(catégorie, TTL) d'une requête normalisée."""
+    for name, pattern, ttl in CATEGORY_TTL:
+        if pattern.search(normalized):
+            return name, ttl
+    return "general", DEFAULT_TTL
+
+
+def format_results(results: list[dict], max_results: int = 3) -> str:
+    """Résultats DDG → puces « • titre: extrait » injectées dans le prompt."""
+    parts = []
+    for r in results[:max_results]:
+        title = (r.get("title") or "").strip()
+        body = (r.get("body") or "").strip()[:200]
+        if title or body:
+            parts.append(f"• {title}: {body}")
+    return "\n".join(parts)
+
+
+def ddgs_backend(query: str, max_results: int) -> list[dict]:
+    """Backend de production : DuckDuckGo (paquet ddgs)."""
+    from ddgs import DDGS
+    with DDGS() as ddgs:
+        return list(ddgs.text(query, max_results=max_results))
+
+
+class CircuitBreaker:
+    """Disjoncteur simple : fermé → ouvert après N échecs → semi-ouvert après cooldown."""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN,
+                 clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.threshold:
+            return "closed"
+        if self.clock() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """Autorise un appel réseau (un essai par cooldown en semi-ouvert)."""
+        state = self.state
+        if state == "half_open":
+            self.opened_at = self.clock()  # un seul essai, les suivants attendent
+            return True
+        return state == "closed"
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            if self.failures == self.threshold:
+                self.trips += 1
+            self.opened_at = self.clock()
+
+    def remaining(self) -> float:
+        return max(0.0, self.cooldown - (self.clock() - self.opened_at)) if self.state == "open" else 0.0
+
+
+class WebSearchCache:
+    """Recherche web mise en cache, protégée par un disjoncteur."""
+
+    def __init__(self, backend=ddgs_backend, timeout: float = SEARCH_TIMEOUT,
+                 max_entries: int = CACHE_MAX_ENTRIES, negative_ttl: float = NEGATIVE_TTL,
+                 breaker: CircuitBreaker | None = None, clock=time.monotonic):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self._entries: OrderedDict[str, tuple[float, list, str]] = OrderedDict()  # clé → (expire, résultats, catégorie)
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._latencies: list[float] = []
+        self.counters = {"hits": 0, "negative_hits": 0, "misses": 0, "coalesced": 0,
+                         "errors": 0, "timeouts": 0, "breaker_skips": 0}
+
+    def lookup(self, query: str, max_results: int = 3) -> str | None:
+        """Résultat en cache encore valide (texte, éventuellement vide) ou None."""
+        key = normalize_query(query)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return format_results(entry[1], max_results)
+
+    def _store(self, key: str, results: list, category: str, ttl: float):
+        self._entries[key] = (self.clock() + ttl, results, category)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def search(self, query: str, max_results: int = 3) -> str:
+        """Texte formaté des résultats ("" si rien, réseau coupé ou disjoncteur ouvert)."""
+        key = normalize_query(query)
+        if not key:
+            return ""
+        max_results = min(max_results, SEARCH_MAX_RESULTS)
+        cached = self.lookup(query, max_results)
+        if cached is not None:
+            self.counters["hits" if cached else "negative_hits"] += 1
+            return cached
+        # Même requête déjà en vol (ex: deux clients) → attendre le même résultat
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.counters["coalesced"] += 1
+            return format_results(await asyncio.shield(pending), max_results)
+        if not self.breaker.allow():
+            self.counters["breaker_skips"] += 1
+            return ""
+
+        self.counters["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        results = []
+        try:
+            results = await self._fetch(key, query)
+        finally:
+            self._inflight.pop(key, None)
+            future.set_result(results)
+        return format_results(results, max_results)
+
+    async def _fetch(self, key: str, query: str) -> list[dict]:
+        """Résultats bruts (SEARCH_MAX_RESULTS au plus), mis en cache ; [] en cas d'échec."""
+        category, ttl = categorize(key)
+        t0 = time.perf_counter()
+        try:
+            results = await asyncio.wait_for(
+                asyncio.get_running_loop().run_in_executor(None, self.backend, query, SEARCH_MAX_RESULTS),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            self.breaker.record_failure()
+            print(f"[WEB_SEARCH] Timeout {self.timeout:.1f}s ({self.breaker.state}): {query[:50]}", flush=True)
+            return []
+        except Exception as e:
+            self.counters["errors"] += 1
+            self.breaker.record_failure()
+            print(f"[WEB_SEARCH] Erreur ({self.breaker.state}): {e}", flush=True)
+            return []
+        self._record_latency((time.perf_counter() - t0) * 1000)
+        self.breaker.record_success()
+        results = list(results or [])[:SEARCH_MAX_RESULTS]
+        self._store(key, results, category, ttl if format_results(results, SEARCH_MAX_RESULTS) else self.negative_ttl)
+        return results
+
+    def _record_latency(self, ms: float):
+        self._latencies.append(ms)
+        if len(self._latencies) > LATENCY_WINDOW:
+            del self._latencies[:-LATENCY_WINDOW]
+
+    def stats(self) -> dict:
+        lat = sorted(self._latencies)
+        served = self.counters["hits"] + self.counters["negative_hits"] + self.counters["misses"]
+
+        def pct(p):
+            return round(lat[min(len(lat) - 1, int(len(lat) * p))], 1) if lat else None
+
+        categories: dict[str, int] = {}
+        for _, _, cat in self._entries.values():
+            categories[cat] = categories.get(cat, 0) + 1
+        return {
+            **self.counters,
+            "hit_rate": round((self.counters["hits"] + self.counters["negative_hits"]) / served, 3) if served else 0.0,
+            "entries": len(self._entries),
+            "categories": categories,
+            "backend_p50_ms": pct(0.50),
+            "backend_p95_ms": pct(0.95),
+            "breaker": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "breaker_retry_in_s": round(self.breaker.remaining(), 1),
+        }
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    query = " ".join(sys.argv[1:])
+    cache = WebSearchCache()
+
+    async def run():
+        for attempt in ("réseau", "cache"):
+            t0 = time.perf_counter()
+            text = await cache.search(query)
+            print(f"— {attempt} ({(time.perf_counter()-t0)*1000:.1f}ms, catégorie={categorize(normalize_query(query))[0]})")
+            print(text or "(aucun résultat)")
+        print(cache.stats())
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
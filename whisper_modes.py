@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+KITT — Modes de calcul Whisper (float16 / int8_float16 / int8 / float32)
+Sélection automatique selon la pression mémoire + benchmark vitesse/RAM/WER.
+
+Le Jetson partage 8 Go entre llama.cpp, Piper et Whisper : au boot on choisit
+le mode le plus précis dont l'empreinte tient dans MemAvailable. L'empreinte
+est celle mesurée par le dernier --benchmark sur ce device (whisper_footprint.json),
+à défaut l'estimation de _FOOTPRINT_MB.
+
+Usage :
+    venv/bin/python3 whisper_modes.py              # mode choisi pour la RAM actuelle
+    venv/bin/python3 whisper_modes.py --benchmark  # tableau vitesse / RAM / WER par mode (+ empreintes mesurées)
+    venv/bin/python3 whisper_modes.py --benchmark --json
+    (chaque mode est mesuré dans un process neuf : --measure MODE --device D --limit N)
+
+Variables d'environnement (lues par kyronex_server.py) :
+    KYRONEX_WHISPER_COMPUTE=auto|float16|int8_float16|int8|float32  (défaut: auto)
+    KYRONEX_WHISPER_PROBE=1   mesure latence + WER du mode choisi au boot
+"""
+
+import csv
+import json
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+FIXTURES_DIR = BASE_DIR / "stt_data"          # produit par whisper_collect.py
+FIXTURES_META = FIXTURES_DIR / "metadata.csv"
+FIXTURES_COUNT = 20                           # sous-ensemble fixe (les N premiers)
+WHISPER_SIZE = "small"
+
+# Ordre de préférence par device : du plus précis au plus économe
+COMPUTE_MODES = {
+    "cuda": ["float16", "int8_float16", "int8"],
+    "cpu": ["float32", "int8"],
+}
+
+# Empreinte mémoire estimée (MB) pour Whisper small : poids + buffers CTranslate2
+_FOOTPRINT_MB = {
+    "float32": 1100,
+    "float16": 620,
+    "int8_float16": 380,
+    "int8": 340,
+}
+MEMORY_MARGIN_MB = 600  # garder de la marge pour llama.cpp (KV cache) + Piper
+FOOTPRINT_FILE = BASE_DIR / "whisper_footprint.json"   # {device: {mode: MB}} écrit par --benchmark
+
+
+def read_mem_available_mb() -> int:
+    """Lit MemAvailable dans /proc/meminfo (MB, -1 si illisible)."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except Exception:
+        pass
+    return -1
+
+
+def detect_device() -> str:
+    """'cuda' si CTranslate2 voit un GPU, sinon 'cpu'."""
+    try:
+        import ctranslate2
+        if ctranslate2.get_cuda_device_count() > 0:
+            return "cuda"
+    except Exception:
+        pass
+    return "cpu"
+
+
+def supported_modes(device: str) -> list[str]:
+    """Modes de COMPUTE_MODES réellement supportés par le build CTranslate2."""
+    modes = COMPUTE_MODES.get(device, COMPUTE_MODES["cpu"])
+    try:
+        import ctranslate2
+        available = ctranslate2.get_supported_compute_types(device)
+        return [m for m in modes if m in available]
+    except Exception:
+        return list(modes)
+
+
+def load_footprints(device: str) -> dict[str, int]:
+    """Empreintes (MB) par mode : mesures du dernier benchmark, sinon estimations."""
+    footprints = dict(_FOOTPRINT_MB)
+    try:
+        measured = json.loads(FOOTPRINT_FILE.read_text()).get(device, {})
+        footprints.update({m: int(mb) for m, mb in measured.items() if mb > 0})
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"[STT] {FOOTPRINT_FILE.name} illisible ({e}) — estimations utilisées", flush=True)
+    return footprints
+
+
+def save_footprints(device: str, results: list[dict]):
+    """Enregistre les empreintes mesurées par benchmark() pour ce device."""
+    measured = {r["mode"]: r["footprint_mb"] for r in results if r.get("footprint_mb", 0) > 0}
+    if not measured:
+        return
+    try:
+        data = json.loads(FOOTPRINT_FILE.read_text())
+    except Exception:
+        data = {}
+    data[device] = {**data.get(device, {}), **measured}
+    FOOTPRINT_FILE.write_text(json.dumps(data, indent=2))
+
+
+def pick_compute_type(device: str, mem_available_mb: int | None = None,
+                      footprints: dict[str, int] | None = None) -> str:
+    """Choisit le mode le plus précis dont l'empreinte + marge tient en RAM.
+
+    Si rien ne tient (ou RAM illisible), retourne le mode le plus économe.
+    """
+    modes = supported_modes(device)
+    if not modes:
+        return "float32" if device == "cpu" else "float16"
+    if mem_available_mb is None:
+        mem_available_mb = read_mem_available_mb()
+    if mem_available_mb < 0:
+        return modes[0]
+    if footprints is None:
+        footprints = load_footprints(device)
+    for mode in modes:
+        if footprints.get(mode, 0) + MEMORY_MARGIN_MB <= mem_available_mb:
+            return mode
+    return min(modes, key=lambda m: footprints.get(m, 0))
+
+
+def resolve_compute_type(requested: str = "auto") -> tuple[str, str]:
+    """Retourne (device, compute_type) pour KYRONEX_WHISPER_COMPUTE."""
+    device = detect_device()
+    requested = (requested or "auto").strip().lower()
+    if requested != "auto":
+        if requested in supported_modes(device):
+            return device, requested
+        print(f"[STT] Mode {requested} non supporté sur {device} — sélection auto", flush=True)
+    return device, pick_compute_type(device)
+
+
+# ══════════════════════════════════════════════════════════════
+# Fixtures + WER
+# ══════════════════════════════════════════════════════════════
+
+def load_fixtures(limit: int = FIXTURES_COUNT) -> list[tuple[Path, str]]:
+    """Charge les N premiers échantillons de stt_data/metadata.csv (ordre stable)."""
+    if not FIXTURES_META.exists():
+        return []
+    rows = []
+    with open(FIXTURES_META, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            path = FIXTURES_DIR / row["file_name"]
+            if path.exists():
+                rows.append((path, row["transcription"]))
+    rows.sort(key=lambda r: r[0].name)
+    return rows[:limit]
+
+
+def _normalize(text: str) -> list[str]:
+    """Minuscules, sans accents ni ponctuation — pour un WER robuste."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"[a-z0-9]+", text)
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """WER = distance d'édition (mots) / nb de mots de la référence."""
+    ref, hyp = _normalize(reference), _normalize(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1] / len(ref)
+
+
+def _rss_mb() -> float:
+    """RSS courant du process (MB)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except Exception:
+        pass
+    return -1.0
+
+
+def measure_model(model, fixtures: list[tuple[Path, str]], language: str = "fr") -> dict:
+    """Transcrit les fixtures et retourne latence moyenne/p95 + WER moyen."""
+    latencies = []
+    wers = []
+    for path, reference in fixtures:
+        t0 = time.time()
+        segments, _ = model.transcribe(
+            str(path), language=language, beam_size=5,
+            temperature=0, condition_on_previous_text=False,
+        )
+        text = " ".join(seg.text.strip() for seg in segments).strip()
+        latencies.append((time.time() - t0) * 1000)
+        wers.append(word_error_rate(reference, text))
+    if not latencies:
+        return {"samples": 0}
+    latencies.sort()
+    return {
+        "samples": len(latencies),
+        "avg_ms": round(sum(latencies) / len(latencies)),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]),
+        "wer": round(sum(wers) / len(wers), 4),
+    }
+
+
+def measure_mode(device: str, mode: str, limit: int = FIXTURES_COUNT) -> dict:
+    """Charge UN mode dans ce process et mesure vitesse, RAM et WER.
+
+    footprint_mb = max(hausse du RSS, baisse de MemAvailable) après transcription :
+    sur Jetson la mémoire GPU (unifiée) n'apparaît pas dans le RSS du process.
+    """
+    from faster_whisper import WhisperModel
+
+    fixtures = load_fixtures(limit)
+    rss0, avail0 = _rss_mb(), read_mem_available_mb()
+    t0 = time.time()
+    try:
+        model = WhisperModel(WHISPER_SIZE, device=device, compute_type=mode)
+    except Exception as e:
+        return {"mode": mode, "error": str(e)}
+    load_ms = (time.time() - t0) * 1000
+    row = {"mode": mode, "load_ms": round(load_ms),
+           "rss_delta_mb": round(_rss_mb() - rss0)}
+    row.update(measure_model(model, fixtures))
+    footprint = _rss_mb() - rss0
+    if avail0 > 0:
+        footprint = max(footprint, avail0 - read_mem_available_mb())
+    row["footprint_mb"] = round(footprint)
+    return row
+
+
+def benchmark(device: str | None = None, limit: int = FIXTURES_COUNT) -> list[dict]:
+    """Mesure chaque mode dans un process neuf (whisper_modes.py --measure MODE).
+
+    Dans un seul process, l'allocateur (CUDA / CTranslate2) garde la mémoire du
+    mode précédent : les modes suivants paraîtraient plus petits qu'au boot.
+    """
+    import subprocess
+
+    device = device or detect_device()
+    results = []
+    for mode in supported_modes(device):
+        cmd = [sys.executable, str(Path(__file__).resolve()), "--measure", mode,
+               "--device", device, "--limit", str(limit)]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        lines = proc.stdout.strip().splitlines()
+        try:
+            results.append(json.loads(lines[-1]))
+        except (IndexError, ValueError):
+            err = (proc.stderr.strip().splitlines() or [f"code {proc.returncode}"])[-1]
+            results.append({"mode": mode, "error": err})
+    return results
+
+
+def _print_table(device: str, results: list[dict]):
+    print(f"Whisper {WHISPER_SIZE} — device={device} — MemAvailable={read_mem_available_mb()}MB")
+    print(f"{'mode':<14}{'load':>8}{'RAM+':>8}{'avg':>8}{'p95':>8}{'WER':>8}  n  empreinte")
+    for r in results:
+        if "error" in r:
+            print(f"{r['mode']:<14}  ERREUR: {r['error'][:60]}")
+            continue
+        if not r.get("samples"):
+            print(f"{r['mode']:<14}{r['load_ms']:>6}ms{r['rss_delta_mb']:>6}MB  (aucune fixture dans {FIXTURES_DIR})")
+            continue
+        print(f"{r['mode']:<14}{r['load_ms']:>6}ms{r['rss_delta_mb']:>6}MB"
+              f"{r['avg_ms']:>6}ms{r['p95_ms']:>6}ms{r['wer']:>8.3f}  {r['samples']}  {r['footprint_mb']}MB")
+
+
+def _arg(name: str, default: str) -> str:
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+def main():
+    if "--measure" in sys.argv:
+        # Appelé par benchmark() : un mode, un process, une ligne JSON sur stdout
+        row = measure_mode(_arg("--device", "cpu"), _arg("--measure", "int8"),
+                           int(_arg("--limit", str(FIXTURES_COUNT))))
+        print(json.dumps(row), flush=True)
+        sys.exit(0)
+    device = detect_device()
+    if "--benchmark" in sys.argv:
+        results = benchmark(device)
+        save_footprints(device, results)
+        if "--json" in sys.argv:
+            print(json.dumps({"device": device, "results": results}, indent=2))
+        else:
+            _print_table(device, results)
+        sys.exit(0)
+
+    mem = read_mem_available_mb()
+    print(f"device={device} MemAvailable={mem}MB modes={supported_modes(device)}")
+    print(f"empreintes : {load_footprints(device)}")
+    print(f"→ compute_type choisi : {pick_compute_type(device, mem)}")
+
+
+if __name__ == "__main__":
+    main()
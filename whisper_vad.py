@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+KITT — VAD serveur avant Whisper (énergie + Silero optionnel).
+
+Étape rapide exécutée avant tout appel au modèle :
+  1. décodage unique de l'upload en float32 16 kHz mono
+  2. porte énergie (RMS par trame de 30 ms) : un clip dont AUCUNE trame
+     n'atteint ABS_THRESHOLD_DB est rejeté en quelques millisecondes
+  3. Silero VAD (fourni par faster-whisper) décide pour tous les autres clips ;
+     sans Silero, zones par énergie avec un plancher de bruit plafonné
+  4. découpe de l'audio sur la zone de parole (+ marge)
+
+Usage :
+    venv/bin/python3 whisper_vad.py fichier.wav   # affiche la zone de parole détectée
+"""
+
+import io
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+MIN_SPEECH_MS = 200        # en dessous : clip rejeté (bruit, clic, souffle)
+PAD_MS = 200               # marge conservée avant/après la parole
+ABS_THRESHOLD_DB = -45.0   # RMS minimal d'une trame parlée (dBFS)
+NOISE_MARGIN_DB = 10.0     # la parole doit dépasser le plancher de bruit de N dB
+# Plancher de bruit plafonné (micro USB en pièce calme ~ -60 dBFS) : un clip parlé
+# d'un bout à l'autre (mode wake-word) a un 10e percentile élevé, qui n'est pas du bruit
+MAX_NOISE_FLOOR_DB = -55.0
+HANGOVER_FRAMES = 8        # trames silencieuses tolérées à l'intérieur d'un mot
+
+
+@dataclass
+class VadResult:
+    audio: np.ndarray      # audio découpé (vide si rejeté)
+    speech_ms: int         # durée de parole détectée
+    start_s: float         # début de la zone conservée dans l'original
+    end_s: float           # fin de la zone conservée dans l'original
+    duration_s: float      # durée totale de l'upload
+    method: str            # "energy" ou "silero"
+    vad_ms: float          # temps passé dans le VAD
+
+    @property
+    def rejected(self) -> bool:
+        return self.speech_ms < MIN_SPEECH_MS
+
+
+def decode_upload(data: bytes) -> np.ndarray:
+    """Décode un upload (wav/webm/ogg/...) en float32 16 kHz mono."""
+    from faster_whisper import decode_audio
+    return decode_audio(io.BytesIO(data), sampling_rate=SAMPLE_RATE)
+
+
+def _frame_db(audio: np.ndarray, frame_len: int) -> np.ndarray:
+    """RMS en dBFS par trame (vectorisé, sans recouvrement)."""
+    n = len(audio) // frame_len
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[:n * frame_len].reshape(n, frame_len)
+    rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-12)
+    return 20.0 * np.log10(rms)
+
+
+def energy_segments(audio: np.ndarray, db: np.ndarray | None = None) -> list[tuple[int, int]]:
+    """Zones de parole [début, fin) en échantillons, détectées par énergie."""
+    frame_len = SAMPLE_RATE * FRAME_MS // 1000
+    if db is None:
+        db = _frame_db(audio, frame_len)
+    if db.size == 0:
+        return []
+    noise_floor = min(float(np.percentile(db, 10)), MAX_NOISE_FLOOR_DB)
+    threshold = max(ABS_THRESHOLD_DB, noise_floor + NOISE_MARGIN_DB)
+    voiced = db > threshold
+
+    segments = []
+    start = None
+    silent = 0
+    for i, v in enumerate(voiced):
+        if v:
+            if start is None:
+                start = i
+            silent = 0
+        elif start is not None:
+            silent += 1
+            if silent > HANGOVER_FRAMES:
+                segments.append((start * frame_len, (i - silent + 1) * frame_len))
+                start = None
+                silent = 0
+    if start is not None:
+        segments.append((start * frame_len, (len(voiced) - silent) * frame_len))
+    return segments
+
+
+def silero_segments(audio: np.ndarray) -> list[tuple[int, int]] | None:
+    """Zones de parole via le Silero VAD embarqué dans faster-whisper (None si indisponible)."""
+    try:
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+    except Exception:
+        return None
+    try:
+        opts = VadOptions(threshold=0.3, min_silence_duration_ms=300, speech_pad_ms=0)
+        stamps = get_speech_timestamps(audio, opts)
+    except Exception:
+        return None
+    return [(s["start"], s["end"]) for s in stamps]
+
+
+def trim_speech(audio: np.ndarray, use_silero: bool = True) -> VadResult:
+    """Applique la porte énergie puis (optionnel) Silero, et découpe la parole."""
+    t0 = time.perf_counter()
+    duration_s = len(audio) / SAMPLE_RATE
+    db = _frame_db(audio, SAMPLE_RATE * FRAME_MS // 1000)
+    method = "energy"
+    if not (db > ABS_THRESHOLD_DB).any():
+        # Porte énergie : aucune trame audible → rejet immédiat, sans Silero
+        segments = []
+    else:
+        refined = silero_segments(audio) if use_silero else None
+        if refined is not None:
+            segments = refined
+            method = "silero"
+        else:
+            segments = energy_segments(audio, db)
+
+    speech = sum(e - s for s, e in segments)
+    speech_ms = int(speech * 1000 / SAMPLE_RATE)
+    if speech_ms < MIN_SPEECH_MS:
+        return VadResult(np.zeros(0, dtype=np.float32), speech_ms, 0.0, 0.0,
+                         duration_s, method, (time.perf_counter() - t0) * 1000)
+
+    pad = SAMPLE_RATE * PAD_MS // 1000
+    start = max(0, segments[0][0] - pad)
+    end = min(len(audio), segments[-1][1] + pad)
+    return VadResult(audio[start:end], speech_ms, start / SAMPLE_RATE, end / SAMPLE_RATE,
+                     duration_s, method, (time.perf_counter() - t0) * 1000)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    with open(sys.argv[1], "rb") as f:
+        data = f.read()
+    t0 = time.perf_counter()
+    audio = decode_upload(data)
+    decode_ms = (time.perf_counter() - t0) * 1000
+    res = trim_speech(audio, use_silero="--energy" not in sys.argv)
+    status = "REJETÉ" if res.rejected else "OK"
+    print(f"{status} durée={res.duration_s:.2f}s parole={res.speech_ms}ms "
+          f"zone={res.start_s:.2f}-{res.end_s:.2f}s méthode={res.method} "
+          f"décodage={decode_ms:.1f}ms vad={res.vad_ms:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()